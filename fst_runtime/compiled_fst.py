@@ -0,0 +1,1318 @@
+# pylint: disable=too-many-lines
+# The compiled format, its reader and writer, and the arc indexes are kept together, as they all depend on the same layout.
+
+"""
+This module defines the compiled binary format of an FST, which lets an FST be loaded via a bulk read instead of by re-parsing its ``.att`` file.
+
+Attributes
+----------
+COMPILED_FILE_EXTENSION : str
+    The file extension used by compiled FST files; this is ``.attc``.
+
+get_sidecar_path : function
+    Returns the path of the compiled sidecar file used to cache a given ``.att`` file.
+
+Note
+----
+A compiled file is made of a fixed-size header followed by a payload of flat arrays. The header holds a magic number, the format
+version, the counts needed to slice the payload, a fingerprint of the ``.att`` file that the FST was compiled from, the name of the
+semiring the weights were converted with, and a CRC-32 checksum of the payload. The payload holds, in order: the symbol table,
+the IDs of the multi-character symbols, the state IDs, the accepting state flags and weights, and the arcs of every state stored
+contiguously and sorted by input symbol ID (i.e., offsets per state, then the target, input symbol, output symbol, and weight
+columns), and last, the order of the arcs of every state when sorted by output symbol ID along with the output symbol IDs in that
+order. Every section is padded to 8 bytes.
+
+Since every section is aligned, a compiled file can also be memory-mapped (see ``_CompiledFst.read``), in which case the columns are
+read-only views over the pages of the file. Processes that map the same file share those pages, rather than each holding a copy.
+A mapped file can further be loaded lazily, in which case nothing is read from it up front but the header and the symbol table,
+and the arc offsets of a state (i.e., the state-offset index) are only read once the state is reached.
+"""
+
+from __future__ import annotations
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import threading
+from itertools import chain
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Union
+import zlib
+
+from fst_runtime.compiled_fst_error import CompiledFstError
+from fst_runtime.semiring import Semiring
+from fst_runtime.symbol_table import EPSILON, EPSILON_ID, SymbolTable
+
+if TYPE_CHECKING:
+    from fst_runtime.fst import _AttInputInfo
+
+COMPILED_FILE_EXTENSION: str = '.attc'
+"""This is the file extension used by compiled FST files."""
+
+_MAGIC = b'FSTC'
+"""The first four bytes of every compiled FST file."""
+
+_FORMAT_VERSION = 4
+"""The version of the binary layout. This is incremented whenever the layout changes, which invalidates older files."""
+
+_HEADER = struct.Struct('<4sHBBQQQQQQq32sI64sI')
+"""
+The layout of the header: magic, version, weight kind, big-endian flag, number of states, number of arcs, number of symbols,
+number of multi-character symbols, size of the symbol blob, source size, source modification time, source SHA-256,
+payload checksum, semiring name, and a reserved field that keeps the header 8-byte aligned.
+"""
+
+_ALIGNMENT = 8
+"""Every section of the payload starts on a multiple of this many bytes."""
+
+_WEIGHTS_NONE = 0
+"""The FST was compiled without a semiring, and so no weights are stored."""
+
+_WEIGHTS_FLOAT = 1
+"""The weights are stored as 64-bit floats."""
+
+_WEIGHTS_BOOL = 2
+"""The weights are booleans, which are stored as single bytes that are either 0 or 1."""
+
+_WEIGHTS_OBJECT = 3
+"""The weights are neither booleans nor real numbers. Such weights are kept in memory, but can't be written to a compiled file."""
+
+_INDEXED_FAN_OUT = 16
+"""States with at least this many arcs get a dictionary from label to arcs in an ``_ArcIndex``; smaller states are binary searched."""
+
+_Column = Union[array, memoryview]
+"""A column of a ``_CompiledFst``; an ``array``, or a read-only ``memoryview`` over a memory-mapped compiled file."""
+
+_WeightColumn = Union[_Column, '_BooleanColumn', list]
+"""
+A weight column of a ``_CompiledFst``: a ``_Column`` of doubles for real-valued weights, a ``_BooleanColumn`` for boolean weights,
+or a ``list`` of the weights of any other semiring.
+"""
+
+
+def get_sidecar_path(att_file_path: str | os.PathLike) -> str:
+    """
+    Returns the path of the compiled sidecar file used to cache a given ``.att`` file.
+
+    Parameters
+    ----------
+    att_file_path : str | os.PathLike
+        The path to the ``.att`` file.
+
+    Returns
+    -------
+    str
+        The path of the sidecar, which is the ``.att`` path with the extension ``.attc``; e.g. ``/path/to/fst.attc``.
+    """
+    return os.path.splitext(str(att_file_path))[0] + COMPILED_FILE_EXTENSION
+
+
+def _get_typecode(column: _Column) -> str:
+    """
+    Returns the type code of a column, which a memory-mapped column calls its format.
+
+    Parameters
+    ----------
+    column : _Column
+        The column.
+
+    Returns
+    -------
+    str
+        The ``array`` type code of the values of the column, e.g. ``'i'``.
+    """
+    return column.typecode if isinstance(column, array) else column.format
+
+
+class _BooleanColumn:
+    """
+    A column of boolean weights, stored as one byte per weight that is either 0 or 1, which gives each weight as a ``bool`` when it
+    is indexed. The bytes are an ``array``, or a read-only ``memoryview`` over a memory-mapped compiled file, so that the weights of
+    a mapped FST are only read once they are used, as real-valued weights are.
+
+    Attributes
+    ----------
+    column : _Column
+        The bytes of the weights.
+    """
+
+    __slots__ = ('column',)
+
+    def __init__(self, column: _Column) -> None:
+        """
+        Initializes the column over the bytes of the weights.
+
+        Parameters
+        ----------
+        column : _Column
+            The bytes of the weights, with the type code ``'B'``.
+        """
+
+        self.column: _Column = column
+        """The bytes of the weights."""
+
+    def __getitem__(self, index: int) -> bool:
+        """Returns the weight at an index."""
+        return bool(self.column[index])
+
+    def __len__(self) -> int:
+        """Returns the number of weights."""
+        return len(self.column)
+
+    def __iter__(self) -> Iterator[bool]:
+        """Returns the weights in order."""
+        return map(bool, self.column)
+
+    def tobytes(self) -> bytes:
+        """Returns the bytes the weights are stored as."""
+        return self.column.tobytes()
+
+
+@dataclass
+class _SourceFingerprint:
+    """
+    Identifies the contents of the ``.att`` file that a compiled FST was created from.
+
+    Attributes
+    ----------
+    size : int
+        The size of the ``.att`` file in bytes.
+
+    mtime_ns : int
+        The modification time of the ``.att`` file in nanoseconds.
+
+    sha256 : bytes
+        The SHA-256 digest of the contents of the ``.att`` file.
+    """
+
+    size: int
+    """The size of the ``.att`` file in bytes."""
+
+    mtime_ns: int
+    """The modification time of the ``.att`` file in nanoseconds."""
+
+    sha256: bytes
+    """The SHA-256 digest of the contents of the ``.att`` file."""
+
+    @staticmethod
+    def hash_file(file_path: str | os.PathLike) -> bytes:
+        """
+        Computes the SHA-256 digest of a file.
+
+        Parameters
+        ----------
+        file_path : str | os.PathLike
+            The path to the file to hash.
+
+        Returns
+        -------
+        bytes
+            The 32-byte digest of the file contents.
+        """
+        with open(file_path, 'rb') as file:
+            return hashlib.file_digest(file, 'sha256').digest()
+
+    @staticmethod
+    def from_file(file_path: str | os.PathLike) -> _SourceFingerprint:
+        """
+        Creates the fingerprint of a file.
+
+        Parameters
+        ----------
+        file_path : str | os.PathLike
+            The path to the file to fingerprint.
+
+        Returns
+        -------
+        _SourceFingerprint
+            The fingerprint of the file.
+        """
+        stat = os.stat(file_path)
+        return _SourceFingerprint(stat.st_size, stat.st_mtime_ns, _SourceFingerprint.hash_file(file_path))
+
+
+@dataclass
+class _CompiledHeader: # pylint: disable=too-many-instance-attributes
+    """
+    Holds the decoded header of a compiled FST file.
+
+    Attributes
+    ----------
+    weight_kind : int
+        How the weights are stored; one of ``_WEIGHTS_NONE``, ``_WEIGHTS_FLOAT`` or ``_WEIGHTS_BOOL``.
+
+    big_endian : bool
+        Whether the payload arrays were written on a big-endian machine.
+
+    num_states : int
+        The number of states in the FST.
+
+    num_arcs : int
+        The number of arcs in the FST.
+
+    num_symbols : int
+        The number of symbols in the symbol table.
+
+    num_multichar_symbols : int
+        The number of multi-character symbols in the FST.
+
+    symbol_blob_size : int
+        The size in bytes of the UTF-8 encoded symbols.
+
+    fingerprint : _SourceFingerprint
+        The fingerprint of the ``.att`` file the FST was compiled from.
+
+    checksum : int
+        The CRC-32 checksum of the payload.
+
+    semiring_name : str
+        The class name of the semiring the weights were converted with, or an empty string if there was none.
+    """
+
+    weight_kind: int
+    """How the weights are stored; one of ``_WEIGHTS_NONE``, ``_WEIGHTS_FLOAT`` or ``_WEIGHTS_BOOL``."""
+
+    big_endian: bool
+    """Whether the payload arrays were written on a big-endian machine."""
+
+    num_states: int
+    """The number of states in the FST."""
+
+    num_arcs: int
+    """The number of arcs in the FST."""
+
+    num_symbols: int
+    """The number of symbols in the symbol table."""
+
+    num_multichar_symbols: int
+    """The number of multi-character symbols in the FST."""
+
+    symbol_blob_size: int
+    """The size in bytes of the UTF-8 encoded symbols."""
+
+    fingerprint: _SourceFingerprint
+    """The fingerprint of the ``.att`` file the FST was compiled from."""
+
+    checksum: int
+    """The CRC-32 checksum of the payload."""
+
+    semiring_name: str
+    """The class name of the semiring the weights were converted with, or an empty string if there was none."""
+
+    @staticmethod
+    def unpack(data: bytes | memoryview, file_path: str | os.PathLike) -> _CompiledHeader: # pylint: disable=too-many-locals
+        """
+        Decodes and validates the header at the start of a compiled FST file.
+
+        Parameters
+        ----------
+        data : bytes | memoryview
+            The contents of the file, or at least its first ``_HEADER.size`` bytes.
+
+        file_path : str | os.PathLike
+            The path of the file; this is only used in error messages.
+
+        Returns
+        -------
+        _CompiledHeader
+            The decoded header.
+
+        Raises
+        ------
+        CompiledFstError
+            This error is raised if the file is not a compiled FST file or was written with a different format version.
+        """
+
+        if len(data) < _HEADER.size:
+            raise CompiledFstError(f"The file {os.path.basename(file_path)} is too short to be a compiled FST.")
+
+        (
+            magic, version, weight_kind, big_endian,
+            num_states, num_arcs, num_symbols, num_multichar_symbols, symbol_blob_size,
+            source_size, source_mtime_ns, source_sha256, checksum, semiring_name, _
+        ) = _HEADER.unpack_from(data, 0)
+
+        if magic != _MAGIC:
+            raise CompiledFstError(f"The file {os.path.basename(file_path)} is not a compiled FST.")
+
+        if version != _FORMAT_VERSION:
+            raise CompiledFstError(
+                f"The file {os.path.basename(file_path)} has format version {version}, but version {_FORMAT_VERSION} is required. "
+                "Please recompile it."
+            )
+
+        return _CompiledHeader(
+            weight_kind,
+            bool(big_endian),
+            num_states,
+            num_arcs,
+            num_symbols,
+            num_multichar_symbols,
+            symbol_blob_size,
+            _SourceFingerprint(source_size, source_mtime_ns, source_sha256),
+            checksum,
+            semiring_name.rstrip(b'\0').decode('utf-8'),
+        )
+
+    @staticmethod
+    def read(file_path: str | os.PathLike) -> _CompiledHeader:
+        """
+        Reads only the header of a compiled FST file.
+
+        Parameters
+        ----------
+        file_path : str | os.PathLike
+            The path to the compiled FST file.
+
+        Returns
+        -------
+        _CompiledHeader
+            The decoded header.
+        """
+        with open(file_path, 'rb') as compiled_file:
+            return _CompiledHeader.unpack(compiled_file.read(_HEADER.size), file_path)
+
+
+@dataclass
+class _CompiledFst: # pylint: disable=too-many-instance-attributes
+    """
+    Holds an FST as flat arrays, which is the form the FST takes in a compiled ``.attc`` file.
+
+    Attributes
+    ----------
+    symbol_table : SymbolTable
+        Every input and output symbol of the FST, indexed by symbol ID. The symbol with ID ``0`` is epsilon.
+
+    multichar_symbol_ids : _Column
+        The symbol IDs of the multi-character symbols.
+
+    state_ids : _Column
+        The state ID from the ``.att`` file of every state, indexed by state index.
+
+    final_flags : _Column
+        Whether each state is an accepting state (``1``) or not (``0``), indexed by state index.
+
+    final_weights : _WeightColumn | None
+        The acceptance weight of each state, indexed by state index; ``None`` if the FST has no semiring.
+
+    arc_offsets : _Column
+        The arcs leaving the state with index ``i`` are the arcs with indices ``arc_offsets[i]`` up to ``arc_offsets[i + 1]``.
+
+    arc_targets : _Column
+        The index of the state each arc leads to.
+
+    arc_input_ids : _Column
+        The symbol ID of the input symbol of each arc.
+
+    arc_output_ids : _Column
+        The symbol ID of the output symbol of each arc.
+
+    arc_weights : _WeightColumn | None
+        The weight of each arc; ``None`` if the FST has no semiring.
+
+    arc_output_order : _Column
+        The indices of the arcs of every state, sorted within each state by output symbol ID. This lists the same arcs as
+        ``arc_offsets``, at the same positions, but in the order that analysis (i.e., matching output symbols) needs.
+
+    arc_output_labels : _Column
+        The output symbol ID of the arc at each position of ``arc_output_order``, which is what the output index searches.
+
+    weight_kind : int
+        How the weights are stored; one of ``_WEIGHTS_NONE``, ``_WEIGHTS_FLOAT``, ``_WEIGHTS_BOOL`` or ``_WEIGHTS_OBJECT``.
+
+    semiring_name : str
+        The class name of the semiring the weights were converted with, or an empty string if there was none.
+
+    get_input_index : method
+        Returns an index of the arcs of the FST by input symbol.
+
+    get_output_index : method
+        Returns an index of the arcs of the FST by output symbol.
+
+    get_connected_states : method
+        Returns which states are on some path from the start state to an accepting state.
+
+    trim : method
+        Returns a copy of the FST without the states and arcs that aren't on any path from the start state to an accepting state.
+
+    Note
+    -----
+    Real-valued weights are held in an ``array`` of doubles, and boolean weights in a ``_BooleanColumn`` of bytes. Any other weights
+    are held in a ``list`` of values in the domain of the semiring. Indexing a weight column always gives a weight that can be used
+    as-is.
+
+    The columns of an FST read from a memory-mapped file are read-only ``memoryview`` objects, which index, slice and iterate like
+    the ``array`` objects they otherwise are, but can't be modified. This includes the bytes of boolean weights.
+    """
+
+    symbol_table: SymbolTable
+    """Every input and output symbol of the FST, indexed by symbol ID. The symbol with ID ``0`` is epsilon."""
+
+    multichar_symbol_ids: _Column
+    """The symbol IDs of the multi-character symbols."""
+
+    state_ids: _Column
+    """The state ID from the ``.att`` file of every state, indexed by state index."""
+
+    final_flags: _Column
+    """Whether each state is an accepting state (``1``) or not (``0``), indexed by state index."""
+
+    final_weights: _WeightColumn | None
+    """The acceptance weight of each state, indexed by state index; ``None`` if the FST has no semiring."""
+
+    arc_offsets: _Column
+    """The arcs leaving the state with index ``i`` are the arcs with indices ``arc_offsets[i]`` up to ``arc_offsets[i + 1]``."""
+
+    arc_targets: _Column
+    """The index of the state each arc leads to."""
+
+    arc_input_ids: _Column
+    """The symbol ID of the input symbol of each arc."""
+
+    arc_output_ids: _Column
+    """The symbol ID of the output symbol of each arc."""
+
+    arc_weights: _WeightColumn | None
+    """The weight of each arc; ``None`` if the FST has no semiring."""
+
+    arc_output_order: _Column
+    """
+    The indices of the arcs of every state, sorted within each state by output symbol ID. This lists the same arcs as ``arc_offsets``,
+    at the same positions, but in the order that analysis (i.e., matching output symbols) needs.
+    """
+
+    arc_output_labels: _Column
+    """The output symbol ID of the arc at each position of ``arc_output_order``, which is what the output index searches."""
+
+    weight_kind: int
+    """How the weights are stored; one of ``_WEIGHTS_NONE``, ``_WEIGHTS_FLOAT``, ``_WEIGHTS_BOOL`` or ``_WEIGHTS_OBJECT``."""
+
+    semiring_name: str
+    """The class name of the semiring the weights were converted with, or an empty string if there was none."""
+
+    @property
+    def num_states(self) -> int:
+        """
+        The number of states in the FST.
+
+        Returns
+        -------
+        int
+            The number of states.
+        """
+        return len(self.state_ids)
+
+    @property
+    def num_arcs(self) -> int:
+        """
+        The number of arcs in the FST.
+
+        Returns
+        -------
+        int
+            The number of arcs.
+        """
+        return len(self.arc_targets)
+
+    def get_input_index(self, *, lazy: bool = False, cache_size: int | None = None) -> _ArcIndex:
+        """
+        Returns an index of the arcs of the FST by input symbol, which is what going down (i.e., generation) needs.
+
+        Parameters
+        ----------
+        lazy : bool, optional
+            Whether to index each state when it's first reached, rather than every state now. Default is ``False``.
+
+        cache_size : int | None, optional
+            How many indexed states a lazy index keeps. Default is ``None``, which keeps every state that has been reached.
+
+        Returns
+        -------
+        _ArcIndex
+            The index, whose labels are input symbol IDs.
+        """
+        return _ArcIndex(self.arc_offsets, self.arc_input_ids, lazy=lazy, cache_size=cache_size)
+
+    def get_output_index(self, *, lazy: bool = False, cache_size: int | None = None) -> _ArcIndex:
+        """
+        Returns an index of the arcs of the FST by output symbol, which is what going up (i.e., analysis) needs.
+
+        Parameters
+        ----------
+        lazy : bool, optional
+            Whether to index each state when it's first reached, rather than every state now. Default is ``False``.
+
+        cache_size : int | None, optional
+            How many indexed states a lazy index keeps. Default is ``None``, which keeps every state that has been reached.
+
+        Returns
+        -------
+        _ArcIndex
+            The index, whose labels are output symbol IDs.
+        """
+        return _ArcIndex(self.arc_offsets, self.arc_output_labels, self.arc_output_order, lazy=lazy, cache_size=cache_size)
+
+
+    #region Trimming
+
+    def get_connected_states(self, start_index: int) -> array:
+        """
+        Returns which states are on some path from the start state to an accepting state; i.e., which states are both accessible
+        and coaccessible.
+
+        Parameters
+        ----------
+        start_index : int
+            The index of the start state.
+
+        Returns
+        -------
+        array
+            A flag per state index, which is ``1`` if the state is connected and ``0`` otherwise.
+        """
+
+        num_states = self.num_states
+        arc_offsets = self.arc_offsets
+        arc_targets = self.arc_targets
+
+        # Accessible states: a search forward along the arcs from the start state.
+        accessible = array('B', bytes(num_states))
+        accessible[start_index] = 1
+        stack = [start_index]
+
+        while stack:
+            state_index = stack.pop()
+
+            for arc_index in range(arc_offsets[state_index], arc_offsets[state_index + 1]):
+                target = arc_targets[arc_index]
+
+                if not accessible[target]:
+                    accessible[target] = 1
+                    stack.append(target)
+
+        # Coaccessible states: a search backward along the arcs from the accepting states, which needs the sources of the arcs
+        # into each state. Only arcs between accessible states matter.
+        sources: dict[int, list[int]] = {}
+
+        for state_index in range(num_states):
+            if not accessible[state_index]:
+                continue
+
+            for arc_index in range(arc_offsets[state_index], arc_offsets[state_index + 1]):
+                sources.setdefault(arc_targets[arc_index], []).append(state_index)
+
+        connected = array('B', bytes(num_states))
+        stack = [state_index for state_index in range(num_states) if accessible[state_index] and self.final_flags[state_index]]
+
+        for state_index in stack:
+            connected[state_index] = 1
+
+        while stack:
+            state_index = stack.pop()
+
+            for source in sources.get(state_index, ()):
+                if not connected[source]:
+                    connected[source] = 1
+                    stack.append(source)
+
+        return connected
+
+    def trim(self, start_index: int) -> _CompiledFst: # pylint: disable=too-many-locals
+        """
+        Returns a copy of the FST without the states and arcs that aren't on any path from the start state to an accepting state.
+
+        Parameters
+        ----------
+        start_index : int
+            The index of the start state. The start state is always kept, even if no accepting state can be reached from it.
+
+        Returns
+        -------
+        _CompiledFst
+            The trimmed FST. States keep their relative order and their state IDs, and arcs keep their relative order, so the arcs
+            of every state are still sorted. The symbol table is shared with this FST.
+        """
+
+        connected = self.get_connected_states(start_index)
+        connected[start_index] = 1
+
+        kept_states = [state_index for state_index in range(self.num_states) if connected[state_index]]
+        new_indices = array('q', [-1]) * self.num_states
+
+        for new_index, state_index in enumerate(kept_states):
+            new_indices[state_index] = new_index
+
+        arc_offsets = array('q', [0])
+        kept_arcs = array('q')
+        new_arc_indices = array('q', [-1]) * self.num_arcs
+
+        for state_index in kept_states:
+            for arc_index in range(self.arc_offsets[state_index], self.arc_offsets[state_index + 1]):
+                if connected[self.arc_targets[arc_index]]:
+                    new_arc_indices[arc_index] = len(kept_arcs)
+                    kept_arcs.append(arc_index)
+
+            arc_offsets.append(len(kept_arcs))
+
+        def keep(column: _WeightColumn, indices: Iterable[int]) -> _WeightColumn:
+            if isinstance(column, _BooleanColumn):
+                return _BooleanColumn(keep(column.column, indices)) # type: ignore
+
+            values = [column[index] for index in indices]
+            return values if isinstance(column, list) else array(_get_typecode(column), values)
+
+        # The output order of a state lists the same arcs as the state, so filtering it keeps each state's arcs sorted by output.
+        kept_positions = [position for position, arc_index in enumerate(self.arc_output_order) if new_arc_indices[arc_index] != -1]
+        arc_output_order = array('q', [new_arc_indices[self.arc_output_order[position]] for position in kept_positions])
+
+        return _CompiledFst(
+            symbol_table=self.symbol_table,
+            multichar_symbol_ids=self.multichar_symbol_ids,
+            state_ids=keep(self.state_ids, kept_states), # type: ignore
+            final_flags=keep(self.final_flags, kept_states), # type: ignore
+            final_weights=None if self.final_weights is None else keep(self.final_weights, kept_states),
+            arc_offsets=arc_offsets,
+            arc_targets=array(_get_typecode(self.arc_targets), [new_indices[self.arc_targets[arc_index]] for arc_index in kept_arcs]),
+            arc_input_ids=keep(self.arc_input_ids, kept_arcs), # type: ignore
+            arc_output_ids=keep(self.arc_output_ids, kept_arcs), # type: ignore
+            arc_weights=None if self.arc_weights is None else keep(self.arc_weights, kept_arcs),
+            arc_output_order=arc_output_order,
+            arc_output_labels=keep(self.arc_output_labels, kept_positions), # type: ignore
+            weight_kind=self.weight_kind,
+            semiring_name=self.semiring_name,
+        )
+
+    #endregion
+
+
+    #region Creation
+
+    @staticmethod
+    def _get_weight_kind(semiring: Semiring | None, weights: list[Any]) -> int:
+        """
+        Works out how the weights of an FST can be stored.
+
+        Parameters
+        ----------
+        semiring : Semiring | None
+            The semiring the weights were converted with.
+
+        weights : list[Any]
+            Every weight in the FST.
+
+        Returns
+        -------
+        int
+            One of ``_WEIGHTS_NONE``, ``_WEIGHTS_FLOAT``, ``_WEIGHTS_BOOL`` or ``_WEIGHTS_OBJECT``.
+        """
+
+        if semiring is None:
+            return _WEIGHTS_NONE
+
+        if all(isinstance(weight, bool) for weight in weights):
+            return _WEIGHTS_BOOL
+
+        if all(isinstance(weight, (int, float)) and not isinstance(weight, bool) for weight in weights):
+            return _WEIGHTS_FLOAT
+
+        return _WEIGHTS_OBJECT
+
+    @staticmethod
+    def from_att_transitions( # pylint: disable=too-many-locals
+        transitions: dict[int, dict[str, list[_AttInputInfo]]],
+        accepting_states: dict[int, Any],
+        multichar_symbols: set[str],
+        semiring: Semiring | None,
+    ) -> _CompiledFst:
+        """
+        Creates the flat arrays of an FST from the transitions and accepting states read in from an ``.att`` file.
+
+        Parameters
+        ----------
+        transitions : dict[int, dict[str, list[_AttInputInfo]]]
+            The transitions read from the ``.att`` file, keyed by state ID and input symbol.
+
+        accepting_states : dict[int, Any]
+            A dictionary whose keys are accepting state IDs and whose values are the weight of the accepting state.
+
+        multichar_symbols : set[str]
+            The multi-character symbols of the FST.
+
+        semiring : Semiring | None
+            The semiring the weights were converted with.
+
+        Returns
+        -------
+        _CompiledFst
+            The FST as flat arrays. States are ordered by their state ID, and the arcs of a state are sorted by input symbol ID,
+            with arcs that have the same input symbol keeping the order of the ``.att`` file.
+        """
+
+        symbol_table = SymbolTable()
+        intern = symbol_table.add
+
+        # Every state mentioned in the file, including states that only appear as the target of a transition.
+        all_state_ids = set(accepting_states) | set(transitions)
+
+        for state_transitions in transitions.values():
+            for att_inputs in state_transitions.values():
+                all_state_ids.update(att_input.target_state_id for att_input in att_inputs)
+
+        sorted_state_ids = sorted(all_state_ids)
+        state_indices = {state_id: index for index, state_id in enumerate(sorted_state_ids)}
+
+        default_weight = semiring.multiplicative_identity if semiring else None
+        final_weight_list = [accepting_states.get(state_id, default_weight) for state_id in sorted_state_ids]
+
+        arc_offsets = array('q', [0])
+        arc_targets = array('i')
+        arc_input_ids = array('i')
+        arc_output_ids = array('i')
+        arc_weight_list: list[Any] = []
+        arc_output_order = array('q')
+
+        for state_id in sorted_state_ids:
+            # Interning the input symbols as the sort key gives every symbol its ID before the arcs are sorted by it.
+            state_transitions = sorted(transitions.get(state_id, {}).items(), key=lambda item: intern(item[0]))
+
+            for input_symbol, att_inputs in state_transitions:
+                input_id = intern(input_symbol)
+
+                for next_state, output_symbol, weight in att_inputs:
+                    arc_targets.append(state_indices[next_state]) # type: ignore
+                    arc_input_ids.append(input_id)
+                    arc_output_ids.append(intern(output_symbol)) # type: ignore
+                    arc_weight_list.append(weight)
+
+            arc_offsets.append(len(arc_targets))
+
+            # A stable sort, so arcs with the same output symbol keep their relative order.
+            arc_output_order.extend(sorted(range(arc_offsets[-2], arc_offsets[-1]), key=arc_output_ids.__getitem__))
+
+        weight_kind = _CompiledFst._get_weight_kind(semiring, final_weight_list + arc_weight_list)
+        final_weights = arc_weights = None
+
+        if weight_kind == _WEIGHTS_FLOAT:
+            final_weights = array('d', final_weight_list) # type: ignore
+            arc_weights = array('d', arc_weight_list) # type: ignore
+        elif weight_kind == _WEIGHTS_BOOL:
+            final_weights = _BooleanColumn(array('B', final_weight_list)) # type: ignore
+            arc_weights = _BooleanColumn(array('B', arc_weight_list)) # type: ignore
+        elif weight_kind != _WEIGHTS_NONE:
+            final_weights = final_weight_list
+            arc_weights = arc_weight_list
+
+        return _CompiledFst(
+            symbol_table=symbol_table,
+            multichar_symbol_ids=array('i', sorted(intern(symbol) for symbol in multichar_symbols)),
+            state_ids=array('q', sorted_state_ids),
+            final_flags=array('B', [state_id in accepting_states for state_id in sorted_state_ids]),
+            final_weights=final_weights,
+            arc_offsets=arc_offsets,
+            arc_targets=arc_targets,
+            arc_input_ids=arc_input_ids,
+            arc_output_ids=arc_output_ids,
+            arc_weights=arc_weights,
+            arc_output_order=arc_output_order,
+            arc_output_labels=array('i', map(arc_output_ids.__getitem__, arc_output_order)),
+            weight_kind=weight_kind,
+            semiring_name=type(semiring).__name__ if semiring else '',
+        )
+
+    #endregion
+
+
+    #region Reading and Writing
+
+    @staticmethod
+    def _weights_to_bytes(weights: _WeightColumn) -> bytes:
+        """
+        Returns the bytes a weight column is stored as.
+
+        Parameters
+        ----------
+        weights : _WeightColumn
+            Either ``final_weights`` or ``arc_weights``.
+
+        Returns
+        -------
+        bytes
+            The doubles of a real-valued column, or one byte per weight for a boolean column.
+        """
+
+        if isinstance(weights, list):
+            return array('B', weights).tobytes()
+
+        return weights.tobytes()
+
+    def _get_sections(self) -> list[bytes]:
+        """
+        Returns the sections of the payload in the order they are written.
+
+        Returns
+        -------
+        list[bytes]
+            The unpadded bytes of every section.
+        """
+
+        encoded_symbols = [symbol.encode('utf-8') for symbol in self.symbol_table]
+        symbol_offsets = array('q', [0])
+
+        for encoded_symbol in encoded_symbols:
+            symbol_offsets.append(symbol_offsets[-1] + len(encoded_symbol))
+
+        sections = [
+            symbol_offsets.tobytes(),
+            b''.join(encoded_symbols),
+            self.multichar_symbol_ids.tobytes(),
+            self.state_ids.tobytes(),
+            self.final_flags.tobytes(),
+        ]
+
+        if self.final_weights is not None:
+            sections.append(_CompiledFst._weights_to_bytes(self.final_weights))
+
+        sections.extend([
+            self.arc_offsets.tobytes(),
+            self.arc_targets.tobytes(),
+            self.arc_input_ids.tobytes(),
+            self.arc_output_ids.tobytes(),
+        ])
+
+        if self.arc_weights is not None:
+            sections.append(_CompiledFst._weights_to_bytes(self.arc_weights))
+
+        sections.append(self.arc_output_order.tobytes())
+        sections.append(self.arc_output_labels.tobytes())
+
+        return sections
+
+    def write(self, file_path: str | os.PathLike, fingerprint: _SourceFingerprint) -> None:
+        """
+        Writes the FST to a compiled file.
+
+        The file is first written next to its destination and then moved into place, so that a process reading the file
+        never sees it half-written.
+
+        Parameters
+        ----------
+        file_path : str | os.PathLike
+            The path of the compiled file to write.
+
+        fingerprint : _SourceFingerprint
+            The fingerprint of the ``.att`` file the FST was compiled from.
+
+        Raises
+        ------
+        CompiledFstError
+            This error is raised if the weights of the FST can't be stored in a compiled file. Only boolean and real-valued
+            weights can be stored.
+        """
+
+        if self.weight_kind == _WEIGHTS_OBJECT:
+            raise CompiledFstError(f"The weights of the semiring {self.semiring_name} can't be stored in a compiled FST.")
+
+        sections = self._get_sections()
+        payload = bytearray()
+
+        for section in sections:
+            payload += section
+            payload += bytes(-len(payload) % _ALIGNMENT)
+
+        header = _HEADER.pack(
+            _MAGIC,
+            _FORMAT_VERSION,
+            self.weight_kind,
+            sys.byteorder == 'big',
+            self.num_states,
+            self.num_arcs,
+            len(self.symbol_table),
+            len(self.multichar_symbol_ids),
+            len(sections[1]),
+            fingerprint.size,
+            fingerprint.mtime_ns,
+            fingerprint.sha256,
+            zlib.crc32(payload),
+            self.semiring_name.encode('utf-8'),
+            0,
+        )
+
+        temporary_path = f'{file_path}.{os.getpid()}.tmp'
+
+        try:
+            with open(temporary_path, 'wb') as compiled_file:
+                compiled_file.write(header)
+                compiled_file.write(payload)
+
+            os.replace(temporary_path, file_path)
+
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    @staticmethod
+    def read(file_path: str | os.PathLike, *, memory_map: bool = False, verify: bool = True) -> _CompiledFst: # pylint: disable=too-many-locals
+        """
+        Reads an FST from a compiled file.
+
+        Parameters
+        ----------
+        file_path : str | os.PathLike
+            The path to the compiled file.
+
+        memory_map : bool, optional
+            Whether to map the file into memory and view its columns in place, rather than copy them into arrays. The pages of a
+            mapped file are shared by every process that maps it, so any number of processes can load the same FST for the memory of
+            one. Default is ``False``.
+
+        verify : bool, optional
+            Whether to check the payload against its checksum, which reads the whole file. Not checking it lets a mapped file be
+            loaded without reading the pages of any state, at the risk of traversing a corrupt file. Default is ``True``.
+
+        Returns
+        -------
+        _CompiledFst
+            The FST as flat arrays, or as read-only views over the mapped file.
+
+        Raises
+        ------
+        CompiledFstError
+            This error is raised if the file is not a valid compiled FST, or if its contents don't match its checksum.
+
+        Note
+        -----
+        A mapped file must not be changed in place while it's in use. ``write`` never does so, as it replaces the whole file, and the
+        mapping keeps the contents of the replaced file. A file written on a machine of the other byte order is copied and swapped,
+        since it can't be viewed in place.
+        """
+
+        with open(file_path, 'rb') as compiled_file:
+            if memory_map and os.fstat(compiled_file.fileno()).st_size > 0:
+                data = memoryview(mmap.mmap(compiled_file.fileno(), 0, access=mmap.ACCESS_READ))
+            else:
+                data = memoryview(compiled_file.read())
+
+        header = _CompiledHeader.unpack(data, file_path)
+        payload = data[_HEADER.size:]
+
+        if verify and zlib.crc32(payload) != header.checksum:
+            raise CompiledFstError(f"The file {os.path.basename(file_path)} is corrupt; its checksum doesn't match its contents.")
+
+        offset = 0
+        swap_bytes = header.big_endian != (sys.byteorder == 'big')
+
+        def read_section(typecode: str, length: int) -> _Column:
+            nonlocal offset
+
+            section = array(typecode)
+            size = length * section.itemsize
+
+            if offset + size > len(payload):
+                raise CompiledFstError(f"The file {os.path.basename(file_path)} is truncated.")
+
+            start = offset
+            offset += size + (-size % _ALIGNMENT)
+
+            if memory_map and not swap_bytes:
+                return payload[start:start + size].cast(typecode) # type: ignore
+
+            section.frombytes(payload[start:start + size])
+
+            if swap_bytes:
+                section.byteswap()
+
+            return section
+
+        symbol_offsets = read_section('q', header.num_symbols + 1)
+        symbol_blob = read_section('B', header.symbol_blob_size).tobytes()
+        symbols = [
+            symbol_blob[symbol_offsets[index]:symbol_offsets[index + 1]].decode('utf-8')
+            for index in range(header.num_symbols)
+        ]
+        symbol_table = SymbolTable(symbols)
+
+        if not symbols or symbols[0] != EPSILON or len(symbol_table) != len(symbols):
+            raise CompiledFstError(f"The file {os.path.basename(file_path)} has an invalid symbol table.")
+
+        def read_weights(length: int) -> _WeightColumn | None:
+            if header.weight_kind == _WEIGHTS_FLOAT:
+                return read_section('d', length)
+
+            # Boolean weights are read through their bytes, so a mapped file isn't read until they're used.
+            if header.weight_kind == _WEIGHTS_BOOL:
+                return _BooleanColumn(read_section('B', length))
+
+            return None
+
+        multichar_symbol_ids = read_section('i', header.num_multichar_symbols)
+        state_ids = read_section('q', header.num_states)
+        final_flags = read_section('B', header.num_states)
+        final_weights = read_weights(header.num_states)
+        arc_offsets = read_section('q', header.num_states + 1)
+        arc_targets = read_section('i', header.num_arcs)
+        arc_input_ids = read_section('i', header.num_arcs)
+        arc_output_ids = read_section('i', header.num_arcs)
+        arc_weights = read_weights(header.num_arcs)
+        arc_output_order = read_section('q', header.num_arcs)
+        arc_output_labels = read_section('i', header.num_arcs)
+
+        return _CompiledFst(
+            symbol_table=symbol_table,
+            multichar_symbol_ids=multichar_symbol_ids,
+            state_ids=state_ids,
+            final_flags=final_flags,
+            final_weights=final_weights,
+            arc_offsets=arc_offsets,
+            arc_targets=arc_targets,
+            arc_input_ids=arc_input_ids,
+            arc_output_ids=arc_output_ids,
+            arc_weights=arc_weights,
+            arc_output_order=arc_output_order,
+            arc_output_labels=arc_output_labels,
+            weight_kind=header.weight_kind,
+            semiring_name=header.semiring_name,
+        )
+
+    #endregion
+
+
+class _StateCache[V](dict[int, V]):
+    """
+    A dictionary keyed by state index that holds at most a given number of states, so that what is decoded for the states a
+    traversal reaches takes memory in proportion to the states in use rather than to the size of the FST.
+
+    Once the cache is full, adding a state evicts the state that was added longest ago. Lookups are those of a plain ``dict``, so
+    that reading from the cache costs no more than an unbounded one; an evicted state is simply decoded again when it's next
+    reached.
+
+    Attributes
+    ----------
+    max_size : int | None
+        The most states the cache holds, or ``None`` if it holds every state added to it.
+
+    Note
+    -----
+    A cache is shared by every traversal of its FST, including traversals run from many threads at once. Adding states and
+    clearing the cache take a lock, so that two threads never evict the same state; lookups don't need it.
+    """
+
+    def __init__(self, max_size: int | None = None) -> None:
+        """
+        Initializes an empty cache.
+
+        Parameters
+        ----------
+        max_size : int | None, optional
+            The most states the cache holds. ``0`` keeps nothing. Default is ``None``, which never evicts.
+        """
+
+        super().__init__()
+
+        self.max_size: int | None = max_size
+        """The most states the cache holds, or ``None`` if it holds every state added to it."""
+
+        self._lock: threading.Lock = threading.Lock()
+        """Held while the cache is changed, so that concurrent traversals don't evict the same state."""
+
+    def __setitem__(self, state_index: int, value: V) -> None:
+        """Adds a state to the cache, evicting the oldest state if the cache is full."""
+
+        if self.max_size is not None and self.max_size <= 0:
+            return
+
+        with self._lock:
+            if self.max_size is not None and state_index not in self and len(self) >= self.max_size:
+                self.pop(next(iter(self), -1), None)
+
+            super().__setitem__(state_index, value)
+
+    def clear(self) -> None:
+        """Removes every state from the cache."""
+
+        with self._lock:
+            super().clear()
+
+
+class _ArcIndex: # pylint: disable=too-few-public-methods
+    """
+    Finds the arcs of a state that have a given label (i.e., input or output symbol ID) without scanning every arc of the state.
+
+    The index is laid over the flat arrays of a ``_CompiledFst``, and needs the arcs of every state to be sorted by label. States
+    with many arcs, like the start state of a lexicon with thousands of stems, get a dictionary from label to arcs, so that finding
+    the arcs that match a symbol takes constant time. The arcs of every other state are found by a binary search of its labels.
+
+    Attributes
+    ----------
+    get_arcs : method
+        Returns the indices of the arcs of a state that have a given label.
+
+    get_candidate_arcs : method
+        Returns the indices of the arcs of a state that can have a given label or epsilon, for a traversal to check.
+
+    Note
+    -----
+    A lazy index only reads the arcs of a state once the state is reached, and may keep the dictionaries of a bounded number of
+    states. Either way, what the index returns for a state never changes, so one index can be shared by any number of concurrent
+    traversals.
+    """
+
+    def __init__( # pylint: disable=too-many-arguments
+        self,
+        arc_offsets: _Column,
+        labels: _Column,
+        order: _Column | None = None,
+        *,
+        lazy: bool = False,
+        cache_size: int | None = None
+    ) -> None:
+        """
+        Builds the index.
+
+        Parameters
+        ----------
+        arc_offsets : _Column
+            The arc offsets of the FST; the arcs of the state with index ``i`` are found at positions ``arc_offsets[i]`` up to
+            ``arc_offsets[i + 1]`` of ``labels``.
+
+        labels : _Column
+            The label of every arc, sorted within each state.
+
+        order : _Column | None, optional
+            The index of the arc at each position of ``labels``, for when the arcs aren't stored in label order. Default is ``None``,
+            which means that the position of every label is the index of its arc.
+
+        lazy : bool, optional
+            Whether to build the dictionary of a state the first time the state is looked up, rather than those of every state now.
+            Default is ``False``.
+
+        cache_size : int | None, optional
+            How many dictionaries a lazy index keeps. Default is ``None``, which keeps all of them.
+        """
+
+        self._arc_offsets: _Column = arc_offsets
+        """The arcs of the state with index ``i`` are at positions ``arc_offsets[i]`` up to ``arc_offsets[i + 1]``."""
+
+        self._labels: _Column = labels
+        """The label of the arc at each position, sorted within each state."""
+
+        self._order: _Column | None = order
+        """The index of the arc at each position; ``None`` if positions are arc indices."""
+
+        self._lazy: bool = lazy
+        """Whether the dictionary of a state is built the first time the state is looked up."""
+
+        self._ranges: dict[int, dict[int, tuple[int, int]]] = _StateCache(cache_size) if lazy else {}
+        """For the states with at least ``_INDEXED_FAN_OUT`` arcs, the start and end positions of the arcs with each label."""
+
+        if not lazy:
+            for state_index in range(len(arc_offsets) - 1):
+                self._index_state(state_index)
+
+    def _index_state(self, state_index: int) -> dict[int, tuple[int, int]] | None:
+        """
+        Builds the dictionary of a state from label to the positions of its arcs with that label, if the state has enough arcs.
+
+        Parameters
+        ----------
+        state_index : int
+            The index of the state.
+
+        Returns
+        -------
+        dict[int, tuple[int, int]] | None
+            The start and end positions of the arcs with each label, or ``None`` if the state has fewer than ``_INDEXED_FAN_OUT`` arcs.
+        """
+
+        labels = self._labels
+        start, end = self._arc_offsets[state_index], self._arc_offsets[state_index + 1]
+
+        if end - start < _INDEXED_FAN_OUT:
+            return None
+
+        state_ranges: dict[int, tuple[int, int]] = {}
+
+        while start < end:
+            label = labels[start]
+            label_end = bisect_right(labels, label, start, end)
+            state_ranges[label] = (start, label_end)
+            start = label_end
+
+        self._ranges[state_index] = state_ranges
+        return state_ranges
+
+    def get_arcs(self, state_index: int, label: int) -> range | _Column:
+        """
+        Returns the indices of the arcs of a state that have a given label.
+
+        Parameters
+        ----------
+        state_index : int
+            The index of the state whose arcs are wanted.
+
+        label : int
+            The label the arcs must have.
+
+        Returns
+        -------
+        range | _Column
+            The indices of the matching arcs, in the order they are stored in.
+        """
+
+        state_ranges = self._ranges.get(state_index)
+
+        if state_ranges is None and self._lazy:
+            state_ranges = self._index_state(state_index)
+
+        if state_ranges is not None:
+            start, end = state_ranges.get(label, (0, 0))
+        else:
+            labels = self._labels
+            state_end = self._arc_offsets[state_index + 1]
+            start = bisect_left(labels, label, self._arc_offsets[state_index], state_end)
+            end = bisect_right(labels, label, start, state_end)
+
+        if self._order is None:
+            return range(start, end)
+
+        return self._order[start:end]
+
+    def get_candidate_arcs(self, state_index: int, label: int) -> Iterable[int]:
+        """
+        Returns the indices of the arcs of a state that can have a given label or epsilon, which is what a traversal follows.
+
+        For a state with a dictionary, these are exactly its epsilon arcs followed by its arcs with the label. A state without one
+        has so few arcs that checking each of them is faster than any lookup, and so all of its arcs are returned.
+
+        Parameters
+        ----------
+        state_index : int
+            The index of the state whose arcs are wanted.
+
+        label : int
+            The label the traversal is looking for.
+
+        Returns
+        -------
+        Iterable[int]
+            The indices of the arcs, which the caller must still check the labels of.
+        """
+
+        state_ranges = self._ranges.get(state_index)
+
+        if state_ranges is None and self._lazy:
+            state_ranges = self._index_state(state_index)
+
+        if state_ranges is None:
+            start, end = self._arc_offsets[state_index], self._arc_offsets[state_index + 1]
+            return range(start, end) if self._order is None else self._order[start:end]
+
+        epsilon_start, epsilon_end = state_ranges.get(EPSILON_ID, (0, 0))
+        start, end = state_ranges.get(label, (0, 0)) if label != EPSILON_ID else (0, 0)
+
+        if self._order is None:
+            return chain(range(epsilon_start, epsilon_end), range(start, end))
+
+        return chain(self._order[epsilon_start:epsilon_end], self._order[start:end])
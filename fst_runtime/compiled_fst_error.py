@@ -0,0 +1,38 @@
+"""
+compiled_fst_error
+
+This module defines custom exceptions used for handling errors specific to the compiled binary FST format (.attc file) processing.
+
+Attributes
+----------
+CompiledFstError : class
+    Exception raised for errors in reading or writing a compiled FST file (.attc file).
+"""
+
+
+class CompiledFstError(Exception):
+    """
+    Exception raised for errors in reading or writing a compiled FST file (.attc file).
+
+    Parameters
+    ----------
+    message : str
+        The error message to be displayed.
+
+    Attributes
+    ----------
+    message : str
+        The error message to be displayed.
+    """
+
+    def __init__(self, message: str) -> None:
+        """
+        Initializes the CompiledFstError with a given error message.
+
+        Parameters
+        ----------
+        message : str
+            The error message to be displayed.
+        """
+        self.message = message
+        super().__init__(self.message)
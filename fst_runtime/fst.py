@@ -1,3 +1,6 @@
+# pylint: disable=too-many-lines
+# The ``Fst`` class is the single entry point of the package, and its documentation makes up most of this module.
+
 """
 This module provides the main class ``Fst`` which defines a finite-state transducer (FST) in-memory as a directed graph.
 
@@ -6,6 +9,15 @@ Attributes
 Fst : class
     Defines an FST in-memory as a directed graph.
 
+FstOutput : class
+    Holds one output of a query of the FST.
+
+FstResults : class
+    The outputs of a query, along with whether a limit of the query cut them short.
+
+TrimReport : class
+    Reports what trimming an FST removed.
+
 EPSILON : str
     The epsilon character as encoded in the AT&T ``.att`` FST format; this representation is the string: ``@0@``.
 """
@@ -14,32 +26,70 @@ EPSILON : str
 #region Imports and Constants
 
 from __future__ import annotations
+from bisect import bisect_left
 from collections import defaultdict
-from dataclasses import dataclass, field, replace as dataclass_replace
-from itertools import product as cartesian_product
+from dataclasses import InitVar, dataclass, field
+from functools import lru_cache, partial
+import heapq
+from itertools import chain, count, islice, product as cartesian_product
 import json
 import os
+import shutil
 import sys
-from typing import Any, Generator, Iterable, Iterator
+import tempfile
+from time import monotonic
+from typing import Any, Callable, Generator, Iterable, Iterator
+import weakref
 
 from fst_runtime import logger
 from fst_runtime.att_format_error import AttFormatError
-from fst_runtime.semiring import Semiring
-from fst_runtime.tokenize_input import tokenize_input_string
+from fst_runtime.compiled_fst import (
+    COMPILED_FILE_EXTENSION, _ArcIndex, _Column, _CompiledFst, _CompiledHeader, _SourceFingerprint, _StateCache, get_sidecar_path
+)
+from fst_runtime.compiled_fst_error import CompiledFstError
+from fst_runtime.parallel import _WorkerSettings, map_queries
+from fst_runtime.semiring import LogSemiring, Semiring, TropicalSemiring
+from fst_runtime.shortest_distance import shortest_distance
+from fst_runtime.symbol_table import EPSILON, EPSILON_ID, SymbolTable
+from fst_runtime.tokenize_input import Tokenizer
+
+_SymbolPath = tuple[int, ...]
+"""The symbol IDs of the output built up along a path through the FST, in the order they are to be joined."""
+
+_SharedPath = tuple[_SymbolPath, '_SharedPath'] | None
+"""
+The symbol IDs of the output built up along a path through the FST, as a linked list of the parts emitted by each step, last part
+first; ``None`` is the empty path. Paths that branch off the same path share it, rather than each holding a copy of it. The parts
+are only joined into a ``_SymbolPath`` once the path reaches a match (see ``Fst._join_path``).
+"""
+
+_EpsilonClosure = list[tuple[int, _SymbolPath, Any, int]]
+"""
+The states reachable from a state by epsilon arcs alone; one entry per epsilon path, as the state reached, the symbol IDs emitted
+along the way, the weight of the path, and the number of arcs in it.
+"""
 
-EPSILON: str = "@0@"
-"""This is the epsilon character as encoded in the AT&T ``.att`` FST format."""
+_Expansion = tuple[list[tuple[_SymbolPath, Any, int]], list[tuple[int, '_QueryTrie', _SymbolPath, Any, int]]]
+"""
+Where a traversal can go from a state and a node of the query trie, relative to the path that reached them: the matches, as the
+symbol IDs emitted, the weight (including the final weight), and the number of arcs to reach an accepting state by epsilon arcs;
+and the steps, as the state and query node reached by consuming a token, along with the symbol IDs emitted, weight and number of
+arcs to get there.
+"""
 
 #endregion
 
 
 #region Helper Classes
 
-@dataclass
+@dataclass(slots=True)
 class FstOutput:
     """
     A dataclass for holding the output from a given node to another in an FST.
 
+    Outputs are created once per result, so the class has slots instead of an instance dictionary, which makes them smaller and
+    quicker to create.
+
     Attributes
     ----------
     ouput_string : str
@@ -77,7 +127,7 @@ class FstOutput:
         dict[str, Any]
             The dictionary representation of this object.
         '''
-        return self.__dict__
+        return {'output_string': self.output_string, 'path_weight': self.path_weight, 'input_string': self.input_string}
 
     @staticmethod
     def json_serialize_outputs(outputs: Iterable[FstOutput]) -> str | None:
@@ -103,6 +153,113 @@ class FstOutput:
         return json.dumps(values)
 
 
+class FstResults(Iterator[FstOutput]):
+    """
+    The outputs of a query, given one at a time as they're found, along with whether a limit of the query cut them short.
+
+    This is what the query functions return (see ``Fst.down_generation``); it's iterated over just like a generator.
+
+    Attributes
+    ----------
+    truncated : bool
+        Whether the query had more outputs than ``max_results``, or was stopped by ``max_states_visited`` or ``deadline``.
+
+    states_visited : int
+        The number of states the query has visited so far.
+
+    close : method
+        Stops the query, e.g. to give up on it before it is finished.
+
+    Examples
+    --------
+    A query that may run long can be bounded, and checked for having been cut short once it's done::
+
+        results = fst.up_analysis('walking', max_results=10, deadline=time.monotonic() + 0.05)
+        analyses = list(results)
+
+        if results.truncated:
+            ...
+    """
+
+    def __init__(self, outputs: Generator[FstOutput], budget: _QueryBudget | None = None) -> None:
+        """
+        Initializes the results with the outputs of a query, and the budget that limits it.
+
+        Parameters
+        ----------
+        outputs : Generator[FstOutput]
+            The outputs of the query.
+
+        budget : _QueryBudget | None, optional
+            The limits of the query, which keep track of whether it has been cut short. Default is None, which is a query without
+            limits.
+        """
+
+        self._outputs = outputs
+        """The outputs of the query."""
+
+        self._budget = budget
+        """The limits of the query, which keep track of whether it has been cut short."""
+
+    def __iter__(self) -> FstResults:
+        """Returns the results themselves, since they're an iterator."""
+        return self
+
+    def __next__(self) -> FstOutput:
+        """Returns the next output of the query, finding it first."""
+        return next(self._outputs)
+
+    @property
+    def truncated(self) -> bool:
+        """
+        Whether the query had more outputs than ``max_results``, or was stopped by ``max_states_visited`` or ``deadline`` (in which
+        case there may have been more outputs). This is only final once every output has been taken.
+        """
+        return self._budget is not None and self._budget.truncated
+
+    @property
+    def states_visited(self) -> int:
+        """The number of states the query has visited so far; these are only counted for queries with a limit."""
+        return self._budget.states_visited if self._budget is not None else 0
+
+    def close(self) -> None:
+        """Stops the query, e.g. to give up on it before it is finished. Taking another output afterwards stops the iteration."""
+        self._outputs.close()
+
+
+@dataclass(frozen=True)
+class TrimReport:
+    """
+    A dataclass reporting what trimming an FST (see ``Fst.trim``) removed, and what is left.
+
+    Attributes
+    ----------
+    states_removed : int
+        The number of states that were removed because no path from the start state to an accepting state passes through them.
+
+    arcs_removed : int
+        The number of arcs that were removed because they leave or enter a removed state.
+
+    states_remaining : int
+        The number of states left in the FST.
+
+    arcs_remaining : int
+        The number of arcs left in the FST.
+    """
+
+    states_removed: int
+    """The number of states that were removed because no path from the start state to an accepting state passes through them."""
+
+    arcs_removed: int
+    """The number of arcs that were removed because they leave or enter a removed state."""
+
+    states_remaining: int
+    """The number of states left in the FST."""
+
+    arcs_remaining: int
+    """The number of arcs left in the FST."""
+
+
 @dataclass
 class _AttInputInfo:
     """
@@ -228,745 +385,3018 @@ class _FstEdge:
     weight: Any = field(default=None)
     """This represents a weight on a transition in an FST. The values that this field can take are in the domain of the corresponding semiring."""
 
-#endregion
-
-
-class Fst:
+@dataclass
+class _TraversalDirection:
     """
-    Represents a finite-state transducer as a directed graph.
+    Holds what a traversal needs to walk the FST in one direction: down, which matches input symbols and emits output symbols,
+    or up, which does the reverse.
 
     Attributes
     ----------
-    recursion_limit : int
-        Sets the recursion limit for the generation/analysis functionality, to prevent epsilon cycles from running amok.
+    index : _ArcIndex
+        The index of the arcs by the symbols in ``match_ids``.
 
-    multichar_symbols : set[str]
-        A copy of the set of multi-character symbols defined in the FST.
+    match_ids : _Column
+        The symbol ID of every arc that is matched against a query; an epsilon here consumes nothing from the query.
 
-    down_generation : method
-        Generates wordforms from a lemma and sets of prefix and suffix tags.
+    emit_ids : _Column
+        The symbol ID of every arc that is collected along a path.
 
-    down_generations : method
-        Generates wordforms from many lemmas and common sets of prefix and suffix tags.
+    epsilon_closures : dict[int, _EpsilonClosure]
+        The epsilon closures of the states that have been reached in this direction, keyed by state index.
 
-    up_analysis : method
-        Analyzes a wordform and returns any associated tagged lemmas of the wordform.
+    lookaheads : dict[int, frozenset[int]]
+        The symbol IDs that can be matched next from the states that have been reached in this direction, keyed by state index.
 
-    up_analyses : method
-        Analyzes many wordforms and returns their associated tagged lemmas of each wordform in a dictionary keyed to the wordform.
+    alphabet : frozenset[int]
+        The symbol IDs of every symbol that can be matched in this direction; i.e., every symbol in ``match_ids`` but epsilon.
+
+    symbol_count : InitVar[int | None]
+        If given, the alphabet is taken to be every symbol ID below this but epsilon, rather than read off the arcs, so that a lazily
+        loaded FST doesn't read all of its arcs up front. This only lets through queries that can't match anything.
     """
 
+    index: _ArcIndex
+    """The index of the arcs by the symbols in ``match_ids``."""
 
-    #region Variables and Initialization
+    match_ids: _Column
+    """The symbol ID of every arc that is matched against a query; an epsilon here consumes nothing from the query."""
 
-    _STARTING_STATE = 0
-    """
-    The starting state in the ``.att`` format is represented by ``0`.
-    This is the "top" of the graph, so when you query down, you start here and go down.
-    Down is like walk+GER -> walking.
-    """
+    emit_ids: _Column
+    """The symbol ID of every arc that is collected along a path."""
 
-    _ATT_DEFINES_UNWEIGHTED_ACCEPTING_STATE = 1
-    """One input value on a line means that that line represents an accepting state in the ``.att`` file."""
+    epsilon_closures: dict[int, _EpsilonClosure] = field(default_factory=dict)
+    """The epsilon closures of the states that have been reached in this direction, keyed by state index."""
 
-    _ATT_DEFINES_WEIGHTED_ACCEPTING_STATE = 2
-    """Two input values on a line indicates that the line represents an accepting state with a weight in the ``.att`` file."""
+    lookaheads: dict[int, frozenset[int]] = field(default_factory=dict)
+    """The symbol IDs that can be matched next from the states that have been reached in this direction, keyed by state index."""
 
-    _ATT_DEFINES_UNWEIGHTED_TRANSITION = 4
-    """Four input values on a line mean that the line represents an unweighted transition in the ``.att`` file."""
+    alphabet: frozenset[int] = field(init=False)
+    """The symbol IDs of every symbol that can be matched in this direction; i.e., every symbol in ``match_ids`` but epsilon."""
 
-    _ATT_DEFINES_WEIGHTED_TRANSITION = 5
-    """Five input values on a line mean that the line represents a weighted transition in the ``.att`` file."""
+    symbol_count: InitVar[int | None] = None
+    """If given, the alphabet is every symbol ID below this but epsilon, rather than read off the arcs."""
+
+    def __post_init__(self, symbol_count: int | None) -> None:
+        """Collects the alphabet of the direction from the symbols of its arcs, or from the symbol table if it is given."""
 
-    def __init__(self, att_file_path: str, *, semiring: Semiring | None = None, recursion_limit: int | None = None) -> None:
+        if symbol_count is None:
+            self.alphabet = frozenset(self.match_ids) - {EPSILON_ID}
+        else:
+            self.alphabet = frozenset(range(EPSILON_ID + 1, symbol_count))
+
+    def accepts_symbols(self, symbol_ids: Iterable[int]) -> bool:
         """
-        Initializes the FST via the provided ``.att`` file.
+        Returns whether every symbol of a query is in the alphabet of the direction. If not, the query can't match any path.
 
         Parameters
         ----------
-        att_file_path : str
-            The path to the ``.att`` file containing the FST description.
-
-        semiring: Semiring | None, optional
-            The semiring over which the weights in the FST are defined.
+        symbol_ids : Iterable[int]
+            The symbol IDs of the tokens of the query.
 
-        recursion_limit : int | None, optional
-            The recursion limit for the generation/analysis functionality. Default is ``None``, which leaves it as the python default of 1000.
+        Returns
+        -------
+        bool
+            ``True`` if every symbol can be matched by some arc, and ``False`` if one of them can't, e.g. because it's unknown.
         """
+        return self.alphabet.issuperset(symbol_ids)
 
-        if not att_file_path:
-            logger.error("Failed to provide valid path to input file. Example: ``/path/to/fst.att``.")
-            sys.exit(1)
 
-        if not str(att_file_path).endswith('.att'):
-            logger.error("Provided file path does not point to a ``.att`` file. Example: ``/path/to/fst.att``.")
-            sys.exit(1)
+@dataclass(slots=True)
+class _QueryTrie:
+    """
+    Holds the tokenized queries of a traversal as a trie of symbol IDs, so that queries which start with the same tokens share
+    the part of the walk over those tokens.
 
-        self._start_state: _FstNode = _FstNode(-1, False, [], [])
-        """This is the entry point into the FST. This is functionally like the root of a tree (even though this is a graph, not a tree)."""
+    Attributes
+    ----------
+    children : dict[int, _QueryTrie]
+        The nodes that follow this one, keyed by the symbol ID of the next token.
 
-        self._accepting_states: dict[int, _FstNode] = {}
-        """This dictionary holds all the accepting states of the FST."""
+    queries : list[str]
+        The queries whose tokens end at this node.
 
-        self._multichar_symbols: set[str] = set()
-        """This set represents all the multi-character symbols that have been defined in the FST."""
+    add : method
+        Adds a tokenized query to the trie.
 
-        self._semiring: Semiring | None = semiring
-        """This holds the semiring used to perform weight arithmetic on paths in the FST."""
+    single : static method
+        Creates the trie of a single tokenized query.
+    """
 
-        self._recursion_limit: int | None = recursion_limit
-        """This sets the recursion limit for the generation/analysis functionality, so that epsilon cycles don't run amok."""
+    children: dict[int, _QueryTrie] = field(default_factory=dict)
+    """The nodes that follow this one, keyed by the symbol ID of the next token."""
 
-        self._create_graph(att_file_path)
+    queries: list[str] = field(default_factory=list)
+    """The queries whose tokens end at this node."""
 
-    @property
-    def multichar_symbols(self) -> set[str]:
+    def add(self, symbol_ids: Iterable[int], query: str) -> None:
         """
-        Public getter for the multichar_symbols variable.
+        Adds a tokenized query to the trie.
 
-        Returns
-        -------
-        set[str]
-            A copy of the set of multi-character symbols.
-        """
-        return self._multichar_symbols.copy()
-    
-    @property
-    def recursion_limit(self) -> int | None:
-        """
-        Public getter for the recursion_limit variable.
+        Parameters
+        ----------
+        symbol_ids : Iterable[int]
+            The symbol IDs of the tokens of the query.
 
-        Returns
-        -------
-        int
-            The recursion limit that has been set. A value less than 1 represents that no recursion limit has been set,
-            and so the current system recursion limit will be used (default for Python applications).
+        query : str
+            The query itself, which is reported with the outputs that match it.
         """
-        return self._recursion_limit
 
-    @recursion_limit.setter
-    def recursion_limit(self, new_recursion_limit: int | None) -> None:
-        """
-        Public setter for the recursion_limit variable.
+        node = self
 
-        Parameters
-        ----------
-        new_recursion_limit : int
-            The new value to set the recursion limit to.
-        """
-        self._recursion_limit = new_recursion_limit
+        for symbol_id in symbol_ids:
+            child = node.children.get(symbol_id)
 
-    #endregion
+            if child is None:
+                child = node.children[symbol_id] = _QueryTrie()
 
+            node = child
 
-    #region Graph Creation
+        node.queries.append(query)
 
-    def _get_or_create_node(self, state_id: int, nodes: dict[int, _FstNode], accepting_states: dict[int, Any]) -> _FstNode:
+    @staticmethod
+    def single(symbol_ids: Iterable[int], query: str) -> _QueryTrie:
         """
-        Tries to get a node from the dictionary, and if it doesn't exist, creates it first, then returns it.
+        Creates the trie of a single tokenized query.
 
         Parameters
         ----------
-        state_id : int
-            The unique identifier for the state.
-
-        nodes : dict[int, _FstNode]
-            The dictionary containing all the nodes, keyed by their state IDs.
+        symbol_ids : Iterable[int]
+            The symbol IDs of the tokens of the query.
 
-        accepting_states : dict[int, Any]
-            A dictionary whose keys are the IDs of the accepting states, and whose values are the weights of those accepting states.
+        query : str
+            The query itself.
 
         Returns
         -------
-        _FstNode
-            The node corresponding to the given state ID.
+        _QueryTrie
+            The root of the trie.
         """
-        try:
-            node = nodes[state_id]
-        except KeyError:
-            is_accepting_state = state_id in accepting_states
 
-            try:
-                weight = accepting_states[state_id]
-            except KeyError:
-                weight = self._semiring.multiplicative_identity if self._semiring else None
+        root = _QueryTrie()
+        root.add(symbol_ids, query)
+        return root
 
-            node = _FstNode(state_id, is_accepting_state, final_state_weight=weight)
-            nodes[state_id] = node
 
-            if is_accepting_state and node.id not in self._accepting_states:
-                self._accepting_states[node.id] = node
+@dataclass(frozen=True, slots=True)
+class _QueryOptions:
+    """
+    Holds how a query walks the FST, as set by the keyword arguments of the query functions. See ``Fst.down_generation``.
 
-        return node
+    Attributes
+    ----------
+    shared_prefixes : bool
+        Whether to walk all the queries of a generation at once, sharing the walk over the tokens they start with.
 
+    memoize : bool
+        Whether to use ``Fst._traverse_memoized`` rather than ``Fst._traverse``.
 
-    def _read_att_file_into_transitions(self, att_file_path: str) \
-        -> tuple[dict[int, dict[str, list[_AttInputInfo]]], dict[int, Any]]: # pylint: disable=too-many-branches,too-many-statements
-        """
-        Reads in all the transition and state information from the file into the ``transitions`` object,
-        and also saves the accepting states of the FST.
+    n_best : int | None
+        If given, the queries are walked by ``Fst._traverse_best``, which finds this many of the best outputs.
 
-        Parameters
-        ----------
-        att_file_path : str
-            The path to the ``.att`` file containing the FST description.
+    aggregate : bool
+        Whether to give each distinct output of a query once, with the weights of its paths added up.
 
-        Returns
-        -------
-        tuple[dict[int, dict[str, list[_AttInputInfo]]], dict[int, Any]]
-            A tuple containing:
-            - ``transitions`` : dict[int, dict[str, list[_AttInputInfo]]]
-                The dictionary of transitions read from the ``.att`` file, keyed by state ID and input symbol.
-            - ``accepting_states`` : dict[int, Any]
-                A dictionary whose keys are accepting state IDs and whose values are the weight of the accepting state.
+    beam : Any
+        If given, partial paths whose weight is worse than the best match found so far times this weight are dropped.
 
-        Raises
-        ------
-        ValueError
-            This exception is raised when trying to parse the states and weights into their respective types.
-        """
+    threshold : Any
+        If given, partial paths whose weight is worse than this weight are dropped.
 
-        # See comment in ``_create_graph`` for what this object is.
-        transitions: dict[int, dict[str, list[_AttInputInfo]]] = defaultdict(dict)
-        accepting_states: dict[int, Any] = {}
+    budget : _QueryBudget | None
+        If given, the limits of the query, which stop the traversal once it has visited too many states or run out of time.
+    """
 
-        with open(att_file_path, encoding='utf-8') as att_file:
+    shared_prefixes: bool = False
+    """Whether to walk all the queries of a generation at once, sharing the walk over the tokens they start with."""
 
-            # Parse file into FST graph object.
-            for line in att_file:
-                
-                # Lines in the AT&T format are tab separated.
-                # No .strip() in case whitespace character is an output. This is very important.
-                att_line_items = line.replace('\n', '').split('\t')
-                num_defined_items = len(att_line_items)
+    memoize: bool = False
+    """Whether to use ``Fst._traverse_memoized`` rather than ``Fst._traverse``."""
 
-                # Unweighted accepting state read in only.
-                if num_defined_items == Fst._ATT_DEFINES_UNWEIGHTED_ACCEPTING_STATE:
-                    state_id = int(att_line_items[0])
-                    weight = None if self._semiring is None else self._semiring.multiplicative_identity
-                    accepting_states[state_id] = weight
+    n_best: int | None = None
+    """If given, the queries are walked by ``Fst._traverse_best``, which finds this many of the best outputs."""
 
-                # Unweighted transition.
-                elif num_defined_items == Fst._ATT_DEFINES_UNWEIGHTED_TRANSITION:
-                    current_state, next_state, input_symbol, output_symbol = att_line_items
+    aggregate: bool = False
+    """Whether to give each distinct output of a query once, with the weights of its paths added up."""
 
-                    if len(input_symbol) > 1:
-                        self._multichar_symbols.add(input_symbol)
+    beam: Any = None
+    """If given, partial paths whose weight is worse than the best match found so far times this weight are dropped."""
 
-                    if len(output_symbol) > 1:
-                        self._multichar_symbols.add(output_symbol)
+    threshold: Any = None
+    """If given, partial paths whose weight is worse than this weight are dropped."""
 
-                    try:
-                        next_state = int(next_state)
-                    except ValueError:
-                        raise
+    budget: _QueryBudget | None = None
+    """If given, the limits of the query, which stop the traversal once it has visited too many states or run out of time."""
 
-                    weight = None if self._semiring is None else self._semiring.multiplicative_identity
-                    info = _AttInputInfo(next_state, output_symbol, weight)
 
-                    try:
-                        transitions[int(current_state)][input_symbol].append(info)
-                    except KeyError:
-                        transitions[int(current_state)][input_symbol] = [info]
+@dataclass(slots=True)
+class _QueryBudget:
+    """
+    Holds the limits of a single query, as set by ``max_results``, ``max_states_visited`` and ``deadline`` (see
+    ``Fst.down_generation``), and keeps track of how much of them the query has used up.
 
-                # Weighted accepting state.
-                elif num_defined_items == Fst._ATT_DEFINES_WEIGHTED_ACCEPTING_STATE:
-                    state_id, weight = att_line_items
+    Attributes
+    ----------
+    max_results : int | None
+        If not ``None``, the most outputs the query gives.
 
-                    state_id = int(state_id)
+    max_states_visited : int | None
+        If not ``None``, the most states the traversal visits.
 
-                    if self._semiring is not None:
-                        weight = self._semiring.convert_string_into_domain(weight)
-                    else:
-                        weight = None
+    deadline : float | None
+        If not ``None``, the ``time.monotonic()`` time at which the traversal stops.
 
-                    accepting_states[state_id] = weight
+    states_visited : int
+        The number of states the traversal has visited so far.
 
-                # Weighted transition.
-                elif num_defined_items == Fst._ATT_DEFINES_WEIGHTED_TRANSITION:
-                    current_state, next_state, input_symbol, output_symbol, weight = att_line_items
+    truncated : bool
+        Whether one of the limits has stopped the query.
 
-                    if len(input_symbol) > 1:
-                        self._multichar_symbols.add(input_symbol)
-                    
-                    if len(output_symbol) > 1:
-                        self._multichar_symbols.add(output_symbol)
+    visit : method
+        Counts a visit to a state, and returns whether the traversal may go on.
 
-                    next_state = int(next_state)
+    create : static method
+        Returns a budget for the given limits, or ``None`` if there are none.
+    """
 
-                    if self._semiring is not None:
-                        weight = self._semiring.convert_string_into_domain(weight)
-                    else:
-                        weight = None
+    max_results: int | None = None
+    """If not ``None``, the most outputs the query gives."""
 
-                    info = _AttInputInfo(next_state, output_symbol, weight)
+    max_states_visited: int | None = None
+    """If not ``None``, the most states the traversal visits."""
 
-                    try:
-                        transitions[int(current_state)][input_symbol].append(info)
-                    except KeyError:
-                        transitions[int(current_state)][input_symbol] = [info]
+    deadline: float | None = None
+    """If not ``None``, the ``time.monotonic()`` time at which the traversal stops."""
 
-                # Invalid input line.
-                else:
-                    logger.error("Invalid line in %s. Offending line: %s", os.path.basename(att_file_path), line)
-                    sys.exit(1)
+    states_visited: int = 0
+    """The number of states the traversal has visited so far."""
 
-        return transitions, accepting_states
+    truncated: bool = False
+    """Whether one of the limits has stopped the query."""
 
+    def visit(self) -> bool:
+        """
+        Counts a visit to a state, and returns whether the traversal may go on.
 
-    # This function is easier to read when not split up into more parts. Too many locals disabled for this reason.
-    def _create_graph(self, att_file_path: str) -> None: # pylint: disable=too-many-locals
+        Returns
+        -------
+        bool
+            ``False``, marking the query as truncated, if visiting the state would exceed ``max_states_visited``, or if the deadline
+            has passed.
         """
-        Create the graph that represents the FST from reading in the provided ``.att`` file.
 
-        This method initializes the FST by reading transitions and accepting states from the
-        specified file, creating all nodes and transitions, and setting the start state.
+        self.states_visited += 1
+
+        if (self.max_states_visited is not None and self.states_visited > self.max_states_visited) or \
+           (self.deadline is not None and monotonic() >= self.deadline):
+            self.states_visited -= 1
+            self.truncated = True
+            return False
+
+        return True
+
+    @staticmethod
+    def create(max_results: int | None, max_states_visited: int | None, deadline: float | None) -> _QueryBudget | None:
+        """
+        Returns a budget for the given limits, or ``None`` if there are none, so that a query without limits doesn't pay for them.
 
         Parameters
         ----------
-        att_file_path : str
-            The path to the ``.att`` file containing the FST description.
+        max_results : int | None
+            The most outputs the query gives.
 
-        Raises
-        ------
-        AttFormatError
-            This error is raised if the FST is ill-defined according to the AT&T format.
+        max_states_visited : int | None
+            The most states the traversal visits.
 
-        Note
-        -----
-        ``transitions`` is a dictionary whose key is the source state number as read in from the ``.att`` file
-        (e.g., 22), and whose value is a dictionary. This child dictionary is keyed to the input symbol from 
-        the ``.att`` file (e.g., 'k' or '+PLURAL'), and whose value is a class that contains the target state 
-        number, the output of the transition, and the weight of that transition.
+        deadline : float | None
+            The ``time.monotonic()`` time at which the traversal stops.
+
+        Returns
+        -------
+        _QueryBudget | None
+            The budget, or ``None`` if every limit is ``None``.
         """
 
-        transitions, accepting_states = self._read_att_file_into_transitions(att_file_path)
+        if max_results is None and max_states_visited is None and deadline is None:
+            return None
 
-        accepting_state_ids: set[int] = set(accepting_states.keys())
-        transition_state_ids: set[int] = set(transitions.keys())
-        all_state_ids: set[int] = set.union(accepting_state_ids, transition_state_ids)
+        return _QueryBudget(max_results, max_states_visited, deadline)
 
-        nodes: dict[int, _FstNode] = {}
 
-        # For every state in the FST, create/get that as a _FstNode object
-        for current_state in all_state_ids:
-            current_node = self._get_or_create_node(current_state, nodes, accepting_states)
+@dataclass(slots=True)
+class _Pruner:
+    """
+    Decides which paths a weighted traversal drops, given a beam and a threshold. A pruner belongs to a single traversal, since it
+    keeps track of the best match that traversal has found.
 
-            # Then, for every transition that leads out from this node, get then next node, create the new transition as an _FstEdge object,
-            # and add that transition to the current node's out transitions and the target node's in transitions.
-            for input_symbol, att_inputs in transitions[current_state].items():
-                for att_input in att_inputs:
+    Attributes
+    ----------
+    semiring : Semiring
+        The semiring of the weights, which decides which of two weights is better, and how a beam is applied.
 
-                    next_state, output_symbol, weight = att_input
-                    next_node = self._get_or_create_node(next_state, nodes, accepting_states) # type: ignore
+    beam : Any
+        If not ``None``, paths whose weight is worse than ``best`` times this weight are dropped.
 
-                    directed_edge = _FstEdge(current_node, next_node, input_symbol, output_symbol, weight) # type: ignore
+    threshold : Any
+        If not ``None``, paths whose weight is worse than this weight are dropped.
 
-                    current_node.out_transitions.append(directed_edge)
-                    next_node.in_transitions.append(directed_edge)
+    best : Any
+        The weight of the best match found so far, or ``None`` before the first one.
 
-        # Set the start state.
-        try:
-            self._start_state = nodes[Fst._STARTING_STATE]
-        except KeyError as key_error:
-            raise AttFormatError("There must be a start state specified that has state number ``0` in the input ``.att`` file.") from key_error
+    allows : method
+        Returns whether a path with a given weight is kept.
 
-    #endregion
+    allows_match : method
+        Returns whether a match with a given weight is kept, and keeps track of the best match.
+    """
 
+    semiring: Semiring
+    """The semiring of the weights, which decides which of two weights is better, and how a beam is applied."""
 
-    # region Down/Generation Methods
+    beam: Any
+    """If not ``None``, paths whose weight is worse than ``best`` times this weight are dropped."""
 
-    def down_generations(
+    threshold: Any
+    """If not ``None``, paths whose weight is worse than this weight are dropped."""
+
+    best: Any = None
+    """The weight of the best match found so far, or ``None`` before the first one."""
+
+    def allows(self, weight: Any) -> bool:
+        """
+        Returns whether a path with a given weight is kept.
+
+        Parameters
+        ----------
+        weight : Any
+            The weight of the path so far.
+
+        Returns
+        -------
+        bool
+            ``False`` if the weight is worse than the threshold, or worse than the best match times the beam.
+        """
+
+        is_better = self.semiring.is_better
+
+        if self.threshold is not None and is_better(self.threshold, weight):
+            return False
+
+        return self.beam is None or self.best is None or not is_better(self.semiring.times(self.best, self.beam), weight)
+
+    def allows_match(self, weight: Any) -> bool:
+        """
+        Returns whether a match with a given weight is kept, and keeps track of the best match.
+
+        Parameters
+        ----------
+        weight : Any
+            The weight of the whole path of the match.
+
+        Returns
+        -------
+        bool
+            Whether the match is kept; see ``allows``.
+        """
+
+        if not self.allows(weight):
+            return False
+
+        if self.best is None or self.semiring.is_better(weight, self.best):
+            self.best = weight
+
+        return True
+
+
+#endregion
+
+
+class Fst: # pylint: disable=too-many-instance-attributes
+    """
+    Represents a finite-state transducer as a directed graph.
+
+    The states and arcs of the graph are stored as flat arrays (see ``fst_runtime.compiled_fst``), with the arcs of each state stored
+    contiguously, and all symbols interned as integer IDs. This takes a small fraction of the memory that an object per state and per
+    arc would, and leaves nothing for the garbage collector to track.
+
+    Attributes
+    ----------
+    recursion_limit : int | None
+        Sets the depth budget of the generation/analysis functionality (i.e., how many arcs a path may follow), to prevent
+        epsilon cycles from running amok.
+
+    epsilon_limit : int | None
+        Sets how many arcs in a row a path may follow without consuming a symbol of the query.
+
+    epsilon_cycle_limit : int | None
+        Sets how many times a run of epsilon arcs may go around a cycle.
+
+    multichar_symbols : set[str]
+        A copy of the set of multi-character symbols defined in the FST.
+
+    symbol_table : SymbolTable
+        The table that assigns every input and output symbol of the FST an integer ID.
+
+    tokenization_cache_info : method
+        Returns the hit, miss and size statistics of the cache of tokenized queries.
+
+    clear_tokenization_cache : method
+        Empties the cache of tokenized queries.
+
+    trim : method
+        Removes the states and arcs that aren't on any path from the start state to an accepting state.
+
+    shortest_distance : method
+        Returns the sum of the weights of the paths from the start state to each state, or from each state to the accepting states.
+
+    compile : static method
+        Compiles an ``.att`` file into a binary ``.attc`` file that can be loaded without re-parsing the ``.att`` file.
+
+    load_compiled : class method
+        Loads an FST from a compiled ``.attc`` file.
+
+    down_generation : method
+        Generates wordforms from a lemma and sets of prefix and suffix tags.
+
+    down_generations : method
+        Generates wordforms from many lemmas and common sets of prefix and suffix tags.
+
+    up_analysis : method
+        Analyzes a wordform and returns any associated tagged lemmas of the wordform.
+
+    up_analyses : method
+        Analyzes many wordforms and returns their associated tagged lemmas of each wordform in a dictionary keyed to the wordform.
+
+    down_generations_parallel : method
+        Generates the wordforms of many lemmas in a pool of worker processes.
+
+    up_analyses_parallel : method
+        Analyzes many wordforms in a pool of worker processes.
+    """
+
+
+    #region Variables and Initialization
+
+    _STARTING_STATE = 0
+    """
+    The starting state in the ``.att`` format is represented by ``0`.
+    This is the "top" of the graph, so when you query down, you start here and go down.
+    Down is like walk+GER -> walking.
+    """
+
+    _DEFAULT_RECURSION_LIMIT = 1000
+    """The depth budget of a traversal when no ``recursion_limit`` is set; i.e., the most arcs a path may follow."""
+
+    _ATT_DEFINES_UNWEIGHTED_ACCEPTING_STATE = 1
+    """One input value on a line means that that line represents an accepting state in the ``.att`` file."""
+
+    _ATT_DEFINES_WEIGHTED_ACCEPTING_STATE = 2
+    """Two input values on a line indicates that the line represents an accepting state with a weight in the ``.att`` file."""
+
+    _ATT_DEFINES_UNWEIGHTED_TRANSITION = 4
+    """Four input values on a line mean that the line represents an unweighted transition in the ``.att`` file."""
+
+    _ATT_DEFINES_WEIGHTED_TRANSITION = 5
+    """Five input values on a line mean that the line represents a weighted transition in the ``.att`` file."""
+
+    def __init__( # pylint: disable=too-many-arguments,too-many-statements
+        self,
+        att_file_path: str,
+        *,
+        semiring: Semiring | None = None,
+        recursion_limit: int | None = None,
+        epsilon_limit: int | None = None,
+        epsilon_cycle_limit: int | None = None,
+        use_cache: bool = False,
+        memory_map: bool = False,
+        lazy: bool = False,
+        state_cache_size: int | None = None,
+        tokenization_cache_size: int | None = 1024,
+        trim: bool = False
+    ) -> None:
+        """
+        Initializes the FST via the provided ``.att`` file, or via a compiled ``.attc`` file created by ``Fst.compile``.
+
+        Parameters
+        ----------
+        att_file_path : str
+            The path to the ``.att`` file containing the FST description, or to a compiled ``.attc`` file.
+
+        semiring: Semiring | None, optional
+            The semiring over which the weights in the FST are defined.
+
+        recursion_limit : int | None, optional
+            The depth budget for the generation/analysis functionality, i.e. the most arcs a path through the FST may follow. Paths that
+            would go deeper are cut off. Default is ``None``, which uses a budget of 1000.
+
+        epsilon_limit : int | None, optional
+            The most arcs in a row that a path may follow without consuming a symbol of the query (e.g., input epsilons when going down).
+            Default is ``None``, which leaves such runs bounded only by ``recursion_limit``.
+
+        epsilon_cycle_limit : int | None, optional
+            How many times a run of epsilon arcs may go around a cycle, i.e. return to a state it has already passed through. ``0``
+            keeps only the epsilon paths that visit each state once, which bounds the work on FSTs whose epsilon cycles branch. ``None``
+            unrolls cycles as far as the ``epsilon_limit`` and ``recursion_limit`` budgets allow, which takes time exponential in those
+            budgets if a cycle branches. Default is ``None``.
+
+        use_cache : bool, optional
+            Whether to cache the FST in a compiled sidecar file next to the ``.att`` file (e.g. ``fst.attc`` for ``fst.att``). If the sidecar
+            exists and the ``.att`` file is unchanged since the sidecar was written, the FST is loaded from the sidecar rather than re-parsing
+            the ``.att`` file. Otherwise, the ``.att`` file is parsed and the sidecar is (re)written. Default is ``False``.
+
+        memory_map : bool, optional
+            Whether to map a compiled file (or sidecar) into memory and traverse it in place, rather than copy it into this process.
+            Every process that maps the same file shares a single copy of the FST, which is how a server with many worker processes
+            should load a large FST. Default is ``False``.
+
+        lazy : bool, optional
+            Whether to load a compiled file (or sidecar) lazily: the file is mapped into memory as with ``memory_map``, but isn't
+            checked against its checksum, and the states are only read and indexed once a query reaches them. Loading then takes
+            about the same time for any size of FST, and the memory used grows with the states in use. Default is ``False``.
+
+        state_cache_size : int | None, optional
+            How many states to keep what has been worked out for, e.g. their epsilon closures and, for a lazy FST, the indexes of their
+            arcs. The state added longest ago is evicted when the cache is full. Default is ``None``, which keeps every state reached.
+
+        tokenization_cache_size : int | None, optional
+            How many tokenized queries to keep, so that a query string that is looked up again isn't tokenized again. The least recently
+            used query is evicted when the cache is full. ``0`` turns the cache off, and ``None`` never evicts. Default is ``1024``.
+
+        trim : bool, optional
+            Whether to remove the states and arcs that aren't on any path from the start state to an accepting state once the FST is
+            loaded (see ``Fst.trim``). What was removed is logged. Default is ``False``.
+
+        Raises
+        ------
+        CompiledFstError
+            This error is raised if a compiled file is invalid, or was compiled with a different semiring than the one provided.
+        """
+
+        if not att_file_path:
+            logger.error("Failed to provide valid path to input file. Example: ``/path/to/fst.att``.")
+            sys.exit(1)
+
+        is_compiled_file = str(att_file_path).endswith(COMPILED_FILE_EXTENSION)
+
+        if not str(att_file_path).endswith('.att') and not is_compiled_file:
+            logger.error("Provided file path does not point to a ``.att`` file. Example: ``/path/to/fst.att``.")
+            sys.exit(1)
+
+        self._semiring: Semiring | None = semiring
+        """This holds the semiring used to perform weight arithmetic on paths in the FST."""
+
+        self._recursion_limit: int | None = recursion_limit
+        """This sets the depth budget for the generation/analysis functionality, so that epsilon cycles don't run amok."""
+
+        self._epsilon_limit: int | None = epsilon_limit
+        """This sets how many arcs in a row a path may follow without consuming a symbol of the query."""
+
+        self._epsilon_cycle_limit: int | None = epsilon_cycle_limit
+        """This sets how many times a run of epsilon arcs may go around a cycle."""
+
+        self._memory_map: bool = memory_map or lazy
+        """This sets whether compiled files are mapped into memory and shared with other processes, rather than copied."""
+
+        self._lazy: bool = lazy
+        """This sets whether compiled files are loaded lazily, reading and indexing their states only once they're reached."""
+
+        self._state_cache_size: int | None = state_cache_size
+        """This sets how many states the epsilon closures, lookaheads and lazy arc indexes are kept for."""
+
+        self._tokenization_cache_size: int | None = tokenization_cache_size
+        """This sets how many tokenized queries are kept, so that worker processes can be given the same cache."""
+
+        self._sidecar: tuple[str, _CompiledHeader] | None = None
+        """
+        The compiled sidecar that this FST was loaded from or written to with ``use_cache``, along with its header. Worker processes
+        load the sidecar for as long as its header is unchanged, since it then holds exactly this FST; see ``_get_worker_settings``.
+        """
+
+        if is_compiled_file:
+            compiled = self._read_compiled_file(att_file_path)
+        elif use_cache:
+            compiled = self._compile_with_cache(att_file_path)
+        else:
+            compiled = Fst._compile_att_file(att_file_path, self._semiring)
+
+        self._compiled: _CompiledFst = compiled
+        """This holds the states, arcs and symbols of the FST as flat arrays. Traversals run directly against these arrays."""
+
+        self._compiled_file_path: str | None = str(att_file_path) if is_compiled_file else None
+        """A compiled file that holds exactly this FST, which worker processes load; see ``_get_worker_settings``."""
+
+        self._weighted: bool = semiring is not None and compiled.arc_weights is not None
+        """
+        Whether the paths of the FST have weights; i.e., whether it has both a semiring and weights on its arcs. The traversals of
+        FSTs without weights skip the semiring arithmetic, and give ``None`` for every weight.
+        """
+
+        self._start_index: int = Fst._get_start_index(compiled)
+        """This is the index of the entry point into the FST. This is functionally like the root of a tree (even though this is a graph)."""
+
+        self._multichar_symbols: set[str] = {compiled.symbol_table.get_symbol(symbol_id) for symbol_id in compiled.multichar_symbol_ids}
+        """This set represents all the multi-character symbols that have been defined in the FST."""
+
+        self._tokenizer: Tokenizer = Tokenizer(self._multichar_symbols)
+        """This splits queries into tokens, respecting the multi-character symbols of the FST. It is built once, when the FST is loaded."""
+
+        self._tokenize: Callable[[str], tuple[int, ...]] = Fst._create_tokenize(self._tokenizer, compiled.symbol_table, tokenization_cache_size)
+        """This tokenizes a query into symbol IDs, keeping the most recently used queries in a bounded cache that belongs to this FST."""
+
+        self._symbol_table: SymbolTable = compiled.symbol_table
+        """This assigns every input and output symbol of the FST an integer ID, which is what the traversals compare."""
+
+        self._down: _TraversalDirection
+        """This holds the index of the arcs by input symbol and the epsilon closures that going down (i.e., generation) uses."""
+
+        self._up: _TraversalDirection
+        """This holds the index of the arcs by output symbol and the epsilon closures that going up (i.e., analysis) uses."""
+
+        self._down, self._up = self._create_directions(compiled)
+
+        self._nodes: list[_FstNode] | None = None
+        """The FST as ``_FstNode`` and ``_FstEdge`` objects, indexed by state index. This is only built if it is asked for."""
+
+        self._distances_to_final: list[float] | None = None
+        """The least weight of any path from each state to an accepting state. This is only computed if an n-best query needs it."""
+
+        self._shortest_distances: dict[bool, list[Any]] = {}
+        """The shortest distances of the states over the semiring of the FST, keyed by whether they're to the accepting states."""
+
+        if trim:
+            report = self.trim()
+            logger.info(
+                "Trimmed %d states and %d arcs from the FST; %d states and %d arcs remain.",
+                report.states_removed, report.arcs_removed, report.states_remaining, report.arcs_remaining
+            )
+
+    @staticmethod
+    def compile(att_file_path: str, compiled_file_path: str | None = None, *, semiring: Semiring | None = None) -> str:
+        """
+        Compiles an ``.att`` file into a binary ``.attc`` file that can be loaded without re-parsing the ``.att`` file.
+
+        Parameters
+        ----------
+        att_file_path : str
+            The path to the ``.att`` file containing the FST description.
+
+        compiled_file_path : str | None, optional
+            The path of the ``.attc`` file to write. Default is ``None``, which writes the file next to the ``.att`` file,
+            e.g. ``/path/to/fst.attc`` for ``/path/to/fst.att``.
+
+        semiring : Semiring | None, optional
+            The semiring over which the weights in the FST are defined. The weights are converted into the domain of the semiring
+            before being written, and the compiled file can then only be loaded with that same kind of semiring.
+
+        Returns
+        -------
+        str
+            The path of the compiled file that was written.
+
+        Raises
+        ------
+        CompiledFstError
+            This error is raised if the weights of the semiring can't be stored in a compiled file. Only boolean and real-valued
+            weights can be stored.
+        """
+
+        if compiled_file_path is None:
+            compiled_file_path = get_sidecar_path(att_file_path)
+
+        if not str(compiled_file_path).endswith(COMPILED_FILE_EXTENSION):
+            logger.error("Provided file path does not point to a ``.attc`` file. Example: ``/path/to/fst.attc``.")
+            sys.exit(1)
+
+        # The fingerprint is taken before parsing so that an edit made during parsing leaves the compiled file stale rather than wrong.
+        fingerprint = _SourceFingerprint.from_file(att_file_path)
+        Fst._compile_att_file(att_file_path, semiring).write(compiled_file_path, fingerprint)
+
+        return str(compiled_file_path)
+
+    @classmethod
+    def load_compiled( # pylint: disable=too-many-arguments
+        cls,
+        compiled_file_path: str,
+        *,
+        semiring: Semiring | None = None,
+        recursion_limit: int | None = None,
+        epsilon_limit: int | None = None,
+        epsilon_cycle_limit: int | None = None,
+        memory_map: bool = False,
+        lazy: bool = False,
+        state_cache_size: int | None = None,
+        tokenization_cache_size: int | None = 1024,
+        trim: bool = False
+    ) -> Fst:
+        """
+        Loads an FST from a compiled ``.attc`` file created by ``Fst.compile``.
+
+        Parameters
+        ----------
+        compiled_file_path : str
+            The path to the compiled ``.attc`` file.
+
+        semiring : Semiring | None, optional
+            The semiring over which the weights in the FST are defined. This must be the same kind of semiring the file was compiled with.
+
+        recursion_limit : int | None, optional
+            The depth budget for the generation/analysis functionality, i.e. the most arcs a path through the FST may follow.
+            Default is ``None``, which uses a budget of 1000.
+
+        epsilon_limit : int | None, optional
+            The most arcs in a row that a path may follow without consuming a symbol of the query. Default is ``None``, which leaves
+            such runs bounded only by ``recursion_limit``.
+
+        epsilon_cycle_limit : int | None, optional
+            How many times a run of epsilon arcs may go around a cycle. ``0`` keeps only the epsilon paths that visit each state
+            once. Default is ``None``, which unrolls cycles as far as the other budgets allow.
+
+        memory_map : bool, optional
+            Whether to map the file into memory and traverse it in place, so that every process that loads the file shares one copy of
+            the FST. Default is ``False``, which reads the file into this process.
+
+        lazy : bool, optional
+            Whether to map the file into memory without checking its checksum, and only read and index each state once a query reaches
+            it, so that even a very large FST loads at once. Default is ``False``.
+
+        state_cache_size : int | None, optional
+            How many states to keep what has been worked out for. Default is ``None``, which keeps every state reached.
+
+        tokenization_cache_size : int | None, optional
+            How many tokenized queries to keep. ``0`` turns the cache off, and ``None`` never evicts. Default is ``1024``.
+
+        trim : bool, optional
+            Whether to remove the states and arcs that aren't on any path from the start state to an accepting state once the FST is
+            loaded (see ``Fst.trim``). Default is ``False``.
+
+        Returns
+        -------
+        Fst
+            The loaded FST.
+
+        Raises
+        ------
+        CompiledFstError
+            This error is raised if the file is invalid, or was compiled with a different semiring than the one provided.
+        """
+
+        if not str(compiled_file_path).endswith(COMPILED_FILE_EXTENSION):
+            logger.error("Provided file path does not point to a ``.attc`` file. Example: ``/path/to/fst.attc``.")
+            sys.exit(1)
+
+        return cls(
+            compiled_file_path,
+            semiring=semiring,
+            recursion_limit=recursion_limit,
+            epsilon_limit=epsilon_limit,
+            epsilon_cycle_limit=epsilon_cycle_limit,
+            memory_map=memory_map,
+            lazy=lazy,
+            state_cache_size=state_cache_size,
+            tokenization_cache_size=tokenization_cache_size,
+            trim=trim
+        )
+
+    @property
+    def multichar_symbols(self) -> set[str]:
+        """
+        Public getter for the multichar_symbols variable.
+
+        Returns
+        -------
+        set[str]
+            A copy of the set of multi-character symbols.
+        """
+        return self._multichar_symbols.copy()
+    
+    @property
+    def symbol_table(self) -> SymbolTable:
+        """
+        Public getter for the symbol table of the FST.
+
+        Returns
+        -------
+        SymbolTable
+            The table that assigns every input and output symbol of the FST an integer ID. This should not be modified.
+        """
+        return self._symbol_table
+
+    def tokenization_cache_info(self) -> Any:
+        """
+        Returns the statistics of the tokenization cache of the FST.
+
+        Returns
+        -------
+        functools._CacheInfo
+            A named tuple of ``hits``, ``misses``, ``maxsize`` and ``currsize``; i.e., how many queries were found in the cache, how
+            many had to be tokenized, how many queries the cache holds at most, and how many it holds now.
+        """
+        return self._tokenize.cache_info() # type: ignore
+
+    def clear_tokenization_cache(self) -> None:
+        """Empties the tokenization cache of the FST and resets its statistics."""
+        self._tokenize.cache_clear() # type: ignore
+
+    def shortest_distance(self, *, reverse: bool = False) -> dict[int, Any]:
+        """
+        Returns the shortest distance of every state over the semiring of the FST: the sum of the weights of every path from the
+        start state to the state, or, going in reverse, from the state to an accepting state, times the weight of accepting it.
+
+        What "shortest" means is up to the semiring. For the ``TropicalSemiring``, the sum is the minimum, so the distance is the
+        weight of the lightest path; for the ``ProbabilitySemiring``, it's the total probability of the paths; and so on. The reverse
+        distance of the start state is the total weight of the FST. The distances are computed the first time they're asked for
+        and then kept.
+
+        Parameters
+        ----------
+        reverse : bool, optional
+            Whether to compute the distances to the accepting states, rather than from the start state. Default is False.
+
+        Returns
+        -------
+        dict[int, Any]
+            The distance of every state, keyed by its state ID from the ``.att`` file. States that no path connects get the
+            additive identity of the semiring.
+
+        Raises
+        ------
+        ValueError
+            This error is raised if the FST has no semiring.
+
+        See Also
+        --------
+        fst_runtime.shortest_distance.shortest_distance : For the algorithms that are used.
+        """
+
+        distances = self._get_shortest_distances(reverse)
+        return dict(zip(self._compiled.state_ids, distances))
+
+    def _get_shortest_distances(self, reverse: bool) -> list[Any]:
+        """
+        Returns the shortest distances of the states over the semiring of the FST, indexed by state index. See ``shortest_distance``.
+
+        Parameters
+        ----------
+        reverse : bool
+            Whether to compute the distances to the accepting states, rather than from the start state.
+
+        Returns
+        -------
+        list[Any]
+            The distance of each state, indexed by state index.
+
+        Raises
+        ------
+        ValueError
+            This error is raised if the FST has no semiring.
+        """
+
+        if self._semiring is None:
+            raise ValueError("Shortest distances need an FST with a semiring.")
+
+        distances = self._shortest_distances.get(reverse)
+
+        if distances is None:
+            distances = self._shortest_distances[reverse] = shortest_distance(self._compiled, self._semiring, self._start_index, reverse=reverse)
+
+        return distances
+
+    def trim(self) -> TrimReport:
+        """
+        Removes the states and arcs that aren't on any path from the start state to an accepting state; i.e., the states that can't
+        be reached from the start state (not accessible), or from which no accepting state can be reached (not coaccessible), along
+        with the arcs that leave or enter them.
+
+        No traversal can complete a path through such states, so this doesn't change the results of any query, but it makes the
+        FST smaller, and saves the traversals from exploring dead ends. The start state is always kept.
+
+        Returns
+        -------
+        TrimReport
+            How many states and arcs were removed, and how many remain.
+
+        Note
+        -----
+        This only changes the FST in memory. To keep the trimmed FST, load the ``.att`` file with ``trim=True`` each time, or
+        compile the FST after trimming it with a toolkit such as foma.
+        """
+
+        original = self._compiled
+        trimmed = original.trim(self._start_index)
+
+        if trimmed.num_states != original.num_states or trimmed.num_arcs != original.num_arcs:
+            # Everything derived from the arrays is rebuilt, including the epsilon closures and the node view.
+            self._compiled = trimmed
+            self._start_index = Fst._get_start_index(trimmed)
+            self._down, self._up = self._create_directions(trimmed)
+            self._nodes = None
+            self._distances_to_final = None
+            self._shortest_distances = {}
+            self._compiled_file_path = None
+            self._sidecar = None
+
+        return TrimReport(
+            states_removed=original.num_states - trimmed.num_states,
+            arcs_removed=original.num_arcs - trimmed.num_arcs,
+            states_remaining=trimmed.num_states,
+            arcs_remaining=trimmed.num_arcs
+        )
+
+    @property
+    def recursion_limit(self) -> int | None:
+        """
+        Public getter for the recursion_limit variable.
+
+        Returns
+        -------
+        int | None
+            The depth budget that has been set, i.e. the most arcs a path through the FST may follow. ``None`` represents that no
+            budget has been set, and so the default budget of 1000 is used.
+
+        Note
+        -----
+        The traversals aren't recursive, and so this never changes the interpreter's recursion limit. The name is kept from when
+        they were.
+        """
+        return self._recursion_limit
+
+    @recursion_limit.setter
+    def recursion_limit(self, new_recursion_limit: int | None) -> None:
+        """
+        Public setter for the recursion_limit variable.
+
+        Parameters
+        ----------
+        new_recursion_limit : int | None
+            The new depth budget, or ``None`` to use the default.
+        """
+        self._recursion_limit = new_recursion_limit
+        self._clear_epsilon_closures()
+
+    @property
+    def epsilon_limit(self) -> int | None:
+        """
+        Public getter for the epsilon_limit variable.
+
+        Returns
+        -------
+        int | None
+            The most arcs in a row that a path may follow without consuming a symbol of the query, or ``None`` if such runs are
+            only bounded by ``recursion_limit``.
+        """
+        return self._epsilon_limit
+
+    @epsilon_limit.setter
+    def epsilon_limit(self, new_epsilon_limit: int | None) -> None:
+        """
+        Public setter for the epsilon_limit variable.
+
+        Parameters
+        ----------
+        new_epsilon_limit : int | None
+            The new epsilon budget, or ``None`` to leave such runs bounded only by ``recursion_limit``.
+        """
+        self._epsilon_limit = new_epsilon_limit
+        self._clear_epsilon_closures()
+
+    @property
+    def epsilon_cycle_limit(self) -> int | None:
+        """
+        Public getter for the epsilon_cycle_limit variable.
+
+        Returns
+        -------
+        int | None
+            How many times a run of epsilon arcs may go around a cycle (``0`` by default), or ``None`` if cycles are unrolled as far as
+            the ``epsilon_limit`` and ``recursion_limit`` budgets allow.
+        """
+        return self._epsilon_cycle_limit
+
+    @epsilon_cycle_limit.setter
+    def epsilon_cycle_limit(self, new_epsilon_cycle_limit: int | None) -> None:
+        """
+        Public setter for the epsilon_cycle_limit variable.
+
+        Parameters
+        ----------
+        new_epsilon_cycle_limit : int | None
+            The new number of times a run of epsilon arcs may go around a cycle, or ``None`` to only be bounded by the other budgets.
+        """
+        self._epsilon_cycle_limit = new_epsilon_cycle_limit
+        self._clear_epsilon_closures()
+
+    #endregion
+
+
+    #region Graph Creation
+
+    @staticmethod
+    def _read_att_file_into_transitions(att_file_path: str, semiring: Semiring | None) \
+        -> tuple[dict[int, dict[str, list[_AttInputInfo]]], dict[int, Any], set[str]]: # pylint: disable=too-many-branches,too-many-statements,too-many-locals
+        """
+        Reads in all the transition and state information from the file into the ``transitions`` object,
+        and also saves the accepting states and the multi-character symbols of the FST.
+
+        Parameters
+        ----------
+        att_file_path : str
+            The path to the ``.att`` file containing the FST description.
+
+        semiring : Semiring | None
+            The semiring whose domain the weights are converted into.
+
+        Returns
+        -------
+        tuple[dict[int, dict[str, list[_AttInputInfo]]], dict[int, Any], set[str]]
+            A tuple containing:
+            - ``transitions`` : dict[int, dict[str, list[_AttInputInfo]]]
+                The dictionary of transitions read from the ``.att`` file, keyed by state ID and input symbol.
+            - ``accepting_states`` : dict[int, Any]
+                A dictionary whose keys are accepting state IDs and whose values are the weight of the accepting state.
+            - ``multichar_symbols`` : set[str]
+                The multi-character symbols used by the transitions.
+
+        Raises
+        ------
+        ValueError
+            This exception is raised when trying to parse the states and weights into their respective types.
+        """
+
+        # See the note in ``_compile_att_file`` for what this object is.
+        transitions: dict[int, dict[str, list[_AttInputInfo]]] = defaultdict(dict)
+        accepting_states: dict[int, Any] = {}
+        multichar_symbols: set[str] = set()
+
+        with open(att_file_path, encoding='utf-8') as att_file:
+
+            # Parse file into FST graph object.
+            for line in att_file:
+                
+                # Lines in the AT&T format are tab separated.
+                # No .strip() in case whitespace character is an output. This is very important.
+                att_line_items = line.replace('\n', '').split('\t')
+                num_defined_items = len(att_line_items)
+
+                # Unweighted accepting state read in only.
+                if num_defined_items == Fst._ATT_DEFINES_UNWEIGHTED_ACCEPTING_STATE:
+                    state_id = int(att_line_items[0])
+                    weight = None if semiring is None else semiring.multiplicative_identity
+                    accepting_states[state_id] = weight
+
+                # Unweighted transition.
+                elif num_defined_items == Fst._ATT_DEFINES_UNWEIGHTED_TRANSITION:
+                    current_state, next_state, input_symbol, output_symbol = att_line_items
+
+                    if len(input_symbol) > 1:
+                        multichar_symbols.add(input_symbol)
+
+                    if len(output_symbol) > 1:
+                        multichar_symbols.add(output_symbol)
+
+                    try:
+                        next_state = int(next_state)
+                    except ValueError:
+                        raise
+
+                    weight = None if semiring is None else semiring.multiplicative_identity
+                    info = _AttInputInfo(next_state, output_symbol, weight)
+
+                    try:
+                        transitions[int(current_state)][input_symbol].append(info)
+                    except KeyError:
+                        transitions[int(current_state)][input_symbol] = [info]
+
+                # Weighted accepting state.
+                elif num_defined_items == Fst._ATT_DEFINES_WEIGHTED_ACCEPTING_STATE:
+                    state_id, weight = att_line_items
+
+                    state_id = int(state_id)
+
+                    if semiring is not None:
+                        weight = semiring.convert_string_into_domain(weight)
+                    else:
+                        weight = None
+
+                    accepting_states[state_id] = weight
+
+                # Weighted transition.
+                elif num_defined_items == Fst._ATT_DEFINES_WEIGHTED_TRANSITION:
+                    current_state, next_state, input_symbol, output_symbol, weight = att_line_items
+
+                    if len(input_symbol) > 1:
+                        multichar_symbols.add(input_symbol)
+                    
+                    if len(output_symbol) > 1:
+                        multichar_symbols.add(output_symbol)
+
+                    next_state = int(next_state)
+
+                    if semiring is not None:
+                        weight = semiring.convert_string_into_domain(weight)
+                    else:
+                        weight = None
+
+                    info = _AttInputInfo(next_state, output_symbol, weight)
+
+                    try:
+                        transitions[int(current_state)][input_symbol].append(info)
+                    except KeyError:
+                        transitions[int(current_state)][input_symbol] = [info]
+
+                # Invalid input line.
+                else:
+                    logger.error("Invalid line in %s. Offending line: %s", os.path.basename(att_file_path), line)
+                    sys.exit(1)
+
+        return transitions, accepting_states, multichar_symbols
+
+
+    @staticmethod
+    def _compile_att_file(att_file_path: str, semiring: Semiring | None) -> _CompiledFst:
+        """
+        Reads in the provided ``.att`` file and converts it into the flat arrays used by compiled FST files.
+
+        Parameters
+        ----------
+        att_file_path : str
+            The path to the ``.att`` file containing the FST description.
+
+        semiring : Semiring | None
+            The semiring whose domain the weights are converted into.
+
+        Returns
+        -------
+        _CompiledFst
+            The FST as flat arrays.
+
+        Note
+        -----
+        ``transitions`` is a dictionary whose key is the source state number as read in from the ``.att`` file
+        (e.g., 22), and whose value is a dictionary. This child dictionary is keyed to the input symbol from 
+        the ``.att`` file (e.g., 'k' or '+PLURAL'), and whose value is a class that contains the target state 
+        number, the output of the transition, and the weight of that transition.
+        """
+
+        transitions, accepting_states, multichar_symbols = Fst._read_att_file_into_transitions(att_file_path, semiring)
+        return _CompiledFst.from_att_transitions(transitions, accepting_states, multichar_symbols, semiring)
+
+
+    def _read_compiled_file(self, compiled_file_path: str) -> _CompiledFst:
+        """
+        Reads a compiled FST file, making sure that it was compiled with the same kind of semiring as this FST uses.
+
+        Parameters
+        ----------
+        compiled_file_path : str
+            The path to the compiled ``.attc`` file.
+
+        Returns
+        -------
+        _CompiledFst
+            The FST as flat arrays.
+
+        Raises
+        ------
+        CompiledFstError
+            This error is raised if the file is invalid, or was compiled with a different semiring than the one this FST uses.
+        """
+
+        compiled = _CompiledFst.read(compiled_file_path, memory_map=self._memory_map, verify=not self._lazy)
+        semiring_name = type(self._semiring).__name__ if self._semiring else ''
+
+        if compiled.semiring_name != semiring_name:
+            raise CompiledFstError(
+                f"The file {os.path.basename(compiled_file_path)} was compiled with the semiring ``{compiled.semiring_name or None}``, "
+                f"but the semiring ``{semiring_name or None}`` was provided."
+            )
+
+        return compiled
+
+
+    def _is_sidecar_current(self, att_file_path: str, sidecar_path: str) -> bool:
+        """
+        Checks whether a compiled sidecar file can be used in place of parsing its ``.att`` file.
+
+        Parameters
+        ----------
+        att_file_path : str
+            The path to the ``.att`` file.
+
+        sidecar_path : str
+            The path to the compiled sidecar file of the ``.att`` file.
+
+        Returns
+        -------
+        bool
+            ``True`` if the sidecar was compiled with the semiring of this FST from an ``.att`` file with the same modification time
+            and size as the current one, or from one with the same contents; ``False`` otherwise.
+        """
+
+        if not os.path.exists(sidecar_path):
+            return False
+
+        try:
+            header = _CompiledHeader.read(sidecar_path)
+        except CompiledFstError:
+            return False
+
+        if header.semiring_name != (type(self._semiring).__name__ if self._semiring else ''):
+            return False
+
+        att_file_stat = os.stat(att_file_path)
+
+        if header.fingerprint.size != att_file_stat.st_size:
+            return False
+
+        if header.fingerprint.mtime_ns == att_file_stat.st_mtime_ns:
+            return True
+
+        # The file was touched, but its contents may still be the same.
+        return header.fingerprint.sha256 == _SourceFingerprint.hash_file(att_file_path)
+
+
+    def _compile_with_cache(self, att_file_path: str) -> _CompiledFst:
+        """
+        Reads the compiled sidecar file of the provided ``.att`` file if it is current, and otherwise compiles the ``.att`` file
+        itself, in which case the sidecar is written for next time.
+
+        Parameters
+        ----------
+        att_file_path : str
+            The path to the ``.att`` file containing the FST description.
+
+        Returns
+        -------
+        _CompiledFst
+            The FST as flat arrays.
+        """
+
+        sidecar_path = get_sidecar_path(att_file_path)
+
+        if self._is_sidecar_current(att_file_path, sidecar_path):
+            try:
+                compiled = self._read_compiled_file(sidecar_path)
+                self._sidecar = (sidecar_path, _CompiledHeader.read(sidecar_path))
+                return compiled
+            except CompiledFstError as error:
+                logger.warning("Ignoring compiled cache %s: %s", sidecar_path, error.message)
+
+        fingerprint = _SourceFingerprint.from_file(att_file_path)
+        compiled = Fst._compile_att_file(att_file_path, self._semiring)
+
+        # A cache that can't be written (e.g. in a read-only directory) shouldn't stop the FST from loading.
+        try:
+            compiled.write(sidecar_path, fingerprint)
+        except (OSError, CompiledFstError) as error:
+            logger.warning("Failed to write compiled cache %s: %s", sidecar_path, error)
+            return compiled
+
+        self._sidecar = (sidecar_path, _CompiledHeader.read(sidecar_path))
+
+        # Mapping the sidecar that was just written shares it with the processes that load it next, rather than keeping a copy.
+        if self._memory_map:
+            return self._read_compiled_file(sidecar_path)
+
+        return compiled
+
+
+    def _create_directions(self, compiled: _CompiledFst) -> tuple[_TraversalDirection, _TraversalDirection]:
+        """
+        Creates what traversals need to walk the FST down and up. For a lazy FST, none of the arcs are read yet.
+
+        Parameters
+        ----------
+        compiled : _CompiledFst
+            The FST as flat arrays.
+
+        Returns
+        -------
+        tuple[_TraversalDirection, _TraversalDirection]
+            The directions for going down (i.e., generation) and up (i.e., analysis), in that order.
+        """
+
+        lazy, cache_size = self._lazy, self._state_cache_size
+        symbol_count = len(compiled.symbol_table) if lazy else None
+
+        down = _TraversalDirection(
+            compiled.get_input_index(lazy=lazy, cache_size=cache_size),
+            compiled.arc_input_ids,
+            compiled.arc_output_ids,
+            epsilon_closures=_StateCache(cache_size),
+            lookaheads=_StateCache(cache_size),
+            symbol_count=symbol_count,
+        )
+
+        up = _TraversalDirection(
+            compiled.get_output_index(lazy=lazy, cache_size=cache_size),
+            compiled.arc_output_ids,
+            compiled.arc_input_ids,
+            epsilon_closures=_StateCache(cache_size),
+            lookaheads=_StateCache(cache_size),
+            symbol_count=symbol_count,
+        )
+
+        return down, up
+
+
+    @staticmethod
+    def _get_start_index(compiled: _CompiledFst) -> int:
+        """
+        Finds the index of the start state of the FST.
+
+        Parameters
+        ----------
+        compiled : _CompiledFst
+            The FST as flat arrays.
+
+        Returns
+        -------
+        int
+            The state index of the state with state ID ``0``.
+
+        Raises
+        ------
+        AttFormatError
+            This error is raised if the FST has no start state.
+        """
+
+        # The states are ordered by state ID.
+        start_index = bisect_left(compiled.state_ids, Fst._STARTING_STATE)
+
+        if start_index == compiled.num_states or compiled.state_ids[start_index] != Fst._STARTING_STATE:
+            raise AttFormatError("There must be a start state specified that has state number ``0` in the input ``.att`` file.")
+
+        return start_index
+
+
+    def _get_nodes(self) -> list[_FstNode]:
+        """
+        Builds the FST as ``_FstNode`` and ``_FstEdge`` objects from its flat arrays the first time it is asked for.
+
+        Returns
+        -------
+        list[_FstNode]
+            Every node of the FST, indexed by state index.
+
+        Note
+        -----
+        Traversals don't use these objects; they exist to make the structure of the FST easy to inspect.
+        """
+
+        if self._nodes is not None:
+            return self._nodes
+
+        compiled = self._compiled
+        symbol_table = compiled.symbol_table
+        final_weights = compiled.final_weights
+        arc_weights = compiled.arc_weights
+
+        nodes = [
+            _FstNode(
+                compiled.state_ids[state_index],
+                bool(compiled.final_flags[state_index]),
+                final_state_weight=None if final_weights is None else final_weights[state_index]
+            )
+            for state_index in range(compiled.num_states)
+        ]
+
+        # For every node, create each transition that leads out from it as an _FstEdge object, and add that transition
+        # to the current node's out transitions and the target node's in transitions.
+        for state_index, current_node in enumerate(nodes):
+            for arc_index in range(compiled.arc_offsets[state_index], compiled.arc_offsets[state_index + 1]):
+                next_node = nodes[compiled.arc_targets[arc_index]]
+
+                directed_edge = _FstEdge(
+                    current_node,
+                    next_node,
+                    symbol_table.get_symbol(compiled.arc_input_ids[arc_index]),
+                    symbol_table.get_symbol(compiled.arc_output_ids[arc_index]),
+                    None if arc_weights is None else arc_weights[arc_index]
+                )
+
+                current_node.out_transitions.append(directed_edge)
+                next_node.in_transitions.append(directed_edge)
+
+        self._nodes = nodes
+        return nodes
+
+
+    @property
+    def _start_state(self) -> _FstNode:
+        """
+        The start state of the FST as an ``_FstNode``.
+
+        Returns
+        -------
+        _FstNode
+            The node of the start state.
+        """
+        return self._get_nodes()[self._start_index]
+
+
+    @property
+    def _accepting_states(self) -> dict[int, _FstNode]:
+        """
+        The accepting states of the FST as ``_FstNode`` objects.
+
+        Returns
+        -------
+        dict[int, _FstNode]
+            The nodes of the accepting states, keyed by state ID.
+        """
+        return {node.id: node for node in self._get_nodes() if node.is_accepting_state}
+
+    #endregion
+
+
+    # region Down/Generation Methods
+
+    def down_generations( # pylint: disable=too-many-arguments
+        self,
+        lemmas: list[str],
+        *,
+        prefixes: list[list[str]] | None = None,
+        suffixes: list[list[str]] | None = None,
+        shared_prefixes: bool = False,
+        memoize: bool = False,
+        n_best: int | None = None,
+        aggregate: bool = False,
+        beam: Any = None,
+        threshold: Any = None,
+        max_results: int | None = None,
+        max_states_visited: int | None = None,
+        deadline: float | None = None
+    ) -> dict[str, FstResults]:
+        """
+        Calls ``down_generation`` for each lemma and returns a dictionary keyed on each lemma.
+
+        The values in the dictionary are generators of wordforms returned by the FST.
+
+        Parameters
+        ----------
+        lemmas : list[str]
+            The list of lemmas to process.
+
+        prefixes : list[list[str]], optional
+            A list of lists containing prefix sequences. Default is None.
+
+        suffixes : list[list[str]], optional
+            A list of lists containing suffix sequences. Default is None.
+
+        shared_prefixes : bool, optional
+            Whether to walk the FST once along the parts that the queries of a lemma have in common. See ``down_generation``.
+            Default is False.
+
+        memoize : bool, optional
+            Whether to expand each state only once per token position of a query. See ``down_generation``. Default is False.
+
+        n_best : int | None, optional
+            How many of the best wordforms of each lemma to generate, best first. See ``down_generation``. Default is None, which
+            generates every wordform.
+
+        aggregate : bool, optional
+            Whether to generate each distinct wordform of a query once, with the weights of its paths added up. See
+            ``down_generation``. Default is False.
+
+        beam : Any, optional
+            Drops the paths of a lemma whose weight is worse than the best wordform found so far by more than this weight. See
+            ``down_generation``. Default is None.
+
+        threshold : Any, optional
+            Drops the paths whose weight is worse than this weight. See ``down_generation``. Default is None.
+
+        max_results : int | None, optional
+            The most wordforms to generate for each lemma. See ``down_generation``. Default is None, which has no limit.
+
+        max_states_visited : int | None, optional
+            The most states to visit for each lemma. See ``down_generation``. Default is None, which has no limit.
+
+        deadline : float | None, optional
+            The ``time.monotonic()`` time at which to stop generating, shared by all the lemmas. See ``down_generation``. Default
+            is None, which has no limit.
+
+        Returns
+        -------
+        dict[str, FstResults]
+            A dictionary where each key is a lemma and the value is the wordforms generated by the FST, which are found as they're
+            iterated over.
+
+        See Also
+        --------
+        down_generation : For more information on how each lemma is processed.
+        """
+
+        prefixes = [[EPSILON]] if prefixes is None else prefixes
+        suffixes = [[EPSILON]] if suffixes is None else suffixes
+
+        generated_forms = {}
+
+        for lemma in lemmas:
+            generated_forms[lemma] = self.down_generation(
+                lemma, prefixes=prefixes, suffixes=suffixes, shared_prefixes=shared_prefixes, memoize=memoize, n_best=n_best,
+                aggregate=aggregate, beam=beam, threshold=threshold, max_results=max_results,
+                max_states_visited=max_states_visited, deadline=deadline
+            )
+
+        return generated_forms
+
+
+    def down_generation( # pylint: disable=too-many-arguments,too-many-locals
+        self,
+        lemma: str,
+        *,
+        prefixes: list[list[str]] | None = None,
+        suffixes: list[list[str]] | None = None,
+        shared_prefixes: bool = False,
+        memoize: bool = False,
+        n_best: int | None = None,
+        aggregate: bool = False,
+        beam: Any = None,
+        threshold: Any = None,
+        max_results: int | None = None,
+        max_states_visited: int | None = None,
+        deadline: float | None = None
+    ) -> FstResults:
+        """
+        Queries the FST in the down/generation direction.
+
+        Parameters
+        ----------
+        lemma : str
+            The lemma to process.
+
+        prefixes : list[list[str]], optional
+            A list of lists containing prefix sequences. Default is None.
+
+        suffixes : list[list[str]], optional
+            A list of lists containing suffix sequences. Default is None.
+
+        shared_prefixes : bool, optional
+            Whether to walk the FST once along the parts that the queries have in common, instead of once per query. The same outputs
+            are generated either way, but with this set they come out grouped by the paths they share rather than query by query.
+            Default is False.
+
+        memoize : bool, optional
+            Whether to expand each state only once per token position of a query, no matter how many paths reach it, and only build
+            the outputs once every match has been found. This bounds the work of the search by the number of states times the length
+            of the query, instead of by the number of paths, which pays off on FSTs with many parallel paths (e.g., ambiguous morpheme
+            boundaries). The same outputs are generated either way, though maybe in a different order. Default is False.
+
+        n_best : int | None, optional
+            How many of the best wordforms to generate, over all the queries. The wordforms come out best first, i.e. in order of
+            increasing path weight, and the search stops once it has found them. This needs an FST weighted over the
+            ``TropicalSemiring`` or ``LogSemiring``, and overrides ``shared_prefixes`` and ``memoize``. Default is None, which
+            generates every wordform.
+
+        aggregate : bool, optional
+            Whether to generate each distinct wordform of a query once, no matter how many paths lead to it, with the weights of
+            those paths added up by the semiring (e.g., the least weight for the ``TropicalSemiring``, or the total probability
+            for the ``ProbabilitySemiring``). The wordforms come out once every path of the query has been walked. With
+            ``n_best``, the best distinct wordforms are generated instead, each with the weight of its best path; which is the
+            sum of its paths' weights for the ``TropicalSemiring``. Default is False, which generates a wordform once per path.
+
+        beam : Any, optional
+            Drops the paths whose weight, so far, is worse than the weight of the best wordform found so far by more than this
+            weight; i.e. worse than the best weight times ``beam`` in the semiring, e.g. ``best + beam`` for the
+            ``TropicalSemiring``, or ``best * beam`` for the ``ProbabilitySemiring``. This needs a weighted FST whose semiring
+            is ordered (see ``Semiring.is_ordered``). Default is None, which keeps every path.
+
+        threshold : Any, optional
+            Drops the paths whose weight, so far, is worse than this weight. This needs a weighted FST whose semiring is ordered.
+            Default is None, which keeps every path.
+
+        max_results : int | None, optional
+            The most wordforms to generate, over all the queries. Default is None, which has no limit.
+
+        max_states_visited : int | None, optional
+            The most states to visit while walking the FST, counting a state again each time a path reaches it. This bounds the
+            work of the search, no matter how ambiguous the FST is. Default is None, which has no limit.
+
+        deadline : float | None, optional
+            The time, as given by ``time.monotonic()``, at which to stop walking the FST, e.g. ``time.monotonic() + 0.05`` to spend
+            at most about 50 milliseconds on it. Since the wordforms are found as they are iterated over, the time it takes to use
+            them counts towards the deadline. Default is None, which has no limit.
+
+        Returns
+        -------
+        FstResults
+            The generated forms that are accepted by the FST along with their weights, which are found as they're iterated over.
+            Its ``truncated`` flag tells whether one of the limits above stopped the generation.
+
+        Raises
+        ------
+        ValueError
+            This error is raised when the results are first iterated over if ``n_best`` is given but the FST isn't weighted over the
+            ``TropicalSemiring`` or ``LogSemiring``, or if ``beam`` or ``threshold`` is given but the FST isn't weighted over an
+            ordered semiring.
+
+        Note
+        -----
+        When provided lists of prefixes and suffixes as well as the lemma, it fully permutes the tags based on the slots of the affixes. 
+        For example, the lemma "wal" in English (for the lemma "walk"), with prefix tags ``[["+VERB"], ["+INF", "+PAST", "+GER", "+PRES"]]``. 
+        Then, these would be fully permuted to "wal+VERB+INF", "wal+VERB+PAST", "wal+VERB+GER", and "wal+VERB+PRES"; likewise with any prefixes. 
+        All of these constructions are then walked over the FST to see if we end at an accepting state. If so, the generated forms 
+        (i.e., walk, walked, walking, walks) will be added to a list and returned.
+
+        A full paradigm has many cells that start the same way, e.g. every cell of a verb starts with its prefixes and the lemma.
+        With ``shared_prefixes``, the tokenized queries are put in a trie, and the FST is walked once along the trie: the path over
+        the tokens that queries share is only walked once, and the walk only branches where the slot alternatives differ.
+
+        The ``beam`` and ``threshold`` are checked as paths are extended, which saves walking paths that can only get worse; i.e.,
+        as long as following an arc never makes the weight of a path better, as with non-negative costs or probabilities of at
+        most ``1``, no match within the threshold is lost. Without ``n_best``, which finds the best wordform first, a better wordform
+        may be found after a worse one, and so with a ``beam`` the wordforms only come out once the walk is over, so that those that
+        turned out to be outside the beam of the best one are dropped. Queries that are walked together (e.g. with
+        ``shared_prefixes``) share the best wordform of the beam.
+
+        The ``max_states_visited`` and ``deadline`` are checked each time a state is visited, and stop the walk at once, so that a
+        query on an epsilon-heavy or highly ambiguous FST returns within a bounded time; the wordforms found up to then are still
+        generated. With ``aggregate``, the wordforms found up to then may lack the weights of the paths that weren't walked.
+        """
+        
+        prefixes = [[EPSILON]] if prefixes is None else prefixes
+        suffixes = [[EPSILON]] if suffixes is None else suffixes
+
+        permutations: list[list[str]] = prefixes + [[lemma]] + suffixes
+
+        queries: Generator[str] = Fst._permute_tags(permutations)
+        logger.debug('Queries created: %s', queries)
+
+        budget = _QueryBudget.create(max_results, max_states_visited, deadline)
+        options = _QueryOptions(shared_prefixes, memoize, n_best, aggregate, beam, threshold, budget)
+
+        return FstResults(self._traverse_down(queries, options), budget)
+
+
+    @staticmethod
+    def _permute_tags(parts: list[list[str]], separator: str = '+') -> Generator[str]:
+        """
+        Recursively descends into the tags to create all permutations of the given tags in the given order.
+
+        Parameters
+        ----------
+        parts : list[list[str]]
+            A list of lists containing tag sequences to permute.
+
+        Returns
+        -------
+        list[str]
+            A list of all permutations of the given tags in the given order.
+
+        Note
+        -----
+        This method generates all possible permutations of the tags by recursively descending through the provided lists of tags.
+        """
+
+        separator_length = len(separator)
+        resulting_products = cartesian_product(*parts)
+
+        for product in resulting_products:
+            combined_parts = ''
+
+            for tag in product:
+                if tag == EPSILON:
+                    continue
+                combined_parts += f'{tag}{separator}'
+            
+            # Chops off the extra plus sign at the end.
+            yield combined_parts[:-separator_length]
+
+    
+    def _traverse_down(self, queries: Iterable[str], options: _QueryOptions) -> Generator[FstOutput]:
+        """
+        Handles all the queries down the FST and returns all the resulting outputs that were found.
+
+        Parameters
+        ----------
+        queries : Iterable[str]
+            The queries to process down the FST.
+
+        options : _QueryOptions
+            How to walk the FST. With ``shared_prefixes`` or ``n_best``, all the queries are walked at once; otherwise, each query
+            is walked on its own.
+
+        Returns
+        -------
+        Generator[FstOutput]
+            A generator of all the resulting outputs that were found with their corresponding weights.
+        """
+
+        traverse = self._get_traverse(options)
+
+        if options.shared_prefixes or options.n_best is not None:
+            query_tries = [_QueryTrie()]
+
+            for query in queries:
+                query_ids = self._tokenize(query)
+
+                # A query with a token that no arc matches can't match any path, and so isn't walked at all.
+                if self._down.accepts_symbols(query_ids):
+                    query_tries[0].add(query_ids, query)
+        else:
+            query_tries = (
+                _QueryTrie.single(query_ids, query)
+                for query, query_ids in ((query, self._tokenize(query)) for query in queries)
+                if self._down.accepts_symbols(query_ids)
+            )
+
+        outputs = (
+            output
+            for query_trie in query_tries
+            for output in self._get_outputs(traverse(query_trie, self._down), options.aggregate and options.n_best is None)
+        )
+
+        yield from self._limit_outputs(outputs, options.budget)
+
+
+    @staticmethod
+    def _create_tokenize(
+        tokenizer: Tokenizer,
+        symbol_table: SymbolTable,
+        cache_size: int | None
+    ) -> Callable[[str], tuple[int, ...]]:
+        """
+        Returns a function that splits a query into its tokens, respecting the multi-character symbols of the FST, and returns their
+        symbol IDs, with a cache of the most recently used queries in front of it.
+
+        Parameters
+        ----------
+        tokenizer : Tokenizer
+            The tokenizer of the FST.
+
+        symbol_table : SymbolTable
+            The symbol table of the FST.
+
+        cache_size : int | None
+            How many tokenized queries the cache keeps; see ``tokenization_cache_size``.
+
+        Returns
+        -------
+        Callable[[str], tuple[int, ...]]
+            A function that takes a query and returns the symbol ID of every token of it. Tokens that aren't symbols of the FST get
+            ``UNKNOWN_SYMBOL_ID``. The IDs are a tuple, since they're shared by every lookup of the query through the cache.
+
+        Note
+        -----
+        The function only holds the tokenizer and the symbol table, not the FST: a cache around a method of the FST would make the
+        FST refer to itself, and a dropped FST, along with its memory-mapped file, would then stay alive until the garbage
+        collector found the cycle.
+
+        See Also
+        --------
+        tokenization_cache_info : The statistics of the cache.
+        """
+
+        def tokenize(query: str) -> tuple[int, ...]:
+            return tuple(symbol_table.get_ids(tokenizer.tokenize(query)))
+
+        return lru_cache(maxsize=cache_size)(tokenize)
+
+    #endregion
+
+
+    #region Up/Analysis Methods
+
+    def up_analyses( # pylint: disable=too-many-arguments
         self,
-        lemmas: list[str],
+        wordforms: list[str],
+        *,
+        memoize: bool = False,
+        n_best: int | None = None,
+        aggregate: bool = False,
+        beam: Any = None,
+        threshold: Any = None,
+        max_results: int | None = None,
+        max_states_visited: int | None = None,
+        deadline: float | None = None
+    ) -> dict[str, FstResults]:
+        """
+        Calls ``up_analysis`` for each wordform and returns a dictionary keyed on each wordform.
+
+        The values in the dictionary are generators of tagged forms returned by the FST.
+
+        Parameters
+        ----------
+        wordforms : list[str]
+            The list of wordforms to process.
+
+        memoize : bool, optional
+            Whether to expand each state only once per character of a wordform. See ``up_analysis``. Default is False.
+
+        n_best : int | None, optional
+            How many of the best tagged forms of each wordform to return, best first. See ``up_analysis``. Default is None, which
+            returns every tagged form.
+
+        aggregate : bool, optional
+            Whether to return each distinct tagged form of a wordform once, with the weights of its paths added up. See
+            ``up_analysis``. Default is False.
+
+        beam : Any, optional
+            Drops the paths of a wordform whose weight is worse than the best tagged form found so far by more than this weight.
+            See ``down_generation``. Default is None.
+
+        threshold : Any, optional
+            Drops the paths whose weight is worse than this weight. See ``down_generation``. Default is None.
+
+        max_results : int | None, optional
+            The most tagged forms to return for each wordform. See ``down_generation``. Default is None, which has no limit.
+
+        max_states_visited : int | None, optional
+            The most states to visit for each wordform. See ``down_generation``. Default is None, which has no limit.
+
+        deadline : float | None, optional
+            The ``time.monotonic()`` time at which to stop analyzing, shared by all the wordforms. See ``down_generation``.
+            Default is None, which has no limit.
+
+        Returns
+        -------
+        dict[str, FstResults]
+            A dictionary where each key is a wordform and the value is the tagged forms generated by the FST, along with their weights.
+
+        See Also
+        --------
+        up_analysis : For more information on how each wordform is processed.
+        """
+
+        tagged_forms = {}
+
+        for wordform in wordforms:
+            tagged_forms[wordform] = self.up_analysis(
+                wordform, memoize=memoize, n_best=n_best, aggregate=aggregate, beam=beam, threshold=threshold,
+                max_results=max_results, max_states_visited=max_states_visited, deadline=deadline
+            )
+
+        return tagged_forms
+    
+
+    def up_analysis( # pylint: disable=too-many-arguments
+        self,
+        wordform: str,
+        *,
+        memoize: bool = False,
+        n_best: int | None = None,
+        aggregate: bool = False,
+        beam: Any = None,
+        threshold: Any = None,
+        max_results: int | None = None,
+        max_states_visited: int | None = None,
+        deadline: float | None = None
+    ) -> FstResults:
+        """
+        Queries the FST up, or in the direction of analysis.
+
+        Parameters
+        ----------
+        wordform : str
+            The wordform to process.
+
+        memoize : bool, optional
+            Whether to expand each state only once per character of the wordform, no matter how many paths reach it, and only build
+            the analyses once every match has been found. See ``down_generation``. Default is False.
+
+        n_best : int | None, optional
+            How many of the best tagged forms to return, best first, stopping the search once they have been found. This needs an
+            FST weighted over the ``TropicalSemiring`` or ``LogSemiring``, and overrides ``memoize``. See ``down_generation``.
+            Default is None, which returns every tagged form.
+
+        aggregate : bool, optional
+            Whether to return each distinct tagged form once, no matter how many paths lead to it, with the weights of those paths
+            added up by the semiring. See ``down_generation``. Default is False, which returns a tagged form once per path.
+
+        beam : Any, optional
+            Drops the paths whose weight, so far, is worse than the weight of the best tagged form found so far by more than this
+            weight. See ``down_generation``. Default is None, which keeps every path.
+
+        threshold : Any, optional
+            Drops the paths whose weight, so far, is worse than this weight. See ``down_generation``. Default is None, which keeps
+            every path.
+
+        max_results : int | None, optional
+            The most tagged forms to return. Default is None, which has no limit.
+
+        max_states_visited : int | None, optional
+            The most states to visit while walking the FST. See ``down_generation``. Default is None, which has no limit.
+
+        deadline : float | None, optional
+            The time, as given by ``time.monotonic()``, at which to stop walking the FST. See ``down_generation``. Default is None,
+            which has no limit.
+
+        Returns
+        -------
+        FstResults
+            The tagged forms that could lead to the provided wordform, along with their weights, which are found as they're iterated
+            over. Its ``truncated`` flag tells whether one of the limits above stopped the analysis.
+
+        Raises
+        ------
+        ValueError
+            This error is raised when the results are first iterated over if ``n_best`` is given but the FST isn't weighted over the
+            ``TropicalSemiring`` or ``LogSemiring``, or if ``beam`` or ``threshold`` is given but the FST isn't weighted over an
+            ordered semiring.
+
+        Note
+        -----
+        This function queries the FST in the direction of analysis by inverting it: it walks forward from the start state exactly
+        like down/generation does, but matches the characters of the wordform against the output symbols of the arcs, and
+        collects their input symbols. For example, ``walking -> wal+GER``. There can be several tagged forms that lead to a single
+        word. For instance, the word ``walk`` can have forms like ``wal+VERB+1Sg+Pres``, ``wal+VERB+2Sg+Pres``, etc., that lead
+        to its generation. All these tagged forms are aggregated and returned.
+
+        Since the walk starts at the start state and only follows arcs whose output matches the wordform, the work done is
+        proportional to the paths that match the wordform, no matter how many accepting states the FST has. The tagged forms are
+        exactly those that ``down_generation`` turns into the wordform, including along paths whose first arcs emit nothing, and
+        for the empty wordform.
+        """
+
+        budget = _QueryBudget.create(max_results, max_states_visited, deadline)
+        options = _QueryOptions(False, memoize, n_best, aggregate, beam, threshold, budget)
+
+        return FstResults(self._traverse_up(wordform, options), budget)
+
+
+    def _traverse_up(self, wordform: str, options: _QueryOptions) -> Generator[FstOutput]:
+        """
+        Handles a wordform up the FST and returns all the resulting tagged forms that were found.
+
+        Parameters
+        ----------
+        wordform : str
+            The wordform to analyze.
+
+        options : _QueryOptions
+            How to walk the FST.
+
+        Returns
+        -------
+        Generator[FstOutput]
+            A generator of all the resulting tagged forms that were found with their corresponding weights.
+        """
+
+        # Each character of the wordform is matched against the output symbols, and the input symbols are collected.
+        wordform_ids = self._symbol_table.get_ids(wordform)
+
+        # A wordform with a character that no arc outputs can't be analyzed, and so the FST isn't walked at all.
+        if not self._up.accepts_symbols(wordform_ids):
+            return
+
+        traverse = self._get_traverse(options)
+        results = traverse(_QueryTrie.single(wordform_ids, wordform), self._up)
+
+        yield from self._limit_outputs(self._get_outputs(results, options.aggregate and options.n_best is None), options.budget)
+
+    #endregion
+
+
+    #region Parallel Methods
+
+    def down_generations_parallel( # pylint: disable=too-many-arguments
+        self,
+        lemmas: Iterable[str],
         *,
         prefixes: list[list[str]] | None = None,
-        suffixes: list[list[str]] | None = None
-    ) -> dict[str, Generator[FstOutput]]:
+        suffixes: list[list[str]] | None = None,
+        workers: int | None = None,
+        chunksize: int = 256,
+        min_parallel_size: int = 2048,
+        **query_options: Any
+    ) -> Iterator[tuple[str, list[FstOutput]]]:
+        """
+        Calls ``down_generation`` for each lemma in a pool of worker processes, and returns the wordforms of each lemma in the order
+        of the lemmas.
+
+        Parameters
+        ----------
+        lemmas : Iterable[str]
+            The lemmas to process. These are read as the results are taken, so they may be a generator.
+
+        prefixes : list[list[str]], optional
+            A list of lists containing prefix sequences. Default is None.
+
+        suffixes : list[list[str]], optional
+            A list of lists containing suffix sequences. Default is None.
+
+        workers : int | None, optional
+            The number of worker processes. Default is None, which uses one per CPU.
+
+        chunksize : int, optional
+            The number of lemmas sent to a worker at a time. Larger chunks spend less time passing lemmas and results between
+            processes. Default is 256.
+
+        min_parallel_size : int, optional
+            The fewest lemmas that are worth starting worker processes for; fewer lemmas are processed in this process. Default is
+            2048.
+
+        **query_options : Any
+            Any other keyword arguments of ``down_generation``, e.g. ``n_best`` or ``max_results``, which apply to each lemma.
+
+        Returns
+        -------
+        Iterator[tuple[str, list[FstOutput]]]
+            Each lemma along with the wordforms generated from it, in the order of the lemmas.
+
+        See Also
+        --------
+        up_analyses_parallel : For how the worker processes are set up.
+        """
+
+        options = {'prefixes': prefixes, 'suffixes': suffixes, **query_options}
+        return map_queries(
+            self, 'down_generation', lemmas, options,
+            get_settings=self._get_worker_settings, workers=workers, chunksize=chunksize, min_parallel_size=min_parallel_size
+        )
+
+
+    def up_analyses_parallel( # pylint: disable=too-many-arguments
+        self,
+        wordforms: Iterable[str],
+        *,
+        workers: int | None = None,
+        chunksize: int = 256,
+        min_parallel_size: int = 2048,
+        **query_options: Any
+    ) -> Iterator[tuple[str, list[FstOutput]]]:
+        """
+        Calls ``up_analysis`` for each wordform in a pool of worker processes, and returns the tagged forms of each wordform in
+        the order of the wordforms.
+
+        Parameters
+        ----------
+        wordforms : Iterable[str]
+            The wordforms to process, e.g. the tokens of a corpus. These are read as the results are taken, so they may be a
+            generator over a corpus that doesn't fit in memory.
+
+        workers : int | None, optional
+            The number of worker processes. Default is None, which uses one per CPU.
+
+        chunksize : int, optional
+            The number of wordforms sent to a worker at a time. Larger chunks spend less time passing wordforms and results
+            between processes. Default is 256.
+
+        min_parallel_size : int, optional
+            The fewest wordforms that are worth starting worker processes for; fewer wordforms are processed in this process.
+            Default is 2048.
+
+        **query_options : Any
+            Any other keyword arguments of ``up_analysis``, e.g. ``n_best`` or ``max_results``, which apply to each wordform.
+
+        Returns
+        -------
+        Iterator[tuple[str, list[FstOutput]]]
+            Each wordform along with its tagged forms, in the order of the wordforms.
+
+        Raises
+        ------
+        CompiledFstError
+            This error is raised if the FST has to be written to a compiled file for the workers, but its weights can't be stored in
+            one. Only boolean and real-valued weights can be stored.
+
+        ValueError
+            This error is raised if ``chunksize`` or ``workers`` is less than 1.
+
+        Note
+        -----
+        Each worker process loads the FST once, when it starts, from a compiled ``.attc`` file: the file the FST was loaded from,
+        or the sidecar it was loaded with through ``use_cache`` while that is unchanged, if the FST hasn't been trimmed since;
+        otherwise, the FST is written to a temporary compiled file the first time it's needed, which is deleted along with the FST.
+        The workers map the file into memory. The semiring, the ``recursion_limit``, ``epsilon_limit`` and ``epsilon_cycle_limit``
+        budgets and the ``lazy``, ``state_cache_size`` and ``tokenization_cache_size`` options are passed on to the workers as they
+        are when the pool starts, and the semiring and the query options have to be picklable.
+
+        The workers are started for each call and stopped once its results have been taken, so each call should be a large batch,
+        e.g. a whole corpus. They're spawned rather than forked, so a script that calls this has to do so under
+        ``if __name__ == '__main__':``. Only a few chunks per worker are in flight at a time, so the wordforms are read, and the results kept,
+        only a little ahead of the caller.
+        """
+
+        return map_queries(
+            self, 'up_analysis', wordforms, query_options,
+            get_settings=self._get_worker_settings, workers=workers, chunksize=chunksize, min_parallel_size=min_parallel_size
+        )
+
+
+    def _get_worker_settings(self) -> _WorkerSettings:
+        """
+        Returns what a worker process needs to load this FST. The workers load the compiled file the FST was loaded from or, if it
+        was loaded with ``use_cache``, its sidecar while that is still current; otherwise, the FST is written to a temporary compiled
+        file.
+
+        Returns
+        -------
+        _WorkerSettings
+            The compiled file of the FST, along with its semiring, budgets and loading options.
+
+        Raises
+        ------
+        CompiledFstError
+            This error is raised if the weights of the FST can't be stored in a compiled file.
+        """
+
+        # The sidecar may have been rewritten since, e.g. for an edited ``.att`` file, in which case it no longer holds this FST.
+        if self._compiled_file_path is None and self._sidecar is not None:
+            sidecar_path, header = self._sidecar
+
+            try:
+                if _CompiledHeader.read(sidecar_path) == header:
+                    self._compiled_file_path = sidecar_path
+            except (OSError, CompiledFstError):
+                self._sidecar = None
+
+        if self._compiled_file_path is None:
+            directory = tempfile.mkdtemp(prefix='fst_runtime_')
+            compiled_file_path = os.path.join(directory, f'fst{COMPILED_FILE_EXTENSION}')
+
+            # No ``.att`` file stands behind the file, so it gets an empty fingerprint.
+            self._compiled.write(compiled_file_path, _SourceFingerprint(0, 0, bytes(32)))
+            weakref.finalize(self, shutil.rmtree, directory, True)
+            self._compiled_file_path = compiled_file_path
+
+        return _WorkerSettings(
+            self._compiled_file_path, self._semiring, self._recursion_limit, self._epsilon_limit, self._epsilon_cycle_limit,
+            self._lazy, self._state_cache_size, self._tokenization_cache_size
+        )
+
+    #endregion
+
+
+    #region Traversal
+
+    def _get_traverse(self, options: _QueryOptions) -> Callable[[_QueryTrie, _TraversalDirection], Iterable[tuple[str, _SymbolPath, Any]]]:
+        """
+        Returns the traversal that the options of a query call for: ``_traverse_best`` with ``n_best``, ``_traverse_memoized`` with
+        ``memoize``, and otherwise ``_traverse``. Without ``n_best``, a ``beam`` runs the traversal through ``_traverse_within_beam``.
+
+        Parameters
+        ----------
+        options : _QueryOptions
+            How the query walks the FST.
+
+        Returns
+        -------
+        Callable[[_QueryTrie, _TraversalDirection], Iterable[tuple[str, _SymbolPath, Any]]]
+            A function that takes the query trie and the direction to walk the FST in, and returns the matches.
+        """
+
+        if options.n_best is not None:
+            return partial(self._traverse_best, options=options)
+
+        if options.memoize:
+            traverse = partial(self._traverse_memoized, options=options)
+        else:
+            traverse = partial(self._traverse, options=options)
+
+        if options.beam is not None:
+            return partial(self._traverse_within_beam, traverse=traverse, beam=options.beam)
+
+        return traverse
+
+    def _traverse_within_beam(
+        self,
+        queries: _QueryTrie,
+        direction: _TraversalDirection,
+        traverse: Callable[[_QueryTrie, _TraversalDirection], Iterable[tuple[str, _SymbolPath, Any]]],
+        beam: Any
+    ) -> Generator[tuple[str, _SymbolPath, Any]]:
+        """
+        Runs a traversal with a beam to the end, and then yields the matches that are within the beam of the best match.
+
+        Parameters
+        ----------
+        queries : _QueryTrie
+            The tokenized queries.
+
+        direction : _TraversalDirection
+            The direction to walk the FST in.
+
+        traverse : Callable[[_QueryTrie, _TraversalDirection], Iterable[tuple[str, _SymbolPath, Any]]]
+            The traversal, which prunes its paths against the best match it has found so far.
+
+        beam : Any
+            How much worse than the weight of the best match the weight of a match may be.
+
+        Returns
+        -------
+        Generator[tuple[str, _SymbolPath, Any]]
+            The matches of the traversal whose weights are within the beam of the best match, in the order they were found.
+
+        Note
+        -----
+        A depth-first traversal may find a match within the beam of the best match so far before it finds a better match, which
+        leaves the first one outside the beam. The matches are held back until the traversal is over, so that these can be dropped;
+        the best match is always kept, since nothing better than it is found before it.
         """
-        Calls ``down_generation`` for each lemma and returns a dictionary keyed on each lemma.
 
-        The values in the dictionary are generators of wordforms returned by the FST.
+        matches = list(traverse(queries, direction))
+
+        # The traversal raises an error for a beam unless the FST is weighted over an ordered semiring.
+        if not matches or self._semiring is None:
+            yield from matches
+            return
+
+        semiring = self._semiring
+        best = matches[0][2]
+
+        for _, _, weight in matches:
+            if semiring.is_better(weight, best):
+                best = weight
+
+        pruner = _Pruner(semiring, beam, None, best)
+        yield from (match for match in matches if pruner.allows(match[2]))
+
+    def _get_pruner(self, options: _QueryOptions | None) -> _Pruner | None:
+        """
+        Returns a pruner for a traversal, if the options of its query call for one.
 
         Parameters
         ----------
-        lemmas : list[str]
-            The list of lemmas to process.
+        options : _QueryOptions | None
+            How the query walks the FST.
 
-        prefixes : list[list[str]], optional
-            A list of lists containing prefix sequences. Default is None.
+        Returns
+        -------
+        _Pruner | None
+            A new pruner, or ``None`` if neither a beam nor a threshold is set.
 
-        suffixes : list[list[str]], optional
-            A list of lists containing suffix sequences. Default is None.
+        Raises
+        ------
+        ValueError
+            This error is raised if a beam or threshold is set, but the FST isn't weighted over an ordered semiring.
+        """
+
+        if options is None or (options.beam is None and options.threshold is None):
+            return None
+
+        if self._semiring is None or not self._semiring.is_ordered or self._compiled.arc_weights is None:
+            raise ValueError("A beam or threshold needs an FST weighted over a semiring that orders its weights.")
+
+        return _Pruner(self._semiring, options.beam, options.threshold)
+
+    def _get_outputs(self, results: Iterable[tuple[str, _SymbolPath, Any]], aggregate: bool = False) -> Generator[FstOutput]:
+        """
+        Turns the matches of a traversal into outputs.
+
+        Parameters
+        ----------
+        results : Iterable[tuple[str, _SymbolPath, Any]]
+            The matches, as the query that was matched, the symbol IDs emitted along the path, and the weight of the path.
+
+        aggregate : bool, optional
+            Whether to give each distinct output of a query once, with the weights of the paths that led to it added up by the
+            semiring, in the order the outputs were first found. This has to wait for the last match. Default is False, which
+            gives an output per match as soon as it's found.
 
         Returns
         -------
-        dict[str, Generator[str]]
-            A dictionary where each key is a lemma and the value is a generator of wordforms generated by the FST.
-
-        See Also
-        --------
-        down_generation : For more information on how each lemma is processed.
+        Generator[FstOutput]
+            The outputs, with the symbols emitted along each path joined into a string.
         """
 
-        prefixes = [[EPSILON]] if prefixes is None else prefixes
-        suffixes = [[EPSILON]] if suffixes is None else suffixes
+        # Outputs are only turned into strings here, with epsilon left out.
+        get_string = self._symbol_table.get_string
 
-        generated_forms = {}
+        if not aggregate:
+            for query, output_ids, path_weight in results:
+                yield FstOutput(get_string(output_ids), path_weight, query)
 
-        for lemma in lemmas:
-            generated_forms[lemma] = self.down_generation(lemma, prefixes=prefixes, suffixes=suffixes)
+            return
 
-        return generated_forms
+        add = self._semiring.plus if self._weighted and self._semiring is not None else None
+        aggregated: dict[tuple[str, str], Any] = {}
 
+        for query, output_ids, path_weight in results:
+            key = (query, get_string(output_ids))
 
-    def down_generation(
-        self,
-        lemma: str,
-        *,
-        prefixes: list[list[str]] | None = None,
-        suffixes: list[list[str]] | None = None
-    ) -> Generator[FstOutput]:
+            if key not in aggregated:
+                aggregated[key] = path_weight
+            elif add:
+                aggregated[key] = add(aggregated[key], path_weight)
+
+        for (query, output_string), path_weight in aggregated.items():
+            yield FstOutput(output_string, path_weight, query)
+
+    @staticmethod
+    def _limit_outputs(outputs: Iterable[FstOutput], budget: _QueryBudget | None) -> Generator[FstOutput]:
         """
-        Queries the FST in the down/generation direction.
+        Stops the outputs of a query once it has given ``max_results`` of them.
 
         Parameters
         ----------
-        lemma : str
-            The lemma to process.
-
-        prefixes : list[list[str]], optional
-            A list of lists containing prefix sequences. Default is None.
+        outputs : Iterable[FstOutput]
+            The outputs of the query.
 
-        suffixes : list[list[str]], optional
-            A list of lists containing suffix sequences. Default is None.
+        budget : _QueryBudget | None
+            The limits of the query.
 
         Returns
         -------
         Generator[FstOutput]
-            A generator of generated forms that are accepted by the FST along with their weights.
+            The outputs as they are if there is no ``max_results``, or else the first ``max_results`` of them. Once the last of them
+            has been taken, the traversal is walked on until it finds one more output, which is dropped, and the query is only marked
+            as truncated if there was one; a query with exactly ``max_results`` outputs isn't truncated.
+        """
+
+        if budget is None or budget.max_results is None:
+            yield from outputs
+            return
+
+        outputs = iter(outputs)
+        yield from islice(outputs, max(budget.max_results, 0))
+
+        if next(outputs, None) is not None:
+            budget.truncated = True
+
+
+    @staticmethod
+    def _join_path(path: _SharedPath, last_part: _SymbolPath) -> _SymbolPath:
+        """
+        Joins the parts of a path, and a last part, into the symbol IDs emitted along the whole path.
+
+        Parameters
+        ----------
+        path : _SharedPath
+            The path.
+
+        last_part : _SymbolPath
+            The symbol IDs emitted after the path, e.g. by the epsilon arcs to an accepting state.
+
+        Returns
+        -------
+        _SymbolPath
+            The symbol IDs emitted along the path, in order.
 
         Note
         -----
-        When provided lists of prefixes and suffixes as well as the lemma, it fully permutes the tags based on the slots of the affixes. 
-        For example, the lemma "wal" in English (for the lemma "walk"), with prefix tags ``[["+VERB"], ["+INF", "+PAST", "+GER", "+PRES"]]``. 
-        Then, these would be fully permuted to "wal+VERB+INF", "wal+VERB+PAST", "wal+VERB+GER", and "wal+VERB+PRES"; likewise with any prefixes. 
-        All of these constructions are then walked over the FST to see if we end at an accepting state. If so, the generated forms 
-        (i.e., walk, walked, walking, walks) will be added to a list and returned.
+        This is done once per match, and takes time proportional to the length of the path. Copying the path at every step
+        instead would take time proportional to the square of its length.
         """
-        
-        prefixes = [[EPSILON]] if prefixes is None else prefixes
-        suffixes = [[EPSILON]] if suffixes is None else suffixes
 
-        permutations: list[list[str]] = prefixes + [[lemma]] + suffixes
+        parts = [last_part]
 
-        queries: Generator[str] = Fst._permute_tags(permutations)
-        logger.debug('Queries created: %s', queries)
+        while path is not None:
+            part, path = path
+            parts.append(part)
 
-        yield from self._traverse_down(queries)
+        parts.reverse()
+        return tuple(chain.from_iterable(parts))
 
 
-    @staticmethod
-    def _permute_tags(parts: list[list[str]], separator: str = '+') -> Generator[str]:
+    def _traverse( # pylint: disable=too-many-locals
+        self,
+        queries: _QueryTrie,
+        direction: _TraversalDirection,
+        options: _QueryOptions | None = None
+    ) -> Generator[tuple[str, _SymbolPath, Any]]:
         """
-        Recursively descends into the tags to create all permutations of the given tags in the given order.
+        Walks the FST from its start state, following the arcs that match the queries, and yields the paths that match a whole query.
+
+        Going down and going up are the same walk with the roles of the input and output symbols swapped: going down matches the
+        queries against the input symbols and emits the output symbols, and going up does the reverse.
 
         Parameters
         ----------
-        parts : list[list[str]]
-            A list of lists containing tag sequences to permute.
+        queries : _QueryTrie
+            The tokenized queries. A single query is a trie with one path.
+
+        direction : _TraversalDirection
+            The direction to walk the FST in.
+
+        options : _QueryOptions | None, optional
+            How the query walks the FST; this uses the ``beam``, ``threshold`` and ``budget``. Default is None.
 
         Returns
         -------
-        list[str]
-            A list of all permutations of the given tags in the given order.
+        Generator[tuple[str, _SymbolPath, Any]]
+            A generator of matches found during the traversal, as the query that was matched, the symbol IDs emitted along the path,
+            and the weight of the path.
 
         Note
         -----
-        This method generates all possible permutations of the tags by recursively descending through the provided lists of tags.
+        The walk is a depth-first search with an explicit stack instead of recursion, and so it uses no interpreter stack and
+        changes no interpreter-wide setting; it can be run from many threads at once. Each entry on the stack is a state that a
+        path has reached, along with the node of the query trie it has reached, the path so far (as a ``_SharedPath``, so that
+        entries share the path that they branch off of), and its weight and depth. Queries
+        that share their first tokens share the entries for those tokens, and so that part of the walk is only done once.
+
+        Where the walk can go from each entry is worked out by the function from ``_get_expander``. Paths are cut off when they would exceed
+        ``recursion_limit`` arcs. If the FST has no weights, the weights of the entries are all ``None``, and no semiring
+        arithmetic is done. Each result is yielded straight to the caller.
         """
 
-        separator_length = len(separator)
-        resulting_products = cartesian_product(*parts)
+        multiply = self._semiring.times if self._weighted and self._semiring is not None else None
+        initial_weight = self._semiring.multiplicative_identity if multiply and self._semiring else None
+        depth_limit = self._get_depth_limit()
+        pruner = self._get_pruner(options)
+        budget = options.budget if options is not None else None
+        expand = self._get_expander(direction, budget)
+        join_path = self._join_path
+        stack: list[tuple[int, _QueryTrie, _SharedPath, Any, int]] = [(self._start_index, queries, None, initial_weight, 0)]
+        push = stack.append
 
-        for product in resulting_products:
-            combined_parts = ''
+        while stack:
+            state, query_node, path, weight, depth = stack.pop()
 
-            for tag in product:
-                if tag == EPSILON:
-                    continue
-                combined_parts += f'{tag}{separator}'
-            
-            # Chops off the extra plus sign at the end.
-            yield combined_parts[:-separator_length]
+            # The best match may have improved since the entry was pushed.
+            if pruner is not None and not pruner.allows(weight):
+                continue
 
-    
-    def _traverse_down(self, queries: Generator[str]) -> Generator[FstOutput]:
+            if budget is not None and not budget.visit():
+                return
+
+            matches, steps = expand(state, query_node)
+
+            # The budget may have run out while working out the expansion, which is then incomplete.
+            if budget is not None and budget.truncated:
+                return
+
+            # A path that has consumed the whole of a query and reached an accepting state is a match.
+            for match_path, match_weight, match_depth in matches:
+                if 0 < depth + match_depth <= depth_limit:
+                    path_weight = multiply(weight, match_weight) if multiply else None
+
+                    if pruner is not None and not pruner.allows_match(path_weight):
+                        continue
+
+                    output_ids = join_path(path, match_path)
+
+                    for query in query_node.queries:
+                        yield query, output_ids, path_weight
+
+            # The entries are pushed in reverse so that they are explored in the order they were found. A step links what it emits
+            # onto the path that reached it, so pushing an entry costs the same however long the path is.
+            for target_state, next_node, step_path, step_weight, step_depth in reversed(steps):
+                if depth + step_depth <= depth_limit:
+                    next_weight = multiply(weight, step_weight) if multiply else None
+
+                    if pruner is None or pruner.allows(next_weight):
+                        push((target_state, next_node, (step_path, path) if step_path else path, next_weight, depth + step_depth))
+
+
+    def _traverse_memoized( # pylint: disable=too-many-locals,too-many-branches
+        self,
+        queries: _QueryTrie,
+        direction: _TraversalDirection,
+        options: _QueryOptions | None = None
+    ) -> Generator[tuple[str, _SymbolPath, Any]]:
         """
-        Handles all the queries down the FST and returns all the resulting outputs that were found.
+        Finds the same matches as ``_traverse``, but expands each pair of a state and a node of the query trie only once, no matter
+        how many paths reach it.
 
         Parameters
         ----------
-        queries : list[str]
-            The list of queries to process down the FST.
+        queries : _QueryTrie
+            The tokenized queries. A single query is a trie with one path.
+
+        direction : _TraversalDirection
+            The direction to walk the FST in.
+
+        options : _QueryOptions | None, optional
+            How the query walks the FST; this uses the ``beam``, ``threshold`` and ``budget``. Default is None.
 
         Returns
         -------
-        Generator[FstOutput]
-            A generator of all the resulting outputs that were found with their corresponding weights.
+        Generator[tuple[str, _SymbolPath, Any]]
+            A generator of matches found during the traversal, as the query that was matched, the symbol IDs emitted along the path,
+            and the weight of the path.
+
+        Note
+        -----
+        This is dynamic programming over (state, token position) pairs, in two passes. The first pass builds a directed acyclic graph
+        whose nodes are the pairs reached from the start state, and whose edges are their expansions; it's acyclic because every
+        step consumes a token. It's built one token position at a time, so that going back over the positions in reverse finds which
+        pairs lead to a match at all. The second pass enumerates the paths through the graph from the start, following only pairs
+        that lead to a match, and only then builds the output of each path.
+
+        The first pass does work proportional to the number of states times the length of the queries, instead of the number of
+        paths through the FST; e.g. when many paths converge on a state, or when ambiguous paths all die off later in the query.
+        The second pass does work proportional to the number of matches. The ``recursion_limit``, ``beam`` and ``threshold`` are
+        applied in the second pass, and the ``budget`` in both; both passes count their visits to states towards it.
         """
 
-        original_recursion_limit = 0
-        
-        # If the recursion limit has been set, the save the original value, and set it to the specified one.
-        if self.recursion_limit is not None:
-            original_recursion_limit = sys.getrecursionlimit()
-            sys.setrecursionlimit(self.recursion_limit)
-
-        for query in queries:
-            results = self.__traverse_down(
-                current_node=self._start_state,
-                input_tokens=tokenize_input_string(query, self._multichar_symbols)
-            )
+        multiply = self._semiring.times if self._weighted and self._semiring is not None else None
+        initial_weight = self._semiring.multiplicative_identity if multiply and self._semiring else None
+        depth_limit = self._get_depth_limit()
+        pruner = self._get_pruner(options)
+        budget = options.budget if options is not None else None
+        expand = self._get_expander(direction, budget)
+
+        start_key = (self._start_index, id(queries))
+        expansions: dict[tuple[int, int], _Expansion] = {}
+        levels: list[list[tuple[int, int]]] = []
+        level = [(self._start_index, queries)]
+
+        # The first pass: expand every reachable pair once, one token position at a time.
+        while level:
+            levels.append([(state, id(query_node)) for state, query_node in level])
+            next_level = []
+
+            for state, query_node in level:
+                if budget is not None and not budget.visit():
+                    return
+
+                expansion = expansions[(state, id(query_node))] = expand(state, query_node)
+
+                if budget is not None and budget.truncated:
+                    return
+
+                for target_state, next_node, _, _, _ in expansion[1]:
+                    next_key = (target_state, id(next_node))
+
+                    if next_key not in expansions:
+                        # A placeholder, so that a pair reached by several steps is only added once.
+                        expansions[next_key] = ([], [])
+                        next_level.append((target_state, next_node))
+
+            level = next_level
+
+        # Going back over the positions, a pair leads to a match if it has one, or if one of its steps leads to a pair that does.
+        productive: set[tuple[int, int]] = set()
+
+        for keys in reversed(levels):
+            for key in keys:
+                matches, steps = expansions[key]
 
-            for result in results:
-                finalized_output_string = result.output_string.replace(EPSILON, '')
-                yield dataclass_replace(result, output_string=finalized_output_string, input_string=query)
+                if matches or any((target_state, id(next_node)) in productive for target_state, next_node, _, _, _ in steps):
+                    productive.add(key)
 
-        # Reset recursion limit before exiting the function.
-        if self.recursion_limit is not None:
-            sys.setrecursionlimit(original_recursion_limit)
+        if start_key not in productive:
+            return
 
+        # The second pass: enumerate the paths through the pairs that lead to a match.
+        join_path = self._join_path
+        stack: list[tuple[int, _QueryTrie, _SharedPath, Any, int]] = [(self._start_index, queries, None, initial_weight, 0)]
+        push = stack.append
 
-    def __traverse_down(self, current_node: _FstNode, input_tokens: list[str]) -> Generator[FstOutput]: # pylint: disable=too-many-branches
+        while stack:
+            state, query_node, path, weight, depth = stack.pop()
+
+            if pruner is not None and not pruner.allows(weight):
+                continue
+
+            if budget is not None and not budget.visit():
+                return
+
+            matches, steps = expansions[(state, id(query_node))]
+
+            for match_path, match_weight, match_depth in matches:
+                if 0 < depth + match_depth <= depth_limit:
+                    path_weight = multiply(weight, match_weight) if multiply else None
+
+                    if pruner is not None and not pruner.allows_match(path_weight):
+                        continue
+
+                    output_ids = join_path(path, match_path)
+
+                    for query in query_node.queries:
+                        yield query, output_ids, path_weight
+
+            for target_state, next_node, step_path, step_weight, step_depth in reversed(steps):
+                if depth + step_depth <= depth_limit and (target_state, id(next_node)) in productive:
+                    next_weight = multiply(weight, step_weight) if multiply else None
+
+                    if pruner is None or pruner.allows(next_weight):
+                        push((target_state, next_node, (step_path, path) if step_path else path, next_weight, depth + step_depth))
+
+
+    def _traverse_best( # pylint: disable=too-many-locals,too-many-branches
+        self,
+        queries: _QueryTrie,
+        direction: _TraversalDirection,
+        options: _QueryOptions
+    ) -> Generator[tuple[str, _SymbolPath, Any]]:
         """
-        Traverses down the FST beginning at an initial provided node.
+        Finds the matches with the least path weights first, and stops once it has found ``n_best`` of them.
 
         Parameters
         ----------
-        current_node : _FstNode
-            The current node in the recursion. Provide the FST's start state if calling this for the first time.
+        queries : _QueryTrie
+            The tokenized queries. A single query is a trie with one path.
 
-        input_tokens : list[str]
-            The list of input tokens to process through the FST.
+        direction : _TraversalDirection
+            The direction to walk the FST in.
+
+        options : _QueryOptions
+            How the query walks the FST. This finds ``n_best`` matches over all the queries; with ``aggregate``, the matches whose
+            output has already been found for the same query are skipped, so that the outputs are distinct. Paths are dropped by the
+            ``beam`` and ``threshold`` as they're taken off the queue, and the search stops once it runs out of ``budget``.
 
         Returns
         -------
-        Generator[FstOutput]
-            A generator of matches found during the traversal with their corresponding weights.
+        Generator[tuple[str, _SymbolPath, Any]]
+            A generator of matches in order of increasing path weight, as the query that was matched, the symbol IDs emitted along
+            the path, and the weight of the path.
+
+        Raises
+        ------
+        ValueError
+            This error is raised if the FST isn't weighted over the ``TropicalSemiring`` or ``LogSemiring``.
 
         Note
         -----
-        This function walks through the FST, recursively finding matches that it builds up through the traversal.
+        This is an A* search. It walks the same entries as ``_traverse``, but keeps them in a priority queue instead of a stack,
+        ordered by the weight of the path so far times the least weight of any path from its state to an accepting state (see
+        ``_get_distances_to_final``). That estimate never overshoots, and doesn't get better by following an arc, so a match is
+        only taken off the queue once every path that could still lead to a better match has been taken off before it; i.e., the
+        matches come out in order of their weights, and the search is focused on the paths that lead to the best of them.
+
+        Both semirings multiply by adding, and order their weights from least to greatest, so the weights can be compared as-is.
         """
 
-        current_token = input_tokens[0] if input_tokens else None
+        if not isinstance(self._semiring, (TropicalSemiring, LogSemiring)) or self._compiled.arc_weights is None:
+            raise ValueError("N-best queries need an FST weighted over the TropicalSemiring or LogSemiring.")
 
-        for edge in current_node.out_transitions:
+        n_best = options.n_best or 0
+        distinct = options.aggregate
+        pruner = self._get_pruner(options)
+        budget = options.budget
 
-            # If the current transition is an epsilon transition, then consume no input and recurse.
-            if edge.input_symbol == EPSILON:
+        multiply = self._semiring.times
+        depth_limit = self._get_depth_limit()
+        expand = self._get_expander(direction, budget)
+        distances = self._get_distances_to_final()
+        start_weight = self._semiring.multiplicative_identity
 
-                # Case: there are no more input tokens, but you have an epsilon transition to follow.
-                # In this case, you follow the epsilon, and see if you're in an accepting state. If so,
-                # then add the output of this transition to the matches and continue to the recursive step,
-                # since there could be further epsilon transitions to follow.
-                if not current_token and edge.target_node.is_accepting_state and edge.output_symbol:
-                    path_weight = None
+        # Each entry is a priority, a counter that breaks ties in the order entries were found, and the entry itself. A state of
+        # ``-1`` marks a match, whose weight is that of the whole path, and whose path has been joined into a ``_SymbolPath``.
+        order = count()
+        queue: list[tuple[float, int, int, _QueryTrie, Any, Any, int]] = [
+            (distances[self._start_index], next(order), self._start_index, queries, None, start_weight, 0)
+        ]
+        found = 0
+        get_string = self._symbol_table.get_string
+        seen: set[tuple[str, str]] = set()
 
-                    if self._semiring:
-                        path_weight = self._semiring.get_path_weight(edge.weight, edge.target_node.final_state_weight)
+        while queue and found < n_best:
+            priority, _, state, query_node, path, weight, depth = heapq.heappop(queue)
 
-                    yield FstOutput(edge.output_symbol, path_weight)
+            # Every entry left on the queue is at least as bad as this one, so once it's dropped, so are they.
+            if pruner is not None and not pruner.allows(priority):
+                return
 
-                recursive_results = self.__traverse_down(edge.target_node, input_tokens)
+            if state == -1:
+                for query in query_node.queries:
+                    if distinct:
+                        key = (query, get_string(path))
 
-                try:
-                    for result in recursive_results:
-                        output_string = edge.output_symbol + result.output_string
-                        path_weight = None
+                        if key in seen:
+                            continue
 
-                        if self._semiring:
-                            path_weight = self._semiring.get_path_weight(edge.weight, result.path_weight)
-                        
-                        yield FstOutput(output_string, path_weight)
+                        seen.add(key)
 
-                except RecursionError:
-                    pass
+                    if pruner is not None:
+                        pruner.allows_match(weight)
 
-            # If we have found an explicit match of the current token with the edge's input token, then we are going
-            # to want to create the new input symbols for the next level of recursion by chopping off the current token,
-            # and getting the resulting output of that recursion. Then, we'll want to loop over that result, and, since
-            # we consumed an input token over this current transition, we add ``edge.output_symbol + result`` to the matches.
-            elif current_token == edge.input_symbol:
-                
-                new_input_tokens = input_tokens[1:]
+                    yield query, path, weight
+                    found += 1
 
-                if not new_input_tokens and edge.target_node.is_accepting_state:
-                    path_weight = None
+                    if found == n_best:
+                        return
 
-                    if self._semiring:
-                        path_weight = self._semiring.get_path_weight(edge.weight, edge.target_node.final_state_weight)
+                continue
 
-                    yield FstOutput(edge.output_symbol, path_weight)
+            if budget is not None and not budget.visit():
+                return
 
-                recursive_results = self.__traverse_down(edge.target_node, new_input_tokens)
+            matches, steps = expand(state, query_node)
 
-                try:
-                    for result in recursive_results:
-                        output_string = edge.output_symbol + result.output_string
-                        path_weight = None
+            if budget is not None and budget.truncated:
+                return
 
-                        if self._semiring:
-                            path_weight = self._semiring.get_path_weight(edge.weight, result.path_weight)
-                        
-                        yield FstOutput(output_string, path_weight)
+            for match_path, match_weight, match_depth in matches:
+                if 0 < depth + match_depth <= depth_limit:
+                    path_weight = multiply(weight, match_weight)
+                    heapq.heappush(
+                        queue, (path_weight, next(order), -1, query_node, self._join_path(path, match_path), path_weight, depth + match_depth)
+                    )
 
-                except RecursionError:
-                    pass
+            for target_state, next_node, step_path, step_weight, step_depth in steps:
+                distance = distances[target_state]
 
-    #endregion
+                if depth + step_depth <= depth_limit and distance != float('inf'):
+                    next_weight = multiply(weight, step_weight)
+                    heapq.heappush(
+                        queue,
+                        (
+                            next_weight + distance, next(order), target_state, next_node, (step_path, path) if step_path else path,
+                            next_weight, depth + step_depth
+                        )
+                    )
 
 
-    #region Up/Analysis Methods
+    def _get_distances_to_final(self) -> list[float]:
+        """
+        Returns the least weight of any path from each state to an accepting state, including the weight of accepting it. This is
+        computed the first time it is asked for and then kept.
+
+        Returns
+        -------
+        list[float]
+            The distance of each state, indexed by state index; ``inf`` for the states from which no accepting state can be reached.
 
-    def up_analyses(self, wordforms: list[str]) -> dict[str, Generator[FstOutput]]:
+        Note
+        -----
+        These are the reverse shortest distances over the tropical semiring, whatever semiring the weights are in; for the
+        ``LogSemiring``, they're the weights of the best paths rather than the sums over all paths.
         """
-        Calls ``up_analysis`` for each wordform and returns a dictionary keyed on each wordform.
 
-        The values in the dictionary are generators of tagged forms returned by the FST.
+        if self._distances_to_final is None:
+            if isinstance(self._semiring, TropicalSemiring):
+                self._distances_to_final = self._get_shortest_distances(reverse=True)
+            else:
+                self._distances_to_final = shortest_distance(self._compiled, TropicalSemiring(), self._start_index, reverse=True)
+
+        return self._distances_to_final
+
+
+    def _get_expander( # pylint: disable=too-many-locals
+        self,
+        direction: _TraversalDirection,
+        budget: _QueryBudget | None = None
+    ) -> Callable[[int, _QueryTrie], _Expansion]:
+        """
+        Returns a function that works out where a traversal can go from a state and a node of the query trie, relative to the path
+        that reached them.
 
         Parameters
         ----------
-        wordforms : list[str]
-            The list of wordforms to process.
+        direction : _TraversalDirection
+            The direction to walk the FST in.
+
+        budget : _QueryBudget | None, optional
+            The limits of the query, which also bound the work of computing epsilon closures and lookaheads. If they run out, the
+            expansion is incomplete and the query is marked as truncated. Default is None.
 
         Returns
         -------
-        dict[str, Generator[FstOutput]]
-            A dictionary where each key is a wordform and the value is a generator of tagged forms generated by the FST, along with their weights.
+        Callable[[int, _QueryTrie], _Expansion]
+            A function that takes the index of a state and a node of the query trie (i.e., the tokens of the queries that have been
+            consumed), and returns the matches and steps from them. Matches are only given if a query ends at the node.
 
-        See Also
-        --------
-        up_analysis : For more information on how each wordform is processed.
+        Note
+        -----
+        From the state, the traversal jumps straight to every state in its epsilon closure (see ``_get_epsilon_closure``), and only
+        then follows the arcs that consume a next token of the queries. The closure already holds every epsilon path onward, so a
+        state in it that is accepting gives a match if a query ends at the node. An arc is only followed if the lookahead of its
+        target (see ``_get_lookahead``) holds a token that can come next in the queries, so dead branches are cut off before they
+        are pushed rather than after they are walked. Steps and matches are never more than
+        ``recursion_limit`` arcs long, but the caller still has to check the length of the whole path.
+
+        The function is made once per traversal so that everything it looks up is already at hand when it is called for each
+        entry of the traversal.
         """
 
-        tagged_forms = {}
+        compiled = self._compiled
+        arc_targets = compiled.arc_targets
+        arc_weights = compiled.arc_weights
+        final_flags = compiled.final_flags
+        final_weights = compiled.final_weights
+        get_candidate_arcs = direction.index.get_candidate_arcs
+        match_ids = direction.match_ids
+        emit_ids = direction.emit_ids
+        epsilon_closures = direction.epsilon_closures
+        get_epsilon_closure = self._get_epsilon_closure
+        lookaheads = direction.lookaheads
+        get_lookahead = self._get_lookahead
+        multiply = self._semiring.times if self._semiring is not None and arc_weights is not None else None
+        depth_limit = self._get_depth_limit()
+
+        def expand(state: int, query_node: _QueryTrie) -> _Expansion: # pylint: disable=too-many-locals
+            next_tokens = query_node.children
+            matches = []
+            steps = []
+
+            closure = epsilon_closures.get(state)
+
+            if closure is None:
+                closure = get_epsilon_closure(state, direction, budget)
+
+            for closure_state, epsilon_path, epsilon_weight, epsilon_depth in closure:
+                if epsilon_depth > depth_limit:
+                    continue
 
-        for wordform in wordforms:
-            tagged_forms[wordform] = self.up_analysis(wordform)
+                if query_node.queries and final_flags[closure_state]:
+                    match_weight = None
 
-        return tagged_forms
-    
+                    if multiply and final_weights is not None:
+                        match_weight = multiply(epsilon_weight, final_weights[closure_state])
 
-    def up_analysis(self, wordform: str) -> Generator[FstOutput]:
+                    matches.append((epsilon_path, match_weight, epsilon_depth))
+
+                if epsilon_depth == depth_limit:
+                    continue
+
+                for token_id, next_node in next_tokens.items():
+
+                    # At a state with many arcs, the index gives only the epsilon arcs and the arcs that match the token.
+                    for arc_index in get_candidate_arcs(closure_state, token_id):
+
+                        # Epsilon arcs have been followed by the closure, so only arcs that consume the token are left.
+                        if match_ids[arc_index] != token_id:
+                            continue
+
+                        target_state = arc_targets[arc_index]
+                        lookahead = lookaheads.get(target_state)
+
+                        if lookahead is None:
+                            lookahead = get_lookahead(target_state, direction, budget)
+
+                        # A step is only taken if a next token of the queries, or the end of one, is within reach of its target.
+                        if lookahead.isdisjoint(next_node.children) and not (next_node.queries and EPSILON_ID in lookahead):
+                            continue
+
+                        step_weight = None
+
+                        if multiply and arc_weights is not None:
+                            step_weight = multiply(epsilon_weight, arc_weights[arc_index]) if epsilon_depth else arc_weights[arc_index]
+
+                        # Epsilon emits nothing, and so it's left out of the path rather than left out when the output is built.
+                        emit_id = emit_ids[arc_index]
+                        step_path = epsilon_path + (emit_id,) if emit_id != EPSILON_ID else epsilon_path
+
+                        steps.append((target_state, next_node, step_path, step_weight, epsilon_depth + 1))
+
+            return matches, steps
+
+        return expand
+
+
+    def _get_epsilon_closure( # pylint: disable=too-many-locals
+        self,
+        state: int,
+        direction: _TraversalDirection,
+        budget: _QueryBudget | None = None
+    ) -> _EpsilonClosure:
         """
-        Queries the FST up, or in the direction of analysis.
+        Returns the epsilon closure of a state: every state reachable from it by arcs that consume nothing from a query, along with
+        what those arcs emit and weigh. This is computed the first time a state is reached and then kept.
 
         Parameters
         ----------
-        wordform : str
-            The wordform to process.
+        state : int
+            The index of the state.
+
+        direction : _TraversalDirection
+            The direction the FST is being walked in, which decides which arcs consume nothing.
+
+        budget : _QueryBudget | None, optional
+            The limits of the query the closure is computed for. Every state the closure reaches counts as a visit, and if the
+            budget runs out, the closure is cut short, marking the query as truncated, and isn't kept. Default is None.
 
         Returns
         -------
-        Generator[FstOutput]
-            A generator of tagged forms that could lead to the provided wordform, along with their weights.
+        _EpsilonClosure
+            One entry per epsilon path from the state, starting with the empty path to the state itself. Entries are in depth-first
+            order, following the arcs of each state in order.
 
         Note
         -----
-        This function queries the FST in the direction of analysis by starting at the accepting states. Instead of looking at 
-        the input symbols for a node and the out transitions, it looks at the output symbols of the node and the in transitions. 
-        In this way, the FST becomes reversed. For example, ``walking -> wal+GER``. There can be several tagged forms that lead to 
-        a single word. For instance, the word ``walk`` can have forms like ``wal+VERB+1Sg+Pres``, ``wal+VERB+2Sg+Pres``, etc., that lead 
-        to its generation. All these tagged forms are aggregated and returned.
+        An epsilon cycle has infinitely many paths around it, so how far cycles are unrolled is set explicitly: a path may return to
+        a state it has already passed through at most ``epsilon_cycle_limit`` times (by default, as often as fits), and may be at most
+        ``epsilon_limit`` (or, if that isn't set, ``recursion_limit``) arcs long. The closures are thrown away whenever one of these
+        budgets is changed. How often the path being extended passes through each state is counted as the path is walked, so checking
+        an arc costs the same however long the path is.
 
-        This method starts at the accepting states and looks at the output symbols of the node and the in transitions,
-        effectively reversing the FST. While down/generation generates forms from a lemma plus some tags, the up/analysis 
-        direction takes a word form and generates the tagged forms that could lead to that particular word form.
+        Computing a closure changes nothing but the cache it is added to, so concurrent traversals at worst compute it twice.
         """
 
-        original_recursion_limit = 0
-        
-        # If the recursion limit has been set, the save the original value, and set it to the specified one.
-        if self.recursion_limit is not None:
-            original_recursion_limit = sys.getrecursionlimit()
-            sys.setrecursionlimit(self.recursion_limit)
-
-        for accepting_state in self._accepting_states.values():
-            recursive_results = self._traverse_up(accepting_state, wordform)
-
-            # This reverses the final output as the string being returned from the recursion is backwards since we're going in the up direction.
-            for result in recursive_results:
-                finalized_output_string = result.output_string[::-1].replace(EPSILON, '')
-                yield dataclass_replace(result, output_string=finalized_output_string, input_string=wordform)
-
-        # Reset recursion limit before exiting the function.
-        if self.recursion_limit is not None:
-            sys.setrecursionlimit(original_recursion_limit)
-        
+        compiled = self._compiled
+        arc_targets = compiled.arc_targets
+        arc_weights = compiled.arc_weights
+        emit_ids = direction.emit_ids
+        multiply = None
+        initial_weight = None
+
+        if self._semiring is not None and arc_weights is not None:
+            multiply = self._semiring.times
+            initial_weight = self._semiring.multiplicative_identity
+
+        length_limit = self._epsilon_limit if self._epsilon_limit is not None else self._get_depth_limit()
+        cycle_limit = self._epsilon_cycle_limit
+        closure: _EpsilonClosure = []
+
+        # How many times the path being extended passes through each state. A path is walked depth first, and an entry with a
+        # length of ``-1`` marks where the walk backs out of a state, so that it can be taken off the path again.
+        on_path: dict[int, int] = {}
+
+        # Each entry is an epsilon path: the state it reached, what it emitted, its weight, and its length.
+        stack: list[tuple[int, _SymbolPath, Any, int]] = [(state, (), initial_weight, 0)]
+
+        while stack:
+            current_state, emitted, weight, length = stack.pop()
+
+            if length == -1:
+                on_path[current_state] -= 1
+                continue
 
-    def _traverse_up(self, current_state: _FstNode, wordform: str) -> Generator[FstOutput]:
+            if budget is not None and not budget.visit():
+                return closure
+
+            closure.append((current_state, emitted, weight, length))
+
+            if length == length_limit:
+                continue
+
+            on_path[current_state] = on_path.get(current_state, 0) + 1
+            stack.append((current_state, (), None, -1))
+            next_entries = []
+
+            for arc_index in direction.index.get_arcs(current_state, EPSILON_ID):
+                target_state = arc_targets[arc_index]
+
+                if cycle_limit is not None and on_path.get(target_state, 0) > cycle_limit:
+                    continue
+
+                arc_weight = None if arc_weights is None else arc_weights[arc_index]
+                emit_id = emit_ids[arc_index]
+
+                next_entries.append((
+                    target_state,
+                    emitted + (emit_id,) if emit_id != EPSILON_ID else emitted,
+                    multiply(weight, arc_weight) if multiply else None,
+                    length + 1,
+                ))
+
+            next_entries.reverse()
+            stack.extend(next_entries)
+
+        direction.epsilon_closures[state] = closure
+        return closure
+
+
+    def _get_lookahead(self, state: int, direction: _TraversalDirection, budget: _QueryBudget | None = None) -> frozenset[int]:
         """
-        Handles the recursive walk through the FST.
+        Returns the lookahead of a state: the symbol IDs that can be matched next from it, after following any epsilon arcs. This
+        is computed the first time a state is reached and then kept.
 
         Parameters
         ----------
-        current_state : _FstNode
-            The current state node to start the traversal from.
-            
-        wordform : str
-            The wordform to be processed during the traversal.
-        
+        state : int
+            The index of the state.
+
+        direction : _TraversalDirection
+            The direction the FST is being walked in, which decides which symbols are matched.
+
+        budget : _QueryBudget | None, optional
+            The limits of the query, which bound the epsilon closure the lookahead is read off. A lookahead read off a closure that
+            was cut short isn't kept. Default is None.
+
         Returns
         -------
-        Generator[FstOutput]
-            A generator of symbols outputted from the FST during the walk, along with their weights.
+        frozenset[int]
+            The symbol IDs of the arcs that consume a symbol from the states in the epsilon closure of the state. This also holds
+            ``EPSILON_ID`` if one of those states is accepting, i.e. if a query can end at the state.
 
         Note
         -----
-        This function recursively walks through the FST starting from the given state node.
+        The lookahead is read off the epsilon closure, so it follows epsilon arcs within the same budgets as the traversal, and is
+        thrown away with the closures.
         """
-        
-        current_char = wordform[-1] if wordform else None
 
-        for edge in current_state.in_transitions:
+        arc_offsets = self._compiled.arc_offsets
+        final_flags = self._compiled.final_flags
+        match_ids = direction.match_ids
+        closure = direction.epsilon_closures.get(state)
 
-            def yield_results(new_wordform: str, current_edge: _FstEdge) -> Generator[FstOutput]:
-                
-                recursive_results: Generator[FstOutput] = self._traverse_up(current_edge.source_node, new_wordform)
-            
-                try:
-                    for result in recursive_results:
-                        output_string = current_edge.input_symbol[::-1] + result.output_string
-                        path_weight = None
+        if closure is None:
+            closure = self._get_epsilon_closure(state, direction, budget)
+
+        symbol_ids: set[int] = set()
+
+        for closure_state in {closure_state for closure_state, _, _, _ in closure}:
+            symbol_ids.update(match_ids[arc_offsets[closure_state]:arc_offsets[closure_state + 1]])
 
-                        if self._semiring:
-                            path_weight = self._semiring.get_path_weight(current_edge.weight, result.path_weight)
+        # The epsilon arcs have been followed by the closure, and so epsilon only marks the accepting states.
+        symbol_ids.discard(EPSILON_ID)
 
-                        yield FstOutput(output_string, path_weight)
+        if any(final_flags[closure_state] for closure_state, _, _, _ in closure):
+            symbol_ids.add(EPSILON_ID)
 
-                except RecursionError:
-                    pass
+        lookahead = frozenset(symbol_ids)
 
-            # If the current character matches the output symbol and takes you to the starting state, i.e. the end of the walk.
-            if current_char == edge.output_symbol and edge.source_node.id == Fst._STARTING_STATE:
+        if budget is None or not budget.truncated:
+            direction.lookaheads[state] = lookahead
 
-                new_wordform = wordform[:-1]
+        return lookahead
 
-                # Since we're at the starting state, we check if there are any input characters left. If not, then we are at our base case.
-                if not new_wordform:
-                    # This reverses the symbol since we're going up instead of down.
-                    yield FstOutput(edge.input_symbol[::-1], edge.weight)
 
-                yield from yield_results(new_wordform, edge)
+    def _get_depth_limit(self) -> int:
+        """
+        Returns the depth budget of a traversal; i.e., the most arcs a path may follow.
+
+        Returns
+        -------
+        int
+            The ``recursion_limit``, or ``_DEFAULT_RECURSION_LIMIT`` if it isn't set.
+        """
+        return Fst._DEFAULT_RECURSION_LIMIT if self._recursion_limit is None else self._recursion_limit
 
-            # Otherwise, output symbol is epsilon, then consume no characters.
-            elif edge.output_symbol == EPSILON:
-                yield from yield_results(wordform, edge)
 
-            # Otherwise, current character matches output character, so chop off the current character..
-            elif current_char == edge.output_symbol:
-                yield from yield_results(wordform[:-1], edge)
+    def _clear_epsilon_closures(self) -> None:
+        """
+        Throws away the epsilon closures and the lookaheads read off them, which have to be recomputed whenever the budgets they were
+        computed with change.
+        """
+        self._down.epsilon_closures.clear()
+        self._down.lookaheads.clear()
+        self._up.epsilon_closures.clear()
+        self._up.lookaheads.clear()
 
     #endregion
@@ -0,0 +1,341 @@
+"""
+This module runs bulk queries of an FST over a pool of worker processes (see ``Fst.up_analyses_parallel`` and
+``Fst.down_generations_parallel``). Each worker loads the FST once, from a compiled ``.attc`` file, and then answers chunks of the
+queries; the results are streamed back in the order of the queries.
+
+Attributes
+----------
+map_queries : function
+    Runs a query function of an FST over many inputs, in a pool of worker processes or, for small batches, in this process.
+"""
+
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import chain, islice
+import multiprocessing
+import os
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator
+
+if TYPE_CHECKING:
+    from fst_runtime.fst import Fst, FstOutput
+    from fst_runtime.semiring import Semiring
+
+
+_worker_fst: Fst | None = None # pylint: disable=invalid-name
+"""The FST of this process, if it is a worker; loaded once by ``_initialize_worker``."""
+
+
+@dataclass(frozen=True)
+class _WorkerSettings: # pylint: disable=too-many-instance-attributes
+    """
+    Holds what a worker process needs to load the same FST as the process that started it.
+
+    Attributes
+    ----------
+    compiled_file_path : str
+        The path to the compiled ``.attc`` file of the FST.
+
+    semiring : Semiring | None
+        The semiring of the FST, which is pickled over to the worker.
+
+    recursion_limit : int | None
+        The depth budget of the FST.
+
+    epsilon_limit : int | None
+        The most arcs in a row a path may follow without consuming a symbol of the query.
+
+    epsilon_cycle_limit : int | None
+        How many times a run of epsilon arcs may go around a cycle.
+
+    lazy : bool
+        Whether the compiled file is loaded lazily, reading and indexing its states only once they're reached.
+
+    state_cache_size : int | None
+        How many states the epsilon closures, lookaheads and lazy arc indexes are kept for.
+
+    tokenization_cache_size : int | None
+        How many tokenized queries are kept.
+    """
+
+    compiled_file_path: str
+    """The path to the compiled ``.attc`` file of the FST."""
+
+    semiring: Semiring | None
+    """The semiring of the FST, which is pickled over to the worker."""
+
+    recursion_limit: int | None
+    """The depth budget of the FST."""
+
+    epsilon_limit: int | None
+    """The most arcs in a row a path may follow without consuming a symbol of the query."""
+
+    epsilon_cycle_limit: int | None
+    """How many times a run of epsilon arcs may go around a cycle."""
+
+    lazy: bool
+    """Whether the compiled file is loaded lazily, reading and indexing its states only once they're reached."""
+
+    state_cache_size: int | None
+    """How many states the epsilon closures, lookaheads and lazy arc indexes are kept for."""
+
+    tokenization_cache_size: int | None
+    """How many tokenized queries are kept."""
+
+
+def _initialize_worker(settings: _WorkerSettings) -> None:
+    """
+    Loads the FST of a worker process, once, when the process starts, with the same options as the FST of the process that started
+    it. The compiled file is always mapped into memory, so all the workers share one copy of the FST.
+
+    Parameters
+    ----------
+    settings : _WorkerSettings
+        Where to load the FST from, and how to set it up.
+    """
+
+    # The ``fst`` module imports this one, so it can only be imported once both are loaded.
+    from fst_runtime.fst import Fst # pylint: disable=import-outside-toplevel
+
+    global _worker_fst # pylint: disable=global-statement
+
+    _worker_fst = Fst.load_compiled(
+        settings.compiled_file_path,
+        semiring=settings.semiring,
+        recursion_limit=settings.recursion_limit,
+        epsilon_limit=settings.epsilon_limit,
+        epsilon_cycle_limit=settings.epsilon_cycle_limit,
+        memory_map=True,
+        lazy=settings.lazy,
+        state_cache_size=settings.state_cache_size,
+        tokenization_cache_size=settings.tokenization_cache_size,
+    )
+
+
+def _query_chunk(method_name: str, inputs: list[str], options: dict[str, Any]) -> list[list[FstOutput]]:
+    """
+    Runs a query function of the FST of a worker process over a chunk of inputs.
+
+    Parameters
+    ----------
+    method_name : str
+        The name of the query function of ``Fst``, e.g. ``'up_analysis'``.
+
+    inputs : list[str]
+        The inputs to query.
+
+    options : dict[str, Any]
+        The keyword arguments of the query function.
+
+    Returns
+    -------
+    list[list[FstOutput]]
+        The outputs of each input, in the order of the inputs.
+    """
+
+    assert _worker_fst is not None, "The worker process wasn't initialized with an FST."
+    return _run_queries(_worker_fst, method_name, inputs, options)
+
+
+def _run_queries(fst: Fst, method_name: str, inputs: Iterable[str], options: dict[str, Any]) -> list[list[FstOutput]]:
+    """
+    Runs a query function of an FST over some inputs, in this process.
+
+    Parameters
+    ----------
+    fst : Fst
+        The FST to query.
+
+    method_name : str
+        The name of the query function of ``Fst``.
+
+    inputs : Iterable[str]
+        The inputs to query.
+
+    options : dict[str, Any]
+        The keyword arguments of the query function.
+
+    Returns
+    -------
+    list[list[FstOutput]]
+        The outputs of each input, in the order of the inputs.
+    """
+
+    query = getattr(fst, method_name)
+    return [list(query(query_input, **options)) for query_input in inputs]
+
+
+def _chunk(inputs: Iterator[str], chunksize: int) -> Iterator[list[str]]:
+    """
+    Splits inputs into chunks, as they are read.
+
+    Parameters
+    ----------
+    inputs : Iterator[str]
+        The inputs.
+
+    chunksize : int
+        The number of inputs per chunk; the last chunk may be smaller.
+
+    Returns
+    -------
+    Iterator[list[str]]
+        The chunks, in order.
+    """
+
+    while chunk := list(islice(inputs, chunksize)):
+        yield chunk
+
+
+def map_queries( # pylint: disable=too-many-arguments
+    fst: Fst,
+    method_name: str,
+    inputs: Iterable[str],
+    options: dict[str, Any],
+    *,
+    get_settings: Callable[[], _WorkerSettings],
+    workers: int | None,
+    chunksize: int,
+    min_parallel_size: int
+) -> Iterator[tuple[str, list[FstOutput]]]:
+    """
+    Runs a query function of an FST over many inputs, in a pool of worker processes or, for small batches, in this process.
+
+    Parameters
+    ----------
+    fst : Fst
+        The FST to query, which answers the queries itself if the batch is small.
+
+    method_name : str
+        The name of the query function of ``Fst``, e.g. ``'up_analysis'``.
+
+    inputs : Iterable[str]
+        The inputs to query. These are read as the results are taken, so they may be a generator over a large corpus.
+
+    options : dict[str, Any]
+        The keyword arguments of the query function. These are pickled over to the workers.
+
+    get_settings : Callable[[], _WorkerSettings]
+        Returns how the workers load the FST. This is only called once the batch is known to be large enough to start workers
+        for, since it may have to write the FST to a compiled file; see ``Fst._get_worker_settings``.
+
+    workers : int | None
+        The number of worker processes. ``None`` uses one per CPU.
+
+    chunksize : int
+        The number of inputs sent to a worker at a time.
+
+    min_parallel_size : int
+        The fewest inputs that are worth starting worker processes for. Smaller batches are run in this process.
+
+    Returns
+    -------
+    Iterator[tuple[str, list[FstOutput]]]
+        Each input along with its outputs, in the order of the inputs.
+
+    Raises
+    ------
+    ValueError
+        This error is raised if ``chunksize`` is less than 1, or ``workers`` is given and is less than 1.
+
+    Note
+    -----
+    At most two chunks per worker are in flight at any time, so the inputs are read, and the results kept, only a little ahead of
+    the caller; a corpus that doesn't fit in memory can be streamed through. Stopping early (e.g. by closing the iterator) cancels
+    the chunks that haven't started.
+
+    The workers are spawned as fresh interpreters rather than forked, since forking a process that runs threads can deadlock,
+    and they load the FST from its file anyway. As with any spawned process, a script that starts them has to do so under
+    ``if __name__ == '__main__':``.
+    """
+
+    if chunksize < 1:
+        raise ValueError(f"The chunksize must be at least 1, but {chunksize} was given.")
+
+    if workers is not None and workers < 1:
+        raise ValueError(f"The number of workers must be at least 1, but {workers} was given.")
+
+    # The queries are only run once the results are taken, but invalid options are reported right away.
+    return _stream_queries(
+        fst, method_name, inputs, options,
+        get_settings=get_settings, workers=workers, chunksize=chunksize, min_parallel_size=min_parallel_size
+    )
+
+
+def _stream_queries( # pylint: disable=too-many-arguments,too-many-locals
+    fst: Fst,
+    method_name: str,
+    inputs: Iterable[str],
+    options: dict[str, Any],
+    *,
+    get_settings: Callable[[], _WorkerSettings],
+    workers: int | None,
+    chunksize: int,
+    min_parallel_size: int
+) -> Iterator[tuple[str, list[FstOutput]]]:
+    """
+    Runs a query function of an FST over many inputs as the results are taken; see ``map_queries``, which checks the options.
+
+    Parameters
+    ----------
+    fst : Fst
+        The FST to query.
+
+    method_name : str
+        The name of the query function of ``Fst``.
+
+    inputs : Iterable[str]
+        The inputs to query.
+
+    options : dict[str, Any]
+        The keyword arguments of the query function.
+
+    get_settings : Callable[[], _WorkerSettings]
+        Returns how the workers load the FST.
+
+    workers : int | None
+        The number of worker processes, at least 1, or ``None`` for one per CPU.
+
+    chunksize : int
+        The number of inputs sent to a worker at a time, at least 1.
+
+    min_parallel_size : int
+        The fewest inputs that are worth starting worker processes for.
+
+    Returns
+    -------
+    Iterator[tuple[str, list[FstOutput]]]
+        Each input along with its outputs, in the order of the inputs.
+    """
+
+    inputs = iter(inputs)
+    head = list(islice(inputs, max(min_parallel_size, 1)))
+
+    # All the inputs have been read if there are fewer than asked for.
+    if not head or len(head) < min_parallel_size:
+        yield from zip(head, _run_queries(fst, method_name, head, options))
+        return
+
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunk(chain(head, inputs), chunksize)
+    executor = ProcessPoolExecutor(
+        workers, mp_context=multiprocessing.get_context('spawn'), initializer=_initialize_worker, initargs=(get_settings(),)
+    )
+    pending: deque[tuple[list[str], Future[list[list[FstOutput]]]]] = deque()
+
+    try:
+        for chunk in islice(chunks, 2 * workers):
+            pending.append((chunk, executor.submit(_query_chunk, method_name, chunk, options)))
+
+        while pending:
+            chunk, future = pending.popleft()
+            outputs = future.result()
+
+            for next_chunk in islice(chunks, 1):
+                pending.append((next_chunk, executor.submit(_query_chunk, method_name, next_chunk, options)))
+
+            yield from zip(chunk, outputs)
+
+    finally:
+        executor.shutdown(cancel_futures=True)
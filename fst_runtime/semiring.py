@@ -24,8 +24,10 @@ TropicalSemiring[float] : class
 '''
 
 from abc import ABC, abstractmethod
+from functools import reduce
 import math
-from typing import Callable, Any
+import operator
+from typing import Any, Callable, Iterable, Literal, cast
 
 class Semiring[T](ABC):
     """
@@ -45,12 +47,33 @@ class Semiring[T](ABC):
     multiply : method
         The multiplication operation for the semiring.
 
+    plus : Callable[[T, T], T]
+        The addition operation as a plain function, for code that adds many weights, like the traversals of an FST.
+
+    times : Callable[[T, T], T]
+        The multiplication operation as a plain function, for code that multiplies many weights.
+
+    add_all : method
+        Adds up any number of weights.
+
+    multiply_all : method
+        Multiplies any number of weights together.
+
     get_path_weight : method
         Computes the overall weight of a single path by multiplying the weights of all edges in the path.
 
     get_path_set_weight : method
         Computes the overall weight of a set of paths by adding the weights of individual paths.
 
+    is_ordered : bool
+        Whether the semiring defines which of two weights is better.
+
+    natural_order : Literal['min', 'max'] | None
+        Whether the least or the greatest weights are the better ones, if the semiring orders its weights that way.
+
+    is_better : method
+        Returns whether one weight is strictly better than another, e.g. a lower cost or a higher probability.
+
     check_membership : abstract method
         This method ensures that the values provided to it are members of the underlying set of the semiring. Raises a ``ValueError`` if not.
     
@@ -86,12 +109,15 @@ class Semiring[T](ABC):
         Lothaire, *Applied Combinatorics on Words* (Cambridge: Cambridge University Press, 2004), 200.
     """
 
-    def __init__(
+    def __init__( # pylint: disable=too-many-arguments
             self,
             add: Callable[[T, T], T],
             multiply: Callable[[T, T], T],
             additive_identity: T,
-            multiplicative_identity: T
+            multiplicative_identity: T,
+            better: Callable[[T, T], bool] | None = None,
+            *,
+            natural_order: Literal['min', 'max'] | None = None
         ) -> None:
         """
         Initializes the semiring with the specified operations and identity elements.
@@ -110,12 +136,24 @@ class Semiring[T](ABC):
         multiplicative_identity : T
             The identity element for the multiplication operation.
 
+        better : Callable[[T, T], bool] | None, optional
+            A function that returns whether its first argument is a strictly better weight than its second, which is what ranking
+            and pruning paths by their weights uses. Default is ``None``, which takes the order from ``natural_order``, if any.
+
+        natural_order : Literal['min', 'max'] | None, optional
+            ``'min'`` if lesser weights are better, as with costs, or ``'max'`` if greater weights are better, as with
+            probabilities. Default is ``None``, for semirings whose weights have no such order.
         """
 
+        if better is None and natural_order is not None:
+            better = cast(Callable[[T, T], bool], operator.lt if natural_order == 'min' else operator.gt)
+
         self._add = add
         self._multiply = multiply
         self._additive_identity = additive_identity
         self._multiplicative_identity = multiplicative_identity
+        self._better: Callable[[T, T], bool] | None = better
+        self._natural_order: Literal['min', 'max'] | None = natural_order
         
     @property
     def additive_identity(self) -> T:
@@ -142,6 +180,88 @@ class Semiring[T](ABC):
         """
 
         return self._multiplicative_identity
+
+    @property
+    def is_ordered(self) -> bool:
+        """
+        Whether the semiring defines which of two weights is better; see ``is_better``.
+
+        Returns
+        -------
+        bool
+            ``True`` if ``is_better`` can be used.
+        """
+
+        return self._better is not None
+
+    @property
+    def natural_order(self) -> Literal['min', 'max'] | None:
+        """
+        Whether the least (``'min'``) or the greatest (``'max'``) weights are the better ones.
+
+        Returns
+        -------
+        Literal['min', 'max'] | None
+            The natural order of the weights, or ``None`` if the semiring doesn't order its weights by their value.
+        """
+
+        return self._natural_order
+
+    @property
+    def plus(self) -> Callable[[T, T], T]:
+        """
+        The addition operation of the semiring as a plain function of two weights. Calling it does the same as calling ``add``,
+        without going through a method first, which adds up for code that adds many weights, like the traversals of an FST.
+
+        Returns
+        -------
+        Callable[[T, T], T]
+            The addition operation.
+        """
+
+        return self._add if type(self).add is Semiring.add else self.add
+
+    @property
+    def times(self) -> Callable[[T, T], T]:
+        """
+        The multiplication operation of the semiring as a plain function of two weights. Calling it does the same as calling
+        ``multiply``, without going through a method first; see ``plus``.
+
+        Returns
+        -------
+        Callable[[T, T], T]
+            The multiplication operation.
+        """
+
+        return self._multiply if type(self).multiply is Semiring.multiply else self.multiply
+
+    def is_better(self, a: T, b: T) -> bool:
+        """
+        Returns whether one weight is strictly better than another; e.g., a lower cost, or a higher probability.
+
+        Parameters
+        ----------
+        a : T
+            The first weight.
+
+        b : T
+            The second weight.
+
+        Returns
+        -------
+        bool
+            Whether ``a`` is strictly better than ``b``.
+
+        Raises
+        ------
+        ValueError
+            This error is raised if the semiring has no order; see ``is_ordered``.
+        """
+
+        if self._better is None:
+            raise ValueError(f"The {type(self).__name__} doesn't define which of two weights is better.")
+
+        return self._better(a, b)
         
     def add(self, a: T, b: T) -> T:
         """
@@ -194,6 +314,40 @@ class Semiring[T](ABC):
 
         return self._multiply(a, b)
 
+    def add_all(self, weights: Iterable[T]) -> T:
+        """
+        Adds up any number of weights, starting from the additive identity.
+
+        Parameters
+        ----------
+        weights : Iterable[T]
+            The weights to add up.
+
+        Returns
+        -------
+        T
+            The sum of the weights, or the additive identity if there are none.
+        """
+
+        return reduce(self.plus, weights, self.additive_identity)
+
+    def multiply_all(self, weights: Iterable[T]) -> T:
+        """
+        Multiplies any number of weights together, in order, starting from the multiplicative identity.
+
+        Parameters
+        ----------
+        weights : Iterable[T]
+            The weights to multiply.
+
+        Returns
+        -------
+        T
+            The product of the weights, or the multiplicative identity if there are none.
+        """
+
+        return reduce(self.times, weights, self.multiplicative_identity)
+
     def get_path_weight(self, *path_weights: T) -> T:
         """
         Computes the overall weight of a single path by multiplying the weights of all edges in the path.
@@ -213,12 +367,7 @@ class Semiring[T](ABC):
         Lothaire, *Applied Combinatorics on Words* (Cambridge: Cambridge University Press, 2004), 201.
         """
 
-        overall_path_weight = self.multiplicative_identity
-
-        for path_weight in path_weights:
-            overall_path_weight = self.multiply(overall_path_weight, path_weight)
-
-        return overall_path_weight
+        return self.multiply_all(path_weights)
 
     def get_path_set_weight(self, *set_of_path_weights: T) -> T:
         """
@@ -239,12 +388,7 @@ class Semiring[T](ABC):
         Lothaire, *Applied Combinatorics on Words* (Cambridge: Cambridge University Press, 2004), 201.
         """
 
-        overall_set_weight = self.additive_identity
-
-        for path_weight in set_of_path_weights:
-            overall_set_weight = self.add(overall_set_weight, path_weight)
-
-        return overall_set_weight
+        return self.add_all(set_of_path_weights)
 
     @abstractmethod
     def check_membership(self, *values: Any) -> bool:
@@ -287,6 +431,12 @@ class BooleanSemiring(Semiring[bool]):
 
     Attributes
     ----------
+    add_all : method
+        Returns whether any of the weights is ``True``.
+
+    multiply_all : method
+        Returns whether all of the weights are ``True``.
+
     check_membership : method
         Checks that all provided values are boolean.
 
@@ -295,8 +445,9 @@ class BooleanSemiring(Semiring[bool]):
 
     Note
     -----
-    The boolean semiring defines ``add`` as the ``or`` operator and ``multiply`` as the ``and`` operator.
-    The additive identity of the semiring is ``False``, and the multiplicative idenity is ``True``.
+    The boolean semiring defines ``add`` as the ``or`` operator and ``multiply`` as the ``and`` operator, which are the ``|`` and
+    ``&`` operators on booleans.
+    The additive identity of the semiring is ``False``, and the multiplicative idenity is ``True``. ``True`` is the better weight.
 
     This is also apparently the smallest semiring that is not a ring.
 
@@ -313,12 +464,21 @@ class BooleanSemiring(Semiring[bool]):
     def __init__(self) -> None:
 
         super().__init__(
-            add=lambda a, b: a or b,
-            multiply=lambda a, b: a and b,
+            add=operator.or_,
+            multiply=operator.and_,
             additive_identity=False,
             multiplicative_identity=True,
+            natural_order='max',
         )
 
+    def add_all(self, weights: Iterable[bool]) -> bool:
+        """Returns whether any of the weights is ``True``."""
+        return any(weights)
+
+    def multiply_all(self, weights: Iterable[bool]) -> bool:
+        """Returns whether all of the weights are ``True``."""
+        return all(weights)
+
     def check_membership(self, *values: Any) -> bool:
         """
         Checks that all provided values are boolean.
@@ -364,6 +524,9 @@ class LogSemiring(Semiring[float]):
 
     Attributes
     ----------
+    add_all : method
+        Adds up any number of weights with logadd, in a single step.
+
     check_membership : method
         Checks that all provided values are real numbers or +/- infinity.
     
@@ -375,13 +538,17 @@ class LogSemiring(Semiring[float]):
     This is also known as the minimum logarithmic semiring, given the negation of the log and the exponents of e.
 
     This semiring defines ``add`` as ``-math.log(math.exp(-a) + math.exp(-b))`` and ``multiply`` as ``a + b``.
-    It defines the additive identity as ``float('inf')``, and the multiplicative identity as ``0.0``.
+    It defines the additive identity as ``float('inf')``, and the multiplicative identity as ``0.0``. Lower weights are better.
 
     This ``add`` function is a smooth approximation of the minimum of the values ``a`` and ``b``. This sort of operation
     is known as the log-sum-exp trick, which allows for higher precision when doing floating-point arithmetic on large or small
     values by shifting the values into a domain that's better suited for floating-point precision. This sort of equation is often
     used in probability theory, as logarithms can have a bunch of benefits for calculations.
 
+    The ``add`` is computed as ``min(a, b) - math.log1p(math.exp(-abs(a - b)))``, which is the same value, but never takes the
+    exponent of a large weight: ``math.exp(-a)`` underflows to ``0.0`` once ``a`` is more than about ``745``, as the weights of
+    long paths can be, which would turn the sum into ``inf``.
+
     See Also
     --------
     Semiring : The base class of the ``LogSemiring`` with ``T = float``.
@@ -401,12 +568,41 @@ class LogSemiring(Semiring[float]):
     def __init__(self) -> None:
         
         super().__init__(
-            add=lambda a, b: -math.log(math.exp(-a) + math.exp(-b)),
-            multiply=lambda a, b: a + b,
+            add=_log_add,
+            multiply=operator.add,
             additive_identity=float('inf'),
             multiplicative_identity=0.0,
+            natural_order='min',
         )
 
+    def add_all(self, weights: Iterable[float]) -> float:
+        """
+        Adds up any number of weights with logadd, in a single step.
+
+        Parameters
+        ----------
+        weights : Iterable[float]
+            The weights to add up.
+
+        Returns
+        -------
+        float
+            The sum of the weights, or ``float('inf')`` if there are none.
+
+        Note
+        -----
+        This is the log-sum-exp trick: the least weight is factored out, so that every exponent taken is of a number of at most
+        ``0``, and the exponents are summed exactly with ``math.fsum``.
+        """
+
+        weights = list(weights)
+        least = min(weights, default=math.inf)
+
+        if math.isinf(least):
+            return least
+
+        return least - math.log(math.fsum([math.exp(least - weight) for weight in weights]))
+
     def check_membership(self, *values: Any) -> bool:
         """
         Checks that all provided values are real numbers or +/- infinity.
@@ -447,7 +643,8 @@ class ProbabilitySemiring(Semiring[float]):
 
     Note
     -----
-    This semiring uses standard addition and multiplication, and is meant for managing weights that are probabilities.
+    This semiring uses standard addition and multiplication, and is meant for managing weights that are probabilities. Higher
+    weights are better.
     
     See Also
     --------
@@ -458,10 +655,11 @@ class ProbabilitySemiring(Semiring[float]):
     def __init__(self) -> None:
         
         super().__init__(
-            add=lambda a, b: a + b,
-            multiply=lambda a, b: a * b,
+            add=operator.add,
+            multiply=operator.mul,
             additive_identity=0.0,
-            multiplicative_identity=1.0
+            multiplicative_identity=1.0,
+            natural_order='max',
         )
 
     def check_membership(self, *values: Any) -> bool:
@@ -500,6 +698,9 @@ class TropicalSemiring(Semiring[float]):
 
     Attributes
     ----------
+    add_all : method
+        Returns the least of any number of weights.
+
     check_membership : method
         Checks that all provided values are real numbers or +/- infinity.
     
@@ -511,6 +712,7 @@ class TropicalSemiring(Semiring[float]):
     This is also known as the minimum tropical semiring for its use of ``min``, instead of ``max``, as the addition function.
     
     As mentioned, ``add`` is defined as ``min{a, b}``. Multiplication is defined as standard addition. The additive identity is ``float('inf')``.
+    Lower weights are better.
 
     The way this works is that for a given output form, you may end up with a bunch of different paths that got you there. Each of those paths
     will have its own weight, and, because addition is ``min``, that means when you sum the paths together, the result you get is the lowest
@@ -531,12 +733,17 @@ class TropicalSemiring(Semiring[float]):
     def __init__(self) -> None:
 
         super().__init__(
-            add=min,
-            multiply=lambda a, b: a + b,
+            add=_tropical_add,
+            multiply=operator.add,
             additive_identity=float('inf'),
             multiplicative_identity=0.0,
+            natural_order='min',
         )
 
+    def add_all(self, weights: Iterable[float]) -> float:
+        """Returns the least of the weights, or ``float('inf')`` if there are none."""
+        return min(weights, default=math.inf)
+
     def check_membership(self, *values: Any) -> bool:
         """
         Checks that all provided values are real numbers or +/- infinity.
@@ -564,3 +771,55 @@ class TropicalSemiring(Semiring[float]):
         return float(string_representation_of_value)
 
 #endregion
+
+
+#region Kernels
+
+def _log_add(a: float, b: float) -> float:
+    """
+    Adds two weights of the ``LogSemiring``, i.e. ``-math.log(math.exp(-a) + math.exp(-b))``, without underflowing.
+
+    Parameters
+    ----------
+    a : float
+        The first weight.
+
+    b : float
+        The second weight.
+
+    Returns
+    -------
+    float
+        The sum of the weights.
+    """
+
+    if a > b:
+        a, b = b, a
+
+    # Adding infinity (i.e. a probability of ``0``) changes nothing, and the difference of two infinities isn't a number.
+    if b == math.inf or a == -math.inf:
+        return a
+
+    return a - math.log1p(math.exp(a - b))
+
+
+def _tropical_add(a: float, b: float) -> float:
+    """
+    Adds two weights of the ``TropicalSemiring``, i.e. returns the lesser of them. This is faster than ``min`` for two values.
+
+    Parameters
+    ----------
+    a : float
+        The first weight.
+
+    b : float
+        The second weight.
+
+    Returns
+    -------
+    float
+        The lesser weight.
+    """
+    return a if a <= b else b
+
+#endregion
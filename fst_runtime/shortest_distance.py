@@ -0,0 +1,441 @@
+"""
+This module computes shortest distances over the flat arrays of an FST (see ``fst_runtime.compiled_fst``), for the weights of any
+semiring; i.e., the sum, under the semiring, of the weights of every path from the start state to each state, or from each state
+to the accepting states.
+
+Attributes
+----------
+shortest_distance : function
+    Computes the shortest distance of every state of an FST over a semiring.
+
+topological_order : function
+    Returns the states of an FST in topological order, or ``None`` if the FST has a cycle.
+
+DELTA : float
+    How close, relative to their size, two real-valued distances must be for the generic algorithm to consider them converged.
+"""
+
+from __future__ import annotations
+from collections import deque
+import heapq
+import math
+from typing import TYPE_CHECKING, Any
+
+from fst_runtime.semiring import Semiring, TropicalSemiring
+
+if TYPE_CHECKING:
+    from fst_runtime.compiled_fst import _CompiledFst
+
+
+DELTA: float = 1.0 / 1024
+"""
+How close, relative to their size, two real-valued distances must be for the generic algorithm to consider them converged.
+Semirings like the log and probability semirings add up infinitely many paths around a cycle, which only converge in the limit.
+"""
+
+
+def shortest_distance(compiled: _CompiledFst, semiring: Semiring, start_index: int, *, reverse: bool = False) -> list[Any]:
+    """
+    Computes the shortest distance of every state of an FST over a semiring.
+
+    Going forward, the distance of a state is the sum of the weights of every path from the start state to it. Going in reverse,
+    it's the sum of the weights of every path from it to an accepting state, times the weight of accepting the path; so the
+    reverse distance of the start state is the total weight of the FST.
+
+    Parameters
+    ----------
+    compiled : _CompiledFst
+        The FST as flat arrays, with weights in the domain of the semiring.
+
+    semiring : Semiring
+        The semiring to add and multiply the weights with.
+
+    start_index : int
+        The index of the start state.
+
+    reverse : bool, optional
+        Whether to compute the distances to the accepting states, rather than from the start state. Default is False.
+
+    Returns
+    -------
+    list[Any]
+        The distance of each state, indexed by state index. States that no path connects get the additive identity.
+
+    Note
+    -----
+    There are three algorithms, and the fastest one that applies is used:
+
+    1. If the FST has no cycles, the states are visited once each, in topological order (or its reverse). This is exact for
+       every semiring.
+    2. For the tropical semiring, Dijkstra's algorithm is used, taking states up again whenever their distance improves, so
+       that negative weights work too as long as no cycle has a negative weight.
+    3. Otherwise, Mohri's generic single-source shortest-distance algorithm is used: each state keeps the weight added to its
+       distance since it was last visited, and passes only that on along its arcs. This is exact for semirings like the boolean
+       semiring, whose sums over cycles settle after finitely many steps, and converges to within a relative ``DELTA`` for the log
+       and probability semirings, as long as every cycle weighs less than the multiplicative identity.
+
+    References
+    ----------
+    Mohri, M. (2002). Semiring frameworks and algorithms for shortest-distance problems. *Journal of Automata, Languages and
+    Combinatorics*, 7(3), 321-350.
+    """
+
+    order = topological_order(compiled)
+    arcs = _get_reverse_arcs(compiled) if reverse else _get_forward_arcs(compiled)
+
+    if order is not None:
+        return _acyclic_shortest_distance(compiled, semiring, start_index, arcs, order[::-1] if reverse else order, reverse)
+
+    if isinstance(semiring, TropicalSemiring):
+        return _tropical_shortest_distance(compiled, semiring, start_index, arcs, reverse)
+
+    return _generic_shortest_distance(compiled, semiring, start_index, arcs, reverse)
+
+
+def topological_order(compiled: _CompiledFst) -> list[int] | None:
+    """
+    Returns the states of an FST in topological order, i.e. with every state before the states its arcs lead to.
+
+    Parameters
+    ----------
+    compiled : _CompiledFst
+        The FST as flat arrays.
+
+    Returns
+    -------
+    list[int] | None
+        The state indices in topological order, or ``None`` if the FST has a cycle (including an arc from a state to itself).
+    """
+
+    arc_offsets = compiled.arc_offsets
+    arc_targets = compiled.arc_targets
+    in_degrees = [0] * compiled.num_states
+
+    for target in arc_targets:
+        in_degrees[target] += 1
+
+    order = [state_index for state_index in range(compiled.num_states) if not in_degrees[state_index]]
+
+    # The order is extended while it's being walked, as Kahn's algorithm.
+    for state_index in order:
+        for arc_index in range(arc_offsets[state_index], arc_offsets[state_index + 1]):
+            target = arc_targets[arc_index]
+            in_degrees[target] -= 1
+
+            if not in_degrees[target]:
+                order.append(target)
+
+    return order if len(order) == compiled.num_states else None
+
+
+def _get_forward_arcs(compiled: _CompiledFst) -> list[list[tuple[int, int]]]:
+    """
+    Lists the arcs leaving each state, as the state each arc leads to and the index of the arc.
+
+    Parameters
+    ----------
+    compiled : _CompiledFst
+        The FST as flat arrays.
+
+    Returns
+    -------
+    list[list[tuple[int, int]]]
+        The arcs of each state, indexed by state index.
+    """
+
+    arc_offsets = compiled.arc_offsets
+    arc_targets = compiled.arc_targets
+
+    return [
+        [(arc_targets[arc_index], arc_index) for arc_index in range(arc_offsets[state_index], arc_offsets[state_index + 1])]
+        for state_index in range(compiled.num_states)
+    ]
+
+
+def _get_reverse_arcs(compiled: _CompiledFst) -> list[list[tuple[int, int]]]:
+    """
+    Lists the arcs entering each state, as the state each arc leaves and the index of the arc.
+
+    Parameters
+    ----------
+    compiled : _CompiledFst
+        The FST as flat arrays.
+
+    Returns
+    -------
+    list[list[tuple[int, int]]]
+        The arcs into each state, indexed by state index.
+    """
+
+    arc_offsets = compiled.arc_offsets
+    arc_targets = compiled.arc_targets
+    arcs: list[list[tuple[int, int]]] = [[] for _ in range(compiled.num_states)]
+
+    for state_index in range(compiled.num_states):
+        for arc_index in range(arc_offsets[state_index], arc_offsets[state_index + 1]):
+            arcs[arc_targets[arc_index]].append((state_index, arc_index))
+
+    return arcs
+
+
+def _get_initial_distances(compiled: _CompiledFst, semiring: Semiring, start_index: int, reverse: bool) -> list[Any]:
+    """
+    Returns the distances that the shortest-distance algorithms start from: the multiplicative identity at the start state going
+    forward, or the weight of accepting each accepting state going in reverse, and the additive identity everywhere else.
+
+    Parameters
+    ----------
+    compiled : _CompiledFst
+        The FST as flat arrays.
+
+    semiring : Semiring
+        The semiring of the weights.
+
+    start_index : int
+        The index of the start state.
+
+    reverse : bool
+        Whether the distances are to the accepting states.
+
+    Returns
+    -------
+    list[Any]
+        The initial distance of each state, indexed by state index.
+    """
+
+    distances = [semiring.additive_identity] * compiled.num_states
+
+    if not reverse:
+        distances[start_index] = semiring.multiplicative_identity
+        return distances
+
+    final_weights = compiled.final_weights
+
+    for state_index in range(compiled.num_states):
+        if compiled.final_flags[state_index]:
+            distances[state_index] = semiring.multiplicative_identity if final_weights is None else final_weights[state_index]
+
+    return distances
+
+
+def _get_arc_weight(compiled: _CompiledFst, semiring: Semiring, arc_index: int) -> Any:
+    """Returns the weight of an arc, or the multiplicative identity if the FST has no weights."""
+    return semiring.multiplicative_identity if compiled.arc_weights is None else compiled.arc_weights[arc_index]
+
+
+def _acyclic_shortest_distance( # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+    compiled: _CompiledFst,
+    semiring: Semiring,
+    start_index: int,
+    arcs: list[list[tuple[int, int]]],
+    order: list[int],
+    reverse: bool
+) -> list[Any]:
+    """
+    Computes the shortest distances of an FST without cycles, by visiting each state once, after every state that leads to it.
+
+    Parameters
+    ----------
+    compiled : _CompiledFst
+        The FST as flat arrays.
+
+    semiring : Semiring
+        The semiring of the weights.
+
+    start_index : int
+        The index of the start state.
+
+    arcs : list[list[tuple[int, int]]]
+        The arcs to follow from each state; the arcs into it if ``reverse`` is set.
+
+    order : list[int]
+        The state indices in topological order, or in reverse topological order if ``reverse`` is set.
+
+    reverse : bool
+        Whether the distances are to the accepting states.
+
+    Returns
+    -------
+    list[Any]
+        The distance of each state, indexed by state index.
+    """
+
+    add = semiring.plus
+    multiply = semiring.times
+    zero = semiring.additive_identity
+    distances = _get_initial_distances(compiled, semiring, start_index, reverse)
+
+    for state_index in order:
+        distance = distances[state_index]
+
+        if distance == zero:
+            continue
+
+        for other_state, arc_index in arcs[state_index]:
+            arc_weight = _get_arc_weight(compiled, semiring, arc_index)
+            step = multiply(arc_weight, distance) if reverse else multiply(distance, arc_weight)
+            distances[other_state] = add(distances[other_state], step)
+
+    return distances
+
+
+def _tropical_shortest_distance(
+    compiled: _CompiledFst,
+    semiring: Semiring,
+    start_index: int,
+    arcs: list[list[tuple[int, int]]],
+    reverse: bool
+) -> list[Any]:
+    """
+    Computes the shortest distances over the tropical semiring with Dijkstra's algorithm.
+
+    Parameters
+    ----------
+    compiled : _CompiledFst
+        The FST as flat arrays.
+
+    semiring : Semiring
+        The tropical semiring.
+
+    start_index : int
+        The index of the start state.
+
+    arcs : list[list[tuple[int, int]]]
+        The arcs to follow from each state; the arcs into it if ``reverse`` is set.
+
+    reverse : bool
+        Whether the distances are to the accepting states.
+
+    Returns
+    -------
+    list[Any]
+        The distance of each state, indexed by state index.
+    """
+
+    arc_weights = compiled.arc_weights
+    distances = _get_initial_distances(compiled, semiring, start_index, reverse)
+    queue = [(distance, state_index) for state_index, distance in enumerate(distances) if distance != semiring.additive_identity]
+    heapq.heapify(queue)
+
+    while queue:
+        distance, state_index = heapq.heappop(queue)
+
+        # The state was taken up again with a better distance since this entry was queued.
+        if distance > distances[state_index]:
+            continue
+
+        for other_state, arc_index in arcs[state_index]:
+            other_distance = distance + (0.0 if arc_weights is None else arc_weights[arc_index])
+
+            if other_distance < distances[other_state]:
+                distances[other_state] = other_distance
+                heapq.heappush(queue, (other_distance, other_state))
+
+    return distances
+
+
+def _generic_shortest_distance( # pylint: disable=too-many-locals
+    compiled: _CompiledFst,
+    semiring: Semiring,
+    start_index: int,
+    arcs: list[list[tuple[int, int]]],
+    reverse: bool
+) -> list[Any]:
+    """
+    Computes the shortest distances over any semiring with Mohri's generic single-source shortest-distance algorithm.
+
+    Parameters
+    ----------
+    compiled : _CompiledFst
+        The FST as flat arrays.
+
+    semiring : Semiring
+        The semiring of the weights.
+
+    start_index : int
+        The index of the start state.
+
+    arcs : list[list[tuple[int, int]]]
+        The arcs to follow from each state; the arcs into it if ``reverse`` is set.
+
+    reverse : bool
+        Whether the distances are to the accepting states.
+
+    Returns
+    -------
+    list[Any]
+        The distance of each state, indexed by state index.
+    """
+
+    add = semiring.plus
+    multiply = semiring.times
+    zero = semiring.additive_identity
+    distances = _get_initial_distances(compiled, semiring, start_index, reverse)
+
+    # What has been added to the distance of each state since it was last visited.
+    residuals = list(distances)
+    queue = deque(state_index for state_index, distance in enumerate(distances) if distance != zero)
+    queued = [distance != zero for distance in distances]
+
+    while queue:
+        state_index = queue.popleft()
+        queued[state_index] = False
+        residual = residuals[state_index]
+        residuals[state_index] = zero
+
+        for other_state, arc_index in arcs[state_index]:
+            arc_weight = _get_arc_weight(compiled, semiring, arc_index)
+            step = multiply(arc_weight, residual) if reverse else multiply(residual, arc_weight)
+            distance = distances[other_state]
+            new_distance = add(distance, step)
+
+            if _is_converged(distance, new_distance, zero):
+                continue
+
+            distances[other_state] = new_distance
+            residuals[other_state] = add(residuals[other_state], step)
+
+            if not queued[other_state]:
+                queued[other_state] = True
+                queue.append(other_state)
+
+    return distances
+
+
+def _is_converged(distance: Any, new_distance: Any, zero: Any) -> bool:
+    """
+    Returns whether adding to a distance left it unchanged; i.e., equal for most weights, or within a relative ``DELTA`` for real
+    numbers.
+
+    Parameters
+    ----------
+    distance : Any
+        The distance before the addition.
+
+    new_distance : Any
+        The distance after the addition.
+
+    zero : Any
+        The additive identity of the semiring, which is the distance of a state that no path has reached yet.
+
+    Returns
+    -------
+    bool
+        Whether the distance is unchanged.
+
+    Note
+    -----
+    The tolerance is relative, so that small distances, e.g. the probabilities of unlikely paths, are computed as precisely as
+    large ones. A distance that is still the additive identity has never been reached, so any change to it is kept.
+    """
+
+    if distance == new_distance:
+        return True
+
+    if distance == zero:
+        return False
+
+    if isinstance(distance, float) and isinstance(new_distance, float):
+        return math.isclose(distance, new_distance, rel_tol=DELTA)
+
+    return False
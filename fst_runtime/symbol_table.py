@@ -0,0 +1,196 @@
+"""
+This module defines the symbol table of an FST, which assigns an integer ID to every input and output symbol of the FST.
+
+Attributes
+----------
+SymbolTable : class
+    Assigns an integer ID to every symbol of an FST, and converts between symbols and their IDs.
+
+EPSILON : str
+    The epsilon character as encoded in the AT&T ``.att`` FST format; this representation is the string: ``@0@``.
+
+EPSILON_ID : int
+    The symbol ID of epsilon, which is always ``0``.
+
+UNKNOWN_SYMBOL_ID : int
+    The ID given to symbols that aren't in a symbol table; this is ``-1``.
+"""
+
+from typing import Iterable, Iterator
+
+EPSILON: str = "@0@"
+"""This is the epsilon character as encoded in the AT&T ``.att`` FST format."""
+
+EPSILON_ID: int = 0
+"""Epsilon is always the first symbol of a symbol table, and so has the symbol ID ``0``."""
+
+UNKNOWN_SYMBOL_ID: int = -1
+"""This ID is given to symbols that aren't in a symbol table. As no transition has this ID, such symbols never match anything."""
+
+
+class SymbolTable:
+    """
+    Assigns an integer ID to every symbol of an FST, and converts between symbols and their IDs.
+
+    Every distinct symbol is stored once, no matter how many transitions use it, and the traversals of the FST compare symbol IDs
+    instead of strings. Symbols are only turned back into strings when an output is built.
+
+    Attributes
+    ----------
+    add : method
+        Adds a symbol to the table if it isn't already in it, and returns its ID.
+
+    get_id : method
+        Returns the ID of a symbol.
+
+    get_ids : method
+        Returns the IDs of a sequence of symbols.
+
+    get_symbol : method
+        Returns the symbol with a given ID.
+
+    get_string : method
+        Joins the symbols with the given IDs into a string, leaving out epsilon.
+
+    Examples
+    --------
+    IDs are assigned in the order symbols are added, after epsilon::
+
+        table = SymbolTable(['a', '+PL'])
+        table.get_id('+PL')              # 2
+        table.get_ids(['a', 'z'])        # [1, -1]
+        table.get_string([1, 0, 2])      # 'a+PL'
+    """
+
+    def __init__(self, symbols: Iterable[str] = ()) -> None:
+        """
+        Initializes the symbol table with epsilon, followed by the provided symbols.
+
+        Parameters
+        ----------
+        symbols : Iterable[str], optional
+            The symbols to add to the table, in the order that their IDs are assigned. Duplicates and epsilon are ignored.
+        """
+
+        self._symbols: list[str] = [EPSILON]
+        """The symbols in the table, indexed by their ID."""
+
+        self._ids: dict[str, int] = {EPSILON: EPSILON_ID}
+        """The IDs of the symbols in the table, keyed by symbol."""
+
+        self._strings: list[str] = ['']
+        """The symbols in the table as they appear in a string, indexed by their ID; this is the empty string for epsilon."""
+
+        for symbol in symbols:
+            self.add(symbol)
+
+    def __len__(self) -> int:
+        """Returns the number of symbols in the table, including epsilon."""
+        return len(self._symbols)
+
+    def __contains__(self, symbol: object) -> bool:
+        """Returns whether the symbol is in the table."""
+        return symbol in self._ids
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterates over the symbols in the table in order of their IDs, starting with epsilon."""
+        return iter(self._symbols)
+
+    def add(self, symbol: str) -> int:
+        """
+        Adds a symbol to the table if it isn't already in it, and returns its ID.
+
+        Parameters
+        ----------
+        symbol : str
+            The symbol to add.
+
+        Returns
+        -------
+        int
+            The ID of the symbol.
+        """
+
+        try:
+            return self._ids[symbol]
+        except KeyError:
+            symbol_id = len(self._symbols)
+            self._ids[symbol] = symbol_id
+            self._symbols.append(symbol)
+            self._strings.append(symbol)
+            return symbol_id
+
+    def get_id(self, symbol: str) -> int:
+        """
+        Returns the ID of a symbol.
+
+        Parameters
+        ----------
+        symbol : str
+            The symbol to look up.
+
+        Returns
+        -------
+        int
+            The ID of the symbol, or ``UNKNOWN_SYMBOL_ID`` if the symbol isn't in the table.
+        """
+        return self._ids.get(symbol, UNKNOWN_SYMBOL_ID)
+
+    def get_ids(self, symbols: Iterable[str]) -> list[int]:
+        """
+        Returns the IDs of a sequence of symbols, such as the tokens of a query.
+
+        Parameters
+        ----------
+        symbols : Iterable[str]
+            The symbols to look up.
+
+        Returns
+        -------
+        list[int]
+            The ID of each symbol, with ``UNKNOWN_SYMBOL_ID`` for the symbols that aren't in the table.
+        """
+        get = self._ids.get
+        return [get(symbol, UNKNOWN_SYMBOL_ID) for symbol in symbols]
+
+    def get_symbol(self, symbol_id: int) -> str:
+        """
+        Returns the symbol with a given ID.
+
+        Parameters
+        ----------
+        symbol_id : int
+            The ID of the symbol.
+
+        Returns
+        -------
+        str
+            The symbol.
+
+        Raises
+        ------
+        IndexError
+            This error is raised if no symbol has the given ID.
+        """
+
+        if symbol_id < 0:
+            raise IndexError(f"There is no symbol with ID {symbol_id}.")
+
+        return self._symbols[symbol_id]
+
+    def get_string(self, symbol_ids: Iterable[int]) -> str:
+        """
+        Joins the symbols with the given IDs into a string, leaving out epsilon.
+
+        Parameters
+        ----------
+        symbol_ids : Iterable[int]
+            The IDs of the symbols to join, in order.
+
+        Returns
+        -------
+        str
+            The joined symbols.
+        """
+        strings = self._strings
+        return ''.join([strings[symbol_id] for symbol_id in symbol_ids])
@@ -1,15 +1,135 @@
 """
-This module holds a tokenization function that splits an input string into its constituent parts,
+This module holds a tokenizer that splits an input string into its constituent parts,
 while considering the set of provided multi-character symbols.
 
 Attributes
 ----------
+Tokenizer : class
+    Tokenizes input strings against a fixed set of multi-character symbols, via a character trie built once.
+
 tokenize_input_string : function
     Tokenizes the input string while respecting the multichar_symbols.
 """
 
+from functools import lru_cache
+from typing import Any, Iterable
+
 from fst_runtime import logger
 
+_END = ''
+"""
+The key that marks the end of a multi-character symbol in a trie node, mapping to the symbol itself. No character is the empty string,
+and so this can't clash with the key of a child node.
+"""
+
+
+class Tokenizer: # pylint: disable=too-few-public-methods
+    """
+    Tokenizes input strings against a fixed set of multi-character symbols, via a character trie built once.
+
+    At each position of the input, the trie is walked one character at a time for as long as the characters continue some
+    multi-character symbol, remembering the longest symbol that ended along the way. That symbol becomes the next token, or, if
+    none ended, the single character at the position does. The input is read left to right in a single pass, and only the tokens
+    themselves are sliced out of it; the rest of the input is never copied.
+
+    Attributes
+    ----------
+    tokenize : method
+        Returns a list containing the individual tokens that make up an input string.
+
+    Examples
+    --------
+    The longest multi-character symbol wins, and anything else is split into single characters::
+
+        tokenizer = Tokenizer({'+PL', '+PLx', 'PV/'})
+        tokenizer.tokenize('PV/cat+PL')     # ['PV/', 'c', 'a', 't', '+PL']
+    """
+
+    def __init__(self, multichar_symbols: Iterable[str]) -> None:
+        """
+        Builds the trie of the multi-character symbols.
+
+        Parameters
+        ----------
+        multichar_symbols : Iterable[str]
+            The multi-character symbols that need to be recognized as single tokens.
+        """
+
+        self._trie: dict[str, Any] = {}
+        """The root of the trie. Every node maps a character to the next node, and ``_END`` to the symbol that ends at the node."""
+
+        for symbol in multichar_symbols:
+            node = self._trie
+
+            for character in symbol:
+                node = node.setdefault(character, {})
+
+            node[_END] = symbol
+
+    def tokenize(self, input_string: str) -> list[str]:
+        """
+        Returns a list containing the individual tokens that make up the ``input_string``.
+
+        Parameters
+        ----------
+        input_string : str
+            The input string to be tokenized.
+
+        Returns
+        -------
+        list[str]
+            A list of individual tokens that make up the input string.
+        """
+
+        trie = self._trie
+
+        if not trie:
+            return list(input_string)
+
+        tokens = []
+        append = tokens.append
+        input_length = len(input_string)
+        position = 0
+
+        while position < input_length:
+            node = trie.get(input_string[position])
+
+            # Most characters don't start a multi-character symbol.
+            if node is None:
+                append(input_string[position])
+                position += 1
+                continue
+
+            longest_symbol = None
+            end = position + 1
+
+            # Follow the trie for as long as the input continues some symbol, remembering the longest symbol that ends.
+            while True:
+                symbol = node.get(_END)
+
+                if symbol is not None:
+                    longest_symbol = symbol
+
+                if end == input_length:
+                    break
+
+                node = node.get(input_string[end])
+
+                if node is None:
+                    break
+
+                end += 1
+
+            if longest_symbol is None:
+                append(input_string[position])
+                position += 1
+            else:
+                append(longest_symbol)
+                position += len(longest_symbol)
+
+        return tokens
+
+
 def tokenize_input_string(input_string: str, multichar_symbols: set[str]) -> list[str]:
     """
     Returns a list containing the individual tokens that make up the ``input_string``.
@@ -33,50 +153,31 @@ def tokenize_input_string(input_string: str, multichar_symbols: set[str]) -> lis
     the multi-character symbols specified in the ``multichar_symbols`` set. It ensures that
     the multi-character symbols are recognized as single tokens rather than being split
     into multiple tokens.
-    """
 
-    # This gets the character lengs of all the multicharacter symbols and sorts them from highest to lowest.
-    # Note lengths are distinct from use of set comprehension.
-    multichar_lengths = list({
-        len(symbol)
-        for symbol
-        in multichar_symbols
-    })
-
-    multichar_lengths.sort(reverse=True)
-
-    tokens = []
-
-    # Loop until all input characters are consumed.
-    while len(input_string) > 0:
-        # This is used to continue from a nested loop.
-        should_continue_while = False
-
-        # If any multi-character symbols exist in the FST, then loop over the lengths. For each length, take a slice
-        # of the current input from the start up to the length. Then, given that slice, check if it exists in the set
-        # of multi-character symbols for the FST. If it does exist, then add it as a token, consume the input characters,
-        # and continue the outer loop. If it doesn't exist, continue looping through the multichar lengths. If nothing is
-        # found, then token found is a single character. This continues until the whole input has been consumed.
-        if multichar_lengths:
-            for symbol_length in multichar_lengths:
-                try:
-                    substring = input_string[:symbol_length]
-                # Not enough input left.
-                except IndexError:
-                    continue
-
-                if substring in multichar_symbols:
-                    tokens.append(substring)
-                    input_string = input_string.removeprefix(substring) # Consume input characters.
-                    should_continue_while = True
-                    break
-
-            # Continue from nested loop.
-            if should_continue_while:
-                continue
+    The ``Tokenizer`` for a set of symbols is kept between calls, but the set still has to be
+    hashed on every call. To tokenize many strings against the same symbols, build one
+    ``Tokenizer`` and reuse it.
+    """
 
-        tokens.append(input_string[0])
-        input_string = input_string[1:] # Consume input characters.
+    tokens = _get_tokenizer(frozenset(multichar_symbols)).tokenize(input_string)
 
     logger.debug('_tokenize_input_string.tokens: %s', tokens)
     return tokens
+
+
+@lru_cache(maxsize=8)
+def _get_tokenizer(multichar_symbols: frozenset[str]) -> Tokenizer:
+    """
+    Returns a tokenizer for a set of multi-character symbols, building it only the first time the set is seen.
+
+    Parameters
+    ----------
+    multichar_symbols : frozenset[str]
+        The multi-character symbols that need to be recognized as single tokens.
+
+    Returns
+    -------
+    Tokenizer
+        The tokenizer of the symbols.
+    """
+    return Tokenizer(multichar_symbols)
@@ -6,9 +6,17 @@ This package contains the unit tests for the ``fst_runtime`` library.
 Modules
 -------
 test_tokenize_input
-    Tests the ``tokenize_input_string`` function.
+    Tests the ``Tokenizer`` class and the ``tokenize_input_string`` function.
 test_graph_creation
     Tests the graph creation process for the ``Fst`` class.
 test_traversals
     Tests the traversals and queries made to the ``Fst``.
+test_compiled_fst
+    Tests compiling the ``Fst`` into the binary ``.attc`` format and loading it back.
+test_symbol_table
+    Tests the ``SymbolTable`` class and its use by the ``Fst``.
+test_shortest_distance
+    Tests the shortest distances of the states of the ``Fst`` over each semiring.
+test_parallel
+    Tests the bulk queries of the ``Fst`` that run in a pool of worker processes.
 """
@@ -0,0 +1,437 @@
+# pylint: disable=redefined-outer-name
+
+"""
+This module tests compiling FSTs into the binary ``.attc`` format, loading them back, and the compiled sidecar cache.
+
+Attributes
+----------
+test_compiled_fst_round_trip : function
+    Tests that a compiled FST gives the same results as the ``.att`` file it was compiled from.
+
+test_compiled_fst_weighted : function
+    Tests that the weights of a weighted FST survive compilation for real-valued and boolean semirings.
+
+test_compiled_fst_semiring_mismatch : function
+    Tests that loading a compiled file with a different semiring than it was compiled with is rejected.
+
+test_compiled_fst_corrupt_file : function
+    Tests that a compiled file whose contents don't match its checksum is rejected.
+
+test_compiled_fst_sidecar_cache : function
+    Tests that the sidecar cache is written, reused while the ``.att`` file is unchanged, and rebuilt when it changes.
+
+test_compiled_fst_memory_map : function
+    Tests that a memory-mapped compiled file is traversed in place, with the same results as a compiled file that is read in.
+
+test_compiled_fst_lazy : function
+    Tests that a lazily loaded compiled file only indexes the states a query reaches, and that the states kept can be bounded.
+
+test_state_cache_from_threads : function
+    Tests that a bounded state cache, and a lazy FST that uses one, can be shared by many threads at once.
+
+test_input_index : function
+    Tests that the input symbol index finds the same arcs as scanning every arc of a state, for small and large states.
+
+test_output_index : function
+    Tests that the output symbol index finds the same arcs as scanning every arc of a state, and survives compilation.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+from pathlib import Path
+import shutil
+import pytest
+from fst_runtime.compiled_fst import _INDEXED_FAN_OUT, _BooleanColumn, _CompiledHeader, _StateCache
+from fst_runtime.compiled_fst_error import CompiledFstError
+from fst_runtime.fst import Fst
+from fst_runtime.semiring import BooleanSemiring, TropicalSemiring
+
+
+@pytest.fixture(scope="module")
+def _data_dir():
+    """
+    Provides the path to the data directory.
+
+    Returns
+    -------
+    pathlib.Path
+        Path to the data directory.
+    """
+
+    return Path(__file__).parent / "data"
+
+
+def test_compiled_fst_round_trip(_data_dir, tmp_path):
+    """
+    Tests that a compiled FST gives the same results as the ``.att`` file it was compiled from.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+
+    tmp_path : pathlib.Path
+        Temporary directory for the compiled file. Provided automatically by Pytest.
+    """
+
+    att_file_path = _data_dir / 'fst6_waabam.att'
+    compiled_file_path = Fst.compile(str(att_file_path), str(tmp_path / 'waabam.attc'))
+
+    parsed = Fst(att_file_path)
+    compiled = Fst.load_compiled(compiled_file_path)
+
+    assert compiled.multichar_symbols == parsed.multichar_symbols
+    assert compiled._accepting_states.keys() == parsed._accepting_states.keys() # pylint: disable=protected-access
+
+    prefixes = [["PVTense/gii", "PVTense/wii'"]]
+    suffixes = [['VTA'], ['Ind'], ['Pos'], ['Neu'], ['1SgSubj'], ['2SgObj', '2PlObj']]
+
+    parsed_forms = {result.output_string for result in parsed.down_generation('waabam', prefixes=prefixes, suffixes=suffixes)}
+    compiled_forms = {result.output_string for result in compiled.down_generation('waabam', prefixes=prefixes, suffixes=suffixes)}
+
+    assert parsed_forms == compiled_forms
+    assert len(compiled_forms) == 12
+
+    parsed_analyses = [result.output_string for result in parsed.up_analysis('gigii-waabamin')]
+    compiled_analyses = [result.output_string for result in compiled.up_analysis('gigii-waabamin')]
+
+    assert parsed_analyses == compiled_analyses == ['PVTense/gii+waabam+VTA+Ind+Pos+Neu+1SgSubj+2SgObj']
+
+
+def test_compiled_fst_weighted(_data_dir, tmp_path):
+    """
+    Tests that the weights of a weighted FST survive compilation for real-valued and boolean semirings.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+
+    tmp_path : pathlib.Path
+        Temporary directory for the compiled files. Provided automatically by Pytest.
+    """
+
+    tropical_path = Fst.compile(str(_data_dir / 'weighted.att'), str(tmp_path / 'weighted.attc'), semiring=TropicalSemiring())
+    tropical_fst = Fst.load_compiled(tropical_path, semiring=TropicalSemiring())
+
+    results = sorted(tropical_fst.down_generation('aaaabc'), key=lambda result: result.path_weight)
+
+    assert len(results) == 16
+    assert results[0].output_string == 'wwwwyz'
+    assert round(results[0].path_weight, 2) == 1.2
+
+    boolean_path = Fst.compile(str(_data_dir / 'weighted_boolean.att'), str(tmp_path / 'boolean.attc'), semiring=BooleanSemiring())
+    boolean_fst = Fst.load_compiled(boolean_path, semiring=BooleanSemiring())
+
+    outputs = {result.output_string: result.path_weight for result in boolean_fst.down_generation('abc')}
+
+    assert outputs == {'wyz': False, 'xyz': True}
+    assert all(isinstance(result.path_weight, bool) for result in boolean_fst.down_generation('abc'))
+
+
+def test_compiled_fst_semiring_mismatch(_data_dir, tmp_path):
+    """
+    Tests that loading a compiled file with a different semiring than it was compiled with is rejected.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+
+    tmp_path : pathlib.Path
+        Temporary directory for the compiled file. Provided automatically by Pytest.
+    """
+
+    compiled_file_path = Fst.compile(str(_data_dir / 'weighted.att'), str(tmp_path / 'weighted.attc'), semiring=TropicalSemiring())
+
+    with pytest.raises(CompiledFstError):
+        Fst.load_compiled(compiled_file_path)
+
+    with pytest.raises(CompiledFstError):
+        Fst.load_compiled(compiled_file_path, semiring=BooleanSemiring())
+
+
+def test_compiled_fst_corrupt_file(_data_dir, tmp_path):
+    """
+    Tests that a compiled file whose contents don't match its checksum is rejected.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+
+    tmp_path : pathlib.Path
+        Temporary directory for the compiled file. Provided automatically by Pytest.
+    """
+
+    compiled_file_path = Path(Fst.compile(str(_data_dir / 'fst4.att'), str(tmp_path / 'fst4.attc')))
+
+    data = bytearray(compiled_file_path.read_bytes())
+    data[-1] ^= 0xFF
+    compiled_file_path.write_bytes(bytes(data))
+
+    with pytest.raises(CompiledFstError):
+        Fst.load_compiled(str(compiled_file_path))
+
+
+def test_compiled_fst_sidecar_cache(_data_dir, tmp_path, monkeypatch):
+    """
+    Tests that the sidecar cache is written, reused while the ``.att`` file is unchanged, and rebuilt when it changes.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+
+    tmp_path : pathlib.Path
+        Temporary directory for the ``.att`` file and its sidecar. Provided automatically by Pytest.
+
+    monkeypatch : pytest.MonkeyPatch
+        Used to detect whether the ``.att`` file gets parsed. Provided automatically by Pytest.
+    """
+
+    att_file_path = tmp_path / 'fst4.att'
+    sidecar_path = tmp_path / 'fst4.attc'
+    shutil.copy(_data_dir / 'fst4.att', att_file_path)
+
+    fst = Fst(str(att_file_path), use_cache=True)
+
+    assert sidecar_path.exists()
+    assert {result.output_string for result in fst.up_analysis('walks')} == {'wal+VERB+PRES', 'wal+VERB+PRES_DUMMY'}
+
+    # The ``.att`` file is unchanged, so it must not be parsed again.
+    original_compile = Fst._compile_att_file # pylint: disable=protected-access
+
+    def fail_compile(*_):
+        raise AssertionError("The .att file was parsed even though the cache is current.")
+
+    monkeypatch.setattr(Fst, '_compile_att_file', staticmethod(fail_compile))
+
+    cached_fst = Fst(str(att_file_path), use_cache=True)
+    assert {result.output_string for result in cached_fst.up_analysis('walks')} == {'wal+VERB+PRES', 'wal+VERB+PRES_DUMMY'}
+
+    # Touching the file without changing its contents still reuses the cache, since the contents hash the same.
+    os.utime(att_file_path, ns=(0, 0))
+    Fst(str(att_file_path), use_cache=True)
+
+    # Changing the contents rebuilds the cache.
+    monkeypatch.setattr(Fst, '_compile_att_file', original_compile)
+
+    with open(att_file_path, 'a', encoding='utf-8') as att_file:
+        att_file.write('4\t8\t+FUT\tl\n')
+
+    rebuilt_fst = Fst(str(att_file_path), use_cache=True)
+
+    assert [result.output_string for result in rebuilt_fst.down_generation('wal+VERB+FUT')] == ['walkl']
+    assert [result.output_string for result in Fst.load_compiled(str(sidecar_path)).down_generation('wal+VERB+FUT')] == ['walkl']
+
+
+def test_compiled_fst_memory_map(_data_dir, tmp_path):
+    """
+    Tests that a memory-mapped compiled file is traversed in place, with the same results as a compiled file that is read in.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+
+    tmp_path : pathlib.Path
+        Temporary directory for the compiled files. Provided automatically by Pytest.
+    """
+
+    compiled_file_path = Fst.compile(str(_data_dir / 'fst6_waabam.att'), str(tmp_path / 'waabam.attc'))
+
+    read = Fst.load_compiled(compiled_file_path)
+    mapped = Fst.load_compiled(compiled_file_path, memory_map=True)
+    compiled = mapped._compiled # pylint: disable=protected-access
+
+    # The columns are read-only views over the file, rather than copies of it.
+    assert isinstance(compiled.arc_targets, memoryview) and compiled.arc_targets.readonly
+    assert isinstance(compiled.arc_output_labels, memoryview) and compiled.arc_output_labels.readonly
+
+    suffixes = [['VTA'], ['Ind'], ['Pos'], ['Neu'], ['1SgSubj'], ['2SgObj', '2PlObj']]
+
+    for fst in (read, mapped):
+        assert len(list(fst.down_generation('waabam', prefixes=[["PVTense/gii", "PVTense/wii'"]], suffixes=suffixes))) == 12
+        assert [result.output_string for result in fst.up_analysis('gigii-waabamin')] == ['PVTense/gii+waabam+VTA+Ind+Pos+Neu+1SgSubj+2SgObj']
+
+    # Writing a mapped FST gives back the file it was mapped from.
+    header = _CompiledHeader.read(compiled_file_path)
+    compiled.write(tmp_path / 'rewritten.attc', header.fingerprint)
+
+    assert (tmp_path / 'rewritten.attc').read_bytes() == Path(compiled_file_path).read_bytes()
+
+    # Weights are mapped too, and a mapped FST can still be trimmed, which copies what is kept.
+    att_file_path = tmp_path / 'dead_states.att'
+    att_file_path.write_text("0\t1\ta\tb\t0.5\n0\t3\ta\tx\t0.1\n1\t2\tb\tc\t1.0\n3\t4\tb\ty\t0.1\n2\t0.2\n")
+
+    weighted_path = Fst.compile(str(att_file_path), semiring=TropicalSemiring())
+    weighted = Fst.load_compiled(weighted_path, semiring=TropicalSemiring(), memory_map=True)
+
+    assert isinstance(weighted._compiled.arc_weights, memoryview) # pylint: disable=protected-access
+    assert [(result.output_string, round(result.path_weight, 2)) for result in weighted.down_generation('ab')] == [('bc', 1.7)]
+
+    weighted.trim()
+
+    assert weighted._compiled.num_arcs == 2 # pylint: disable=protected-access
+    assert [(result.output_string, round(result.path_weight, 2)) for result in weighted.down_generation('ab')] == [('bc', 1.7)]
+
+    # A sidecar is mapped as well, both when it's written and when it's reused.
+    for _ in range(2):
+        cached = Fst(str(att_file_path), semiring=TropicalSemiring(), use_cache=True, memory_map=True)
+        assert isinstance(cached._compiled.arc_targets, memoryview) # pylint: disable=protected-access
+
+
+def test_compiled_fst_lazy(_data_dir, tmp_path):
+    """
+    Tests that a lazily loaded compiled file only indexes the states a query reaches, and that the states kept can be bounded.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+
+    tmp_path : pathlib.Path
+        Temporary directory for the compiled file. Provided automatically by Pytest.
+    """
+
+    compiled_file_path = Fst.compile(str(_data_dir / 'fst6_waabam.att'), str(tmp_path / 'waabam.attc'))
+    suffixes = [['VTA'], ['Ind'], ['Pos'], ['Neu'], ['1SgSubj'], ['2SgObj', '2PlObj']]
+
+    def query(fst):
+        forms = sorted(result.output_string for result in fst.down_generation('waabam', prefixes=[["PVTense/gii"]], suffixes=suffixes))
+        analyses = [result.output_string for result in fst.up_analysis('gigii-waabamin')]
+        return forms, analyses
+
+    expected = query(Fst.load_compiled(compiled_file_path))
+
+    lazy = Fst.load_compiled(compiled_file_path, lazy=True)
+    eager = Fst.load_compiled(compiled_file_path)
+
+    # Nothing is indexed up front, and after a query only some of the states that an eager load indexes are.
+    assert isinstance(lazy._compiled.arc_offsets, memoryview) # pylint: disable=protected-access
+    assert not lazy._down.index._ranges # pylint: disable=protected-access
+    assert query(lazy) == expected
+    assert 0 < len(lazy._down.index._ranges) < len(eager._down.index._ranges) # pylint: disable=protected-access
+
+    # Bounding the states kept changes nothing about the results, even if every state has to be worked out again.
+    for state_cache_size in (0, 1, 16):
+        bounded = Fst.load_compiled(compiled_file_path, lazy=True, state_cache_size=state_cache_size)
+
+        assert query(bounded) == expected
+        assert query(bounded) == expected
+        assert len(bounded._down.epsilon_closures) <= state_cache_size # pylint: disable=protected-access
+        assert len(bounded._down.index._ranges) <= state_cache_size # pylint: disable=protected-access
+
+    # Boolean weights are read in place as well, and still come out as booleans.
+    boolean_path = Fst.compile(str(_data_dir / 'weighted_boolean.att'), str(tmp_path / 'boolean.attc'), semiring=BooleanSemiring())
+    boolean_fst = Fst.load_compiled(boolean_path, semiring=BooleanSemiring(), lazy=True)
+    arc_weights = boolean_fst._compiled.arc_weights # pylint: disable=protected-access
+
+    assert isinstance(arc_weights, _BooleanColumn) and isinstance(arc_weights.column, memoryview)
+    assert {result.output_string: result.path_weight for result in boolean_fst.down_generation('abc')} == {'wyz': False, 'xyz': True}
+
+    # A full cache evicts the state that was added to it longest ago.
+    cache = _StateCache(2)
+    cache[1], cache[2] = 'a', 'b'
+    cache[1] = 'c'
+    cache[3] = 'd'
+
+    assert cache == {2: 'b', 3: 'd'}
+
+
+def test_state_cache_from_threads(_data_dir, tmp_path):
+    """
+    Tests that a bounded state cache, and a lazy FST that uses one, can be shared by many threads at once.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+
+    tmp_path : pathlib.Path
+        Temporary directory for the compiled file. Provided automatically by Pytest.
+    """
+
+    cache = _StateCache(4)
+
+    def fill(offset: int) -> None:
+        for state_index in range(20000):
+            cache[(state_index * 8 + offset) % 64] = state_index
+
+            if state_index % 1000 == 0:
+                cache.clear()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(fill, range(8)))
+
+    assert len(cache) <= 4
+
+    compiled_file_path = Fst.compile(str(_data_dir / 'fst6_waabam.att'), str(tmp_path / 'waabam.attc'))
+    wordforms = ["gigii-waabamin", "gigii-waabamininim", "giwii'-waabamin", "giwii'-waabamininim"] * 25
+
+    def analyze(fst: Fst, wordform: str) -> list[str]:
+        return [result.output_string for result in fst.up_analysis(wordform)]
+
+    eager = Fst.load_compiled(compiled_file_path)
+    lazy = Fst.load_compiled(compiled_file_path, lazy=True, state_cache_size=8)
+    expected = [analyze(eager, wordform) for wordform in wordforms]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert list(executor.map(lambda wordform: analyze(lazy, wordform), wordforms)) == expected
+
+
+def test_input_index(_data_dir):
+    """
+    Tests that the input symbol index finds the same arcs as scanning every arc of a state, for small and large states.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+    """
+
+    fst = Fst(str(_data_dir / 'fst6_waabam.att'))
+    compiled = fst._compiled # pylint: disable=protected-access
+    fan_outs = set()
+
+    for state_index in range(compiled.num_states):
+        arcs = range(compiled.arc_offsets[state_index], compiled.arc_offsets[state_index + 1])
+        fan_outs.add(len(arcs) >= _INDEXED_FAN_OUT)
+
+        for label in set(compiled.arc_input_ids[arc_index] for arc_index in arcs) | {-1}:
+            expected = [arc_index for arc_index in arcs if compiled.arc_input_ids[arc_index] == label]
+            assert list(fst._down.index.get_arcs(state_index, label)) == expected # pylint: disable=protected-access
+
+            # The candidates are a superset of the epsilon arcs and the arcs with the label, in stored order.
+            candidates = list(fst._down.index.get_candidate_arcs(state_index, label)) # pylint: disable=protected-access
+            followed = [arc_index for arc_index in candidates if compiled.arc_input_ids[arc_index] in (0, label)]
+            assert followed == sorted(set(expected) | {arc_index for arc_index in arcs if compiled.arc_input_ids[arc_index] == 0})
+
+    # Both the dictionary and the binary search are exercised.
+    assert fan_outs == {True, False}
+
+
+def test_output_index(_data_dir, tmp_path):
+    """
+    Tests that the output symbol index finds the same arcs as scanning every arc of a state, and survives compilation.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+
+    tmp_path : pathlib.Path
+        Temporary directory for the compiled file. Provided automatically by Pytest.
+    """
+
+    compiled_file_path = Fst.compile(str(_data_dir / 'fst6_waabam.att'), str(tmp_path / 'waabam.attc'))
+    fst = Fst.load_compiled(compiled_file_path)
+    compiled = fst._compiled # pylint: disable=protected-access
+
+    for state_index in range(compiled.num_states):
+        arcs = range(compiled.arc_offsets[state_index], compiled.arc_offsets[state_index + 1])
+
+        for label in set(compiled.arc_output_ids[arc_index] for arc_index in arcs) | {-1}:
+            expected = [arc_index for arc_index in arcs if compiled.arc_output_ids[arc_index] == label]
+            assert list(fst._up.index.get_arcs(state_index, label)) == expected # pylint: disable=protected-access
@@ -1,6 +1,7 @@
 '''Tests the serialization of the FstOutput class.'''
 
 import json
+import pytest
 from fst_runtime.fst import Fst, FstOutput
 
 def test_fst_output_serialization():
@@ -28,3 +29,14 @@ def test_empty_fst_output_serialization():
     json_data = FstOutput.json_serialize_outputs(query_results)
 
     assert json_data is None
+
+def test_fst_output_slots():
+    '''Tests that ``FstOutput`` objects have slots rather than an instance dictionary, and still serialize every field.'''
+
+    output = FstOutput('walking', None, 'wal+GER')
+
+    assert not hasattr(output, '__dict__')
+    assert output.get_serialialization_dictionary() == {'output_string': 'walking', 'path_weight': None, 'input_string': 'wal+GER'}
+
+    with pytest.raises(AttributeError):
+        output.extra = True # type: ignore # pylint: disable=assigning-non-slot
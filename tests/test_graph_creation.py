@@ -10,12 +10,18 @@ test_directed_graph_initialization_unweighted : function
     
 test_directed_graph_initialization_weighted : function
     Tests that all initialization of the graph from the file is done correctly for a weighted FST.
+
+test_traversal_uses_flat_arrays : function
+    Tests that the FST is stored as flat arrays, and that querying it doesn't build ``_FstNode`` objects.
+
+test_trim : function
+    Tests that trimming removes the states and arcs that aren't on a path to an accepting state, without changing any results.
 """
 
 
 import pytest
-from fst_runtime.fst import Fst
-from fst_runtime.semiring import ProbabilitySemiring
+from fst_runtime.fst import Fst, TrimReport
+from fst_runtime.semiring import ProbabilitySemiring, TropicalSemiring
 
 
 @pytest.fixture
@@ -148,3 +154,60 @@ def test_directed_graph_initialization_weighted(_att_file_path_weighted):
     assert edge1.input_symbol == 'b'
     assert edge1.output_symbol == 'c'
     assert edge1.weight == 1.0
+
+
+def test_traversal_uses_flat_arrays(_att_file_path_weighted):
+    """
+    Tests that the FST is stored as flat arrays, and that querying it doesn't build ``_FstNode`` objects.
+
+    Parameters
+    ----------
+    _att_file_path_weighted : pathlib.Path
+        Path to the temporary weighted FST file. Provided automatically by Pytest.
+    """
+    graph = Fst(_att_file_path_weighted, semiring=ProbabilitySemiring())
+
+    assert list(graph._compiled.arc_offsets) == [0, 1, 2, 2]
+    assert list(graph._compiled.arc_weights or []) == [0.5, 1.0]
+    assert graph.symbol_table.get_symbol(0) == '@0@'
+
+    results = list(graph.down_generation('ab'))
+
+    assert [result.output_string for result in results] == ['bc']
+    assert round(results[0].path_weight, 2) == 0.1
+    assert graph._nodes is None
+
+
+def test_trim(tmp_path):
+    """
+    Tests that trimming removes the states and arcs that aren't on a path to an accepting state, without changing any results.
+
+    Parameters
+    ----------
+    tmp_path : pathlib.Path
+        Temporary path for the test file. Provided automatically by Pytest.
+    """
+    att_file = tmp_path / "dead_states.att"
+
+    # State 3 leads only to state 4, which isn't accepting, and state 5 can't be reached from the start state.
+    att_file.write_text("0\t1\ta\tb\t0.5\n0\t3\ta\tx\t0.1\n1\t2\tb\tc\t1.0\n3\t4\tb\ty\t0.1\n5\t2\tz\tz\t0.3\n2\t0.2\n")
+
+    graph = Fst(att_file, semiring=TropicalSemiring())
+    generations = [(result.output_string, result.path_weight) for result in graph.down_generation('ab')]
+    analyses = [(result.output_string, result.path_weight) for result in graph.up_analysis('bc')]
+
+    assert graph.trim() == TrimReport(states_removed=3, arcs_removed=3, states_remaining=3, arcs_remaining=2)
+    assert list(graph._compiled.state_ids) == [0, 1, 2]
+    assert list(graph._compiled.arc_weights or []) == [0.5, 1.0]
+    assert [(result.output_string, result.path_weight) for result in graph.down_generation('ab')] == generations
+    assert [(result.output_string, result.path_weight) for result in graph.up_analysis('bc')] == analyses
+
+    # Trimming again finds nothing to remove.
+    assert graph.trim() == TrimReport(states_removed=0, arcs_removed=0, states_remaining=3, arcs_remaining=2)
+
+    # Compiled files can be trimmed as they are loaded.
+    compiled_file_path = Fst.compile(str(att_file), semiring=TropicalSemiring())
+    loaded = Fst.load_compiled(compiled_file_path, semiring=TropicalSemiring(), trim=True)
+
+    assert loaded._compiled.num_arcs == 2
+    assert [(result.output_string, result.path_weight) for result in loaded.down_generation('ab')] == generations
@@ -43,11 +43,58 @@ test_up_traversal_fst5 : function
     
 test_up_analysis_fst6 : function
     Tests traversal up for fst6_waabam.att.
+
+test_up_analysis_epsilon_outputs : function
+    Tests that analysis finds the paths whose first arcs emit nothing, including those of the empty wordform.
+
+test_traversal_deeper_than_interpreter_stack : function
+    Tests that a path much longer than the interpreter's recursion limit is traversed, without changing that limit.
+
+test_traversal_epsilon_limit : function
+    Tests that the epsilon budget bounds how many epsilon arcs in a row a path may follow.
+
+test_traversal_from_threads : function
+    Tests that lookups run concurrently from a thread pool give the same results as lookups run one at a time.
+
+test_epsilon_closure_cycle_limit : function
+    Tests that the epsilon cycle policy sets how many times an epsilon cycle is unrolled, and that changing it resets the closures.
+
+test_epsilon_closure_branching_cycle : function
+    Tests that an epsilon cycle that branches can be kept from being unrolled, since the number of paths around it grows exponentially.
+
+test_epsilon_closure_weights : function
+    Tests that the weights and outputs of epsilon arcs are carried through the epsilon closures.
+
+test_down_generation_shared_prefixes : function
+    Tests that walking a paradigm along its shared prefixes generates the same outputs as walking each query on its own.
+
+test_memoized_traversal : function
+    Tests that the memoized traversal finds the same outputs while expanding each state once per token position.
+
+test_lookahead : function
+    Tests the symbols each state can match next, and that queries with symbols outside the alphabet aren't walked at all.
+
+test_query_limits : function
+    Tests that ``max_results``, ``max_states_visited`` and ``deadline`` stop a query, and that its results report being truncated.
+
+test_query_limits_in_epsilon_closure : function
+    Tests that the limits also stop a query while it works out an epsilon closure.
+
+test_unweighted_traversal : function
+    Tests that FSTs without weights are walked by the same traversals as weighted ones, and give no weights.
+
+test_shared_paths : function
+    Tests that the parts of a path that each traversal links together are joined into the right output, once per match.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import sys
+import time
 import pytest
 from fst_runtime.fst import Fst
+from fst_runtime.symbol_table import EPSILON_ID
+from fst_runtime.semiring import TropicalSemiring
 
 
 @pytest.fixture(scope="module")
@@ -433,4 +480,499 @@ def test_up_analysis_fst6(_data_dir):
     assert expected_result3 in [result.output_string for result in results3]
     assert expected_result4 in [result.output_string for result in results4]
 
+
+def test_up_analysis_epsilon_outputs(tmp_path):
+    """
+    Tests that analysis finds the paths whose first arcs emit nothing, including those of the empty wordform.
+
+    Analysis used to walk backwards from the accepting states, and found neither; it walks forward from the start state now, as
+    generation does, and so it finds exactly the paths that generate the wordform.
+
+    Parameters
+    ----------
+    tmp_path : pathlib.Path
+        Temporary path for the test file. Provided automatically by Pytest.
+    """
+
+    att_file = tmp_path / "epsilon_outputs.att"
+
+    # ``ab`` generates ``y``, since ``a`` emits nothing, and ``a`` generates the empty wordform.
+    att_file.write_text("0\t1\ta\t@0@\n1\t2\tb\ty\n1\n2\n", encoding='utf-8')
+    graph = Fst(str(att_file))
+
+    assert [result.output_string for result in graph.down_generation('ab')] == ['y']
+    assert [result.output_string for result in graph.down_generation('a')] == ['']
+
+    assert [result.output_string for result in graph.up_analysis('y')] == ['ab']
+    assert [result.output_string for result in graph.up_analysis('')] == ['a']
+    assert [result.output_string for result in graph.up_analysis('y', memoize=True)] == ['ab']
+
+#endregion
+
+
+#region Traversal Engine Tests
+
+def test_traversal_deeper_than_interpreter_stack(tmp_path):
+    """
+    Tests that a path much longer than the interpreter's recursion limit is traversed, without changing that limit.
+
+    Parameters
+    ----------
+    tmp_path : pathlib.Path
+        Temporary path for the test file. Provided automatically by Pytest.
+    """
+
+    length = 5000
+    att_file = tmp_path / "chain.att"
+    att_file.write_text(''.join(f"{state}\t{state + 1}\ta\tb\n" for state in range(length)) + f"{length}\n", encoding='utf-8')
+
+    graph = Fst(str(att_file), recursion_limit=2 * length)
+    interpreter_limit = sys.getrecursionlimit()
+
+    assert [result.output_string for result in graph.down_generation('a' * length)] == ['b' * length]
+    assert [result.output_string for result in graph.up_analysis('b' * length)] == ['a' * length]
+    assert sys.getrecursionlimit() == interpreter_limit
+
+    # The depth budget cuts off the path.
+    graph.recursion_limit = length - 1
+
+    assert not list(graph.down_generation('a' * length))
+
+
+def test_traversal_epsilon_limit(_data_dir):
+    """
+    Tests that the epsilon budget bounds how many epsilon arcs in a row a path may follow.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+    """
+
+    graph = Fst(_data_dir / 'fst5_epsilon_cycle.att', epsilon_limit=2)
+
+    results = {result.output_string for result in graph.down_generation('abc')}
+
+    assert results == {'xwv', 'xywv', 'xyywv', 'xwzv', 'xywzv', 'xyywzv'}
+
+
+def test_traversal_from_threads(_data_dir):
+    """
+    Tests that lookups run concurrently from a thread pool give the same results as lookups run one at a time.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+    """
+
+    graph = Fst(_data_dir / 'fst6_waabam.att')
+    wordforms = ["gigii-waabamin", "gigii-waabamininim", "giwii'-waabamin", "giwii'-waabamininim"] * 25
+
+    def analyze(wordform: str) -> list[str]:
+        return [result.output_string for result in graph.up_analysis(wordform)]
+
+    expected = [analyze(wordform) for wordform in wordforms]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert list(executor.map(analyze, wordforms)) == expected
+
+
+def test_epsilon_closure_cycle_limit(_data_dir):
+    """
+    Tests that the epsilon cycle policy sets how many times an epsilon cycle is unrolled, and that changing it resets the closures.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+    """
+
+    graph = Fst(_data_dir / 'fst5_epsilon_cycle.att', epsilon_cycle_limit=0)
+
+    assert {result.output_string for result in graph.down_generation('abc')} == {'xwv', 'xwzv'}
+    assert graph._down.epsilon_closures # pylint: disable=protected-access
+
+    graph.epsilon_cycle_limit = 2
+
+    assert not graph._down.epsilon_closures # pylint: disable=protected-access
+    assert {result.output_string for result in graph.down_generation('abc')} == {
+        'xwv', 'xywv', 'xyywv', 'xwzv', 'xywzv', 'xyywzv'
+    }
+
+
+def test_epsilon_closure_branching_cycle(tmp_path):
+    """
+    Tests that an epsilon cycle that branches can be kept from being unrolled, since the number of paths around it grows
+    exponentially.
+
+    Parameters
+    ----------
+    tmp_path : pathlib.Path
+        Temporary path for the test file. Provided automatically by Pytest.
+    """
+
+    att_file = tmp_path / "branching_cycle.att"
+    att_file.write_text("0\t1\ta\ta\n1\t2\t@0@\tx\n1\t2\t@0@\ty\n2\t1\t@0@\t@0@\n2\t3\tb\tb\n3\n", encoding='utf-8')
+
+    # By default, cycles are unrolled as far as the budgets allow, as they always have been.
+    assert Fst(str(att_file)).epsilon_cycle_limit is None
+
+    graph = Fst(str(att_file), epsilon_cycle_limit=0)
+
+    assert sorted(result.output_string for result in graph.down_generation('ab')) == ['axb', 'ayb']
+
+    graph.epsilon_cycle_limit = 1
+
+    assert sorted(result.output_string for result in graph.down_generation('ab')) == [
+        'axb', 'axxb', 'axyb', 'ayb', 'ayxb', 'ayyb'
+    ]
+
+
+def test_epsilon_closure_weights(tmp_path):
+    """
+    Tests that the weights and outputs of epsilon arcs are carried through the epsilon closures.
+
+    Parameters
+    ----------
+    tmp_path : pathlib.Path
+        Temporary path for the test file. Provided automatically by Pytest.
+    """
+
+    att_file = tmp_path / "epsilon_weights.att"
+    att_file.write_text(
+        "0\t1\t@0@\tp\t1.0\n"
+        "0\t2\ta\tq\t4.0\n"
+        "1\t3\t@0@\t@0@\t0.5\n"
+        "3\t2\ta\tr\t0.25\n"
+        "2\t0.125\n",
+        encoding='utf-8'
+    )
+
+    graph = Fst(str(att_file), semiring=TropicalSemiring())
+
+    results = {result.output_string: result.path_weight for result in graph.down_generation('a')}
+
+    assert results == {'pr': 1.875, 'q': 4.125}
+
+    analyses = {result.output_string: result.path_weight for result in graph.up_analysis('pr')}
+
+    assert analyses == {'a': 1.875}
+
+
+def test_down_generation_shared_prefixes(_data_dir):
+    """
+    Tests that walking a paradigm along its shared prefixes generates the same outputs as walking each query on its own.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+    """
+
+    graph = Fst(_data_dir / 'fst6_waabam.att')
+
+    prefixes = [["PVTense/gii", "PVTense/wii'"]]
+    suffixes = [['VTA'], ['Ind', 'Cnj'], ['Pos', 'Neg'], ['Neu'], ['1SgSubj', '2SgSubj'], ['2SgObj', '2PlObj', '1SgObj']]
+
+    def generate(shared_prefixes: bool) -> list[tuple[str, str]]:
+        results = graph.down_generation('waabam', prefixes=prefixes, suffixes=suffixes, shared_prefixes=shared_prefixes)
+        return sorted((result.input_string or '', result.output_string) for result in results)
+
+    separate = generate(False)
+    shared = generate(True)
+
+    assert shared == separate
+    assert ("PVTense/gii+waabam+VTA+Ind+Pos+Neu+1SgSubj+2SgObj", "gigii-waabamin") in shared
+
+    walk_graph = Fst(_data_dir / 'fst4.att')
+    walk_suffixes = [['VERB'], ['INF', 'GER', 'PAST', 'PRES']]
+    generations = walk_graph.down_generations(['wal', 'run'], suffixes=walk_suffixes, shared_prefixes=True)
+
+    assert {result.output_string for result in generations['wal']} == {
+        result.output_string for result in walk_graph.down_generation('wal', suffixes=walk_suffixes)
+    } == {'walk', 'walking', 'walked', 'walks'}
+
+
+def test_memoized_traversal(tmp_path, monkeypatch):
+    """
+    Tests that the memoized traversal finds the same outputs while expanding each state once per token position.
+
+    Parameters
+    ----------
+    tmp_path : pathlib.Path
+        Temporary path for the test file. Provided automatically by Pytest.
+
+    monkeypatch : pytest.MonkeyPatch
+        Used to count how many times states are expanded. Provided automatically by Pytest.
+    """
+
+    # Every ``a`` can be read two ways, and so ``n`` of them can be read 2^n ways, all of which end up in the same states.
+    length = 12
+    att_file = tmp_path / "ambiguous.att"
+    att_file.write_text(
+        ''.join(f"{state}\t{state + 1}\ta\tx\n{state}\t{state + 1}\ta\ty\n" for state in range(length))
+        + f"{length}\t{length + 1}\tb\tz\n{length + 1}\n",
+        encoding='utf-8'
+    )
+
+    graph = Fst(str(att_file))
+    expansions = []
+
+    def counting(get_expander):
+        def counting_get_expander(fst, direction, budget=None):
+            expand = get_expander(fst, direction, budget)
+
+            def counting_expand(state, query_node):
+                expansions.append(state)
+                return expand(state, query_node)
+
+            return counting_expand
+
+        return counting_get_expander
+
+    monkeypatch.setattr(Fst, '_get_expander', counting(Fst._get_expander)) # pylint: disable=protected-access
+
+    query = 'a' * length + 'b'
+    memoized_outputs = sorted(result.output_string for result in graph.down_generation(query, memoize=True))
+
+    assert memoized_outputs == sorted(result.output_string for result in graph.down_generation(query))
+    assert len(memoized_outputs) == 2 ** length
+
+    # No path matches, since there's no ``a`` after the last ``a``, but every path is followed up to it unless the traversal is
+    # memoized. The lookahead stops each path one state early.
+    dead_query = 'a' * (length + 1)
+
+    expansions.clear()
+    assert not list(graph.down_generation(dead_query))
+    assert len(expansions) == 2 ** length - 1
+
+    expansions.clear()
+    assert not list(graph.down_generation(dead_query, memoize=True))
+    assert len(expansions) == length
+
+    assert [result.output_string for result in graph.up_analysis('x' * length + 'z', memoize=True)] == ['a' * length + 'b']
+
+
+
+def test_lookahead(_data_dir, monkeypatch):
+    """
+    Tests the symbols each state can match next, and that queries with symbols outside the alphabet aren't walked at all.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+
+    monkeypatch : pytest.MonkeyPatch
+        Used to detect whether the FST gets walked. Provided automatically by Pytest.
+    """
+
+    graph = Fst(_data_dir / 'fst4.att')
+    symbol_table = graph.symbol_table
+    down = graph._down # pylint: disable=protected-access
+    up = graph._up # pylint: disable=protected-access
+
+    def lookahead(state_id, direction):
+        symbol_ids = graph._get_lookahead(state_id, direction) # pylint: disable=protected-access
+        return {'' if symbol_id == EPSILON_ID else symbol_table.get_symbol(symbol_id) for symbol_id in symbol_ids}
+
+    # The states' indices are their IDs, since the IDs run from 0 without gaps. An empty string marks a state where a query can end.
+    assert lookahead(4, down) == {'+PAST', '+INF', '+PRES', '+PRES_DUMMY', '+GER'}
+    assert lookahead(5, down) == {''}
+    assert lookahead(4, up) == {'e', 's', 'i', ''}
+    assert lookahead(5, up) == {'n'}
+
+    # The lookahead is thrown away with the epsilon closures when a budget changes.
+    graph.epsilon_limit = 1
+    assert not down.lookaheads
+
+    def fail_traverse(*_):
+        raise AssertionError("The FST was walked for a query with a symbol outside its alphabet.")
+
+    monkeypatch.setattr(Fst, '_traverse', fail_traverse)
+
+    assert not list(graph.down_generation('wal+VERB+FUT'))
+    assert not list(graph.down_generation('walk+VERB+PAST'))
+    assert not list(graph.up_analysis('walkz'))
+
+
+
+def test_query_limits(_data_dir, tmp_path):
+    """
+    Tests that ``max_results``, ``max_states_visited`` and ``deadline`` stop a query, and that its results report being truncated.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+
+    tmp_path : pathlib.Path
+        Temporary path for the test file. Provided automatically by Pytest.
+    """
+
+    # Every ``a`` can be read two ways, and so the query has 2^10 outputs.
+    length = 10
+    att_file = tmp_path / "ambiguous.att"
+    att_file.write_text(
+        ''.join(f"{state}\t{state + 1}\ta\tx\n{state}\t{state + 1}\ta\ty\n" for state in range(length)) + f"{length}\n",
+        encoding='utf-8'
+    )
+
+    graph = Fst(str(att_file))
+    query = 'a' * length
+
+    results = graph.down_generation(query)
+    assert len(list(results)) == 2 ** length
+    assert not results.truncated
+
+    # A limit that isn't reached doesn't truncate the results.
+    results = graph.down_generation(query, max_results=2 ** length + 1, max_states_visited=10 ** 6)
+    assert len(list(results)) == 2 ** length
+    assert not results.truncated
+
+    # Nor does one that is exactly reached, since there are no more outputs to cut off.
+    results = graph.down_generation(query, max_results=2 ** length)
+    assert len(list(results)) == 2 ** length
+    assert not results.truncated
+
+    results = graph.down_generation(query[:-1], max_results=0)
+    assert not list(results)
+    assert not results.truncated
+
+    for memoize in (False, True):
+        results = graph.down_generation(query, memoize=memoize, max_results=5)
+        assert len(list(results)) == 5
+        assert results.truncated
+
+        results = graph.down_generation(query, memoize=memoize, max_states_visited=50)
+        assert 0 < len(list(results)) < 2 ** length
+        assert results.truncated
+        assert results.states_visited == 50
+
+        results = graph.down_generation(query, memoize=memoize, deadline=time.monotonic() - 1)
+        assert not list(results)
+        assert results.truncated
+
+    # Every lemma gets its own limits.
+    generations = graph.down_generations([query, query[:-1]], max_results=3)
+    assert [len(list(results)) for results in generations.values()] == [3, 0]
+    assert [results.truncated for results in generations.values()] == [True, False]
+
+    analyzer = Fst(_data_dir / 'fst4.att')
+    results = analyzer.up_analysis('walks', max_results=1)
+    assert len(list(results)) == 1
+    assert results.truncated
+
+    results = analyzer.up_analyses(['walks'], max_states_visited=1)['walks']
+    assert not list(results)
+    assert results.truncated
+
+    # A query can be given up on before it has finished.
+    results = graph.down_generation(query)
+    next(results)
+    results.close()
+    assert not list(results)
+
+
+def test_query_limits_in_epsilon_closure(tmp_path):
+    """
+    Tests that the limits also stop a query while it works out an epsilon closure, which on its own can take exponential time when
+    every pass around a branching epsilon cycle is unrolled.
+
+    Parameters
+    ----------
+    tmp_path : pathlib.Path
+        Temporary path for the test file. Provided automatically by Pytest.
+    """
+
+    cycle_file = tmp_path / "branching_cycle.att"
+    cycle_file.write_text("0\t1\ta\ta\n1\t2\t@0@\tx\n1\t2\t@0@\ty\n2\t1\t@0@\t@0@\n2\t3\tb\tb\n3\n", encoding='utf-8')
+    unrolled = Fst(str(cycle_file), recursion_limit=40, epsilon_cycle_limit=None)
+
+    for memoize in (False, True):
+        started = time.monotonic()
+        results = unrolled.down_generation('ab', memoize=memoize, deadline=started + 0.2)
+        list(results)
+
+        assert results.truncated
+        assert time.monotonic() - started < 2
+
+        results = unrolled.down_generation('ab', memoize=memoize, max_states_visited=1000)
+        list(results)
+
+        assert results.truncated
+        assert results.states_visited == 1000
+
+    # A closure that was cut short isn't kept.
+    assert not unrolled._down.epsilon_closures.get(1) # pylint: disable=protected-access
+
+
+def test_unweighted_traversal(_data_dir):
+    """
+    Tests that FSTs without weights are walked by the same traversals as weighted ones, and give no weights.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+    """
+
+    prefixes = [["PVTense/gii", "PVTense/wii'"]]
+    suffixes = [['VTA'], ['Ind'], ['Pos'], ['Neu'], ['1SgSubj'], ['2SgObj', '2PlObj']]
+
+    def lookups(graph, memoize=False):
+        generated = [(result.input_string, result.output_string, result.path_weight) for result in graph.down_generation(
+            'waabam', prefixes=prefixes, suffixes=suffixes, memoize=memoize
+        )]
+        analyzed = [(result.output_string, result.path_weight) for result in graph.up_analysis('gigii-waabamin', memoize=memoize)]
+        return generated, analyzed
+
+    graph = Fst(_data_dir / 'fst6_waabam.att')
+    unweighted = lookups(graph)
+
+    assert len(unweighted[0]) == 12
+    assert all(weight is None for *_, weight in unweighted[0] + unweighted[1])
+
+    assert not graph._weighted # pylint: disable=protected-access
+    assert lookups(graph, memoize=True) == unweighted
+
+    # A beam needs weights.
+    with pytest.raises(ValueError):
+        list(graph.up_analysis('gigii-waabamin', beam=1.0))
+
+
+def test_shared_paths(tmp_path):
+    """
+    Tests that the parts of a path that each traversal links together are joined into the right output, once per match.
+
+    Parameters
+    ----------
+    tmp_path : pathlib.Path
+        Temporary path for the test file. Provided automatically by Pytest.
+    """
+
+    assert Fst._join_path(((3,), ((1, 2), None)), (4,)) == (1, 2, 3, 4) # pylint: disable=protected-access
+    assert not Fst._join_path(None, ()) # pylint: disable=protected-access
+
+    # Every other arc emits epsilon, and a tag is emitted by the epsilon arc to the accepting state.
+    length = 200
+    att_file = tmp_path / "tags.att"
+    att_file.write_text(
+        ''.join(f"{2 * step}\t{2 * step + 1}\ta\t@0@\t0.5\n{2 * step + 1}\t{2 * step + 2}\tb\t+Tag\t0.5\n" for step in range(length))
+        + f"{2 * length}\t{2 * length + 1}\t@0@\t+End\n{2 * length + 1}\n",
+        encoding='utf-8'
+    )
+
+    expected = ['+Tag' * length + '+End']
+    query = 'ab' * length
+
+    for semiring in (None, TropicalSemiring()):
+        graph = Fst(str(att_file), semiring=semiring, recursion_limit=4 * length)
+
+        assert [result.output_string for result in graph.down_generation(query)] == expected
+        assert [result.output_string for result in graph.down_generation(query, memoize=True)] == expected
+
+    assert [result.output_string for result in graph.down_generation(query, n_best=1)] == expected
+
 #endregion
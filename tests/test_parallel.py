@@ -0,0 +1,192 @@
+"""
+This module tests the bulk queries that run in a pool of worker processes.
+
+Attributes
+----------
+test_up_analyses_parallel : function
+    Tests that analyzing wordforms in worker processes gives the same results as analyzing them one at a time, in input order.
+
+test_down_generations_parallel : function
+    Tests that generating from lemmas in worker processes gives the same results as generating them one at a time.
+
+test_parallel_small_batch : function
+    Tests that a batch smaller than ``min_parallel_size`` is processed without starting worker processes.
+
+test_parallel_invalid_options : function
+    Tests that a chunk size or number of workers below 1 is rejected before any input is read.
+
+test_worker_settings : function
+    Tests that the workers load the FST with the options of the FST that started them, from its sidecar while that is unchanged.
+"""
+
+from pathlib import Path
+import shutil
+import pytest
+from fst_runtime import parallel
+from fst_runtime.fst import Fst
+from fst_runtime.semiring import TropicalSemiring
+
+
+@pytest.fixture(scope="module")
+def _data_dir():
+    """
+    Provides the path to the data directory.
+
+    Returns
+    -------
+    pathlib.Path
+        Path to the data directory.
+    """
+
+    return Path(__file__).parent / "data"
+
+
+def test_up_analyses_parallel(_data_dir, tmp_path):
+    """
+    Tests that analyzing wordforms in worker processes gives the same results as analyzing them one at a time, in input order.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+
+    tmp_path : pathlib.Path
+        Temporary directory for the compiled file. Provided automatically by Pytest.
+    """
+
+    wordforms = ['walks', 'walking', 'walked', 'walk', 'runs', 'walks'] * 5
+
+    # The FST is written to a temporary compiled file for the workers, which is reused by later calls.
+    graph = Fst(_data_dir / 'fst4.att')
+    expected = [(wordform, list(graph.up_analysis(wordform))) for wordform in wordforms]
+
+    assert list(graph.up_analyses_parallel(iter(wordforms), workers=2, chunksize=4, min_parallel_size=0)) == expected
+
+    worker_file = graph._compiled_file_path # pylint: disable=protected-access
+    assert worker_file is not None and Path(worker_file).exists()
+
+    assert list(graph.up_analyses_parallel(wordforms, workers=2, chunksize=7, min_parallel_size=0)) == expected
+    assert graph._compiled_file_path == worker_file # pylint: disable=protected-access
+
+    # A compiled FST is loaded by the workers from its own file, and the query options are passed on.
+    compiled_file_path = Fst.compile(str(_data_dir / 'weighted.att'), str(tmp_path / 'weighted.attc'), semiring=TropicalSemiring())
+    weighted = Fst.load_compiled(compiled_file_path, semiring=TropicalSemiring())
+    queries = ['wwwwyz', 'xxxxyz', 'nothing'] * 3
+
+    assert list(weighted.up_analyses_parallel(queries, workers=2, chunksize=2, min_parallel_size=0, n_best=1)) == [
+        (query, list(weighted.up_analysis(query, n_best=1))) for query in queries
+    ]
+    assert weighted._compiled_file_path == compiled_file_path # pylint: disable=protected-access
+
+
+def test_down_generations_parallel(_data_dir):
+    """
+    Tests that generating from lemmas in worker processes gives the same results as generating them one at a time.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+    """
+
+    graph = Fst(_data_dir / 'fst6_waabam.att')
+    prefixes = [["PVTense/gii", "PVTense/wii'"]]
+    suffixes = [['VTA'], ['Ind'], ['Pos'], ['Neu'], ['1SgSubj'], ['2SgObj', '2PlObj']]
+    lemmas = ['waabam', 'nothing'] * 3
+
+    results = list(graph.down_generations_parallel(lemmas, prefixes=prefixes, suffixes=suffixes, workers=2, chunksize=1, min_parallel_size=0))
+
+    assert results == [(lemma, list(graph.down_generation(lemma, prefixes=prefixes, suffixes=suffixes))) for lemma in lemmas]
+    assert len(results[0][1]) == 12
+
+
+def test_parallel_small_batch(_data_dir, monkeypatch):
+    """
+    Tests that a batch smaller than ``min_parallel_size`` is processed without starting worker processes.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+
+    monkeypatch : pytest.MonkeyPatch
+        Used to detect whether worker processes are started. Provided automatically by Pytest.
+    """
+
+    def fail_executor(*_, **__):
+        raise AssertionError("Worker processes were started for a small batch.")
+
+    monkeypatch.setattr(parallel, 'ProcessPoolExecutor', fail_executor)
+
+    graph = Fst(_data_dir / 'fst4.att')
+    results = dict(graph.up_analyses_parallel(['walks', 'walking'], workers=2, min_parallel_size=3))
+
+    assert {result.output_string for result in results['walks']} == {'wal+VERB+PRES', 'wal+VERB+PRES_DUMMY'}
+    assert [result.output_string for result in results['walking']] == ['wal+VERB+GER']
+    assert not list(graph.up_analyses_parallel([], min_parallel_size=0))
+
+    # Nothing is written for the workers either.
+    assert graph._compiled_file_path is None # pylint: disable=protected-access
+
+
+def test_worker_settings(_data_dir, tmp_path, monkeypatch):
+    """
+    Tests that the workers load the FST with the options of the FST that started them, from its sidecar while that is unchanged.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+
+    tmp_path : pathlib.Path
+        Temporary directory for the ``.att`` file and its sidecar. Provided automatically by Pytest.
+
+    monkeypatch : pytest.MonkeyPatch
+        Used to reset the FST of the worker that is loaded in this process. Provided automatically by Pytest.
+    """
+
+    att_file_path = tmp_path / 'fst4.att'
+    shutil.copy(_data_dir / 'fst4.att', att_file_path)
+    sidecar_path = str(tmp_path / 'fst4.attc')
+
+    graph = Fst(str(att_file_path), use_cache=True, lazy=True, state_cache_size=8, tokenization_cache_size=0)
+    settings = graph._get_worker_settings() # pylint: disable=protected-access
+
+    # The sidecar that was just written holds the FST, so no temporary file is written.
+    assert settings.compiled_file_path == sidecar_path
+    assert (settings.lazy, settings.state_cache_size, settings.tokenization_cache_size) == (True, 8, 0)
+
+    monkeypatch.setattr(parallel, '_worker_fst', None)
+    parallel._initialize_worker(settings) # pylint: disable=protected-access
+    worker_fst = parallel._worker_fst # pylint: disable=protected-access
+
+    assert worker_fst is not None
+    assert worker_fst._lazy and worker_fst._state_cache_size == 8 # pylint: disable=protected-access
+    assert worker_fst.tokenization_cache_info().maxsize == 0
+    assert list(worker_fst.up_analysis('walking')) == list(graph.up_analysis('walking'))
+
+    # A sidecar that has since been rewritten for an edited ``.att`` file no longer holds the FST.
+    reloaded = Fst(str(att_file_path), use_cache=True)
+    Fst.compile(str(_data_dir / 'fst1.att'), sidecar_path)
+
+    assert reloaded._get_worker_settings().compiled_file_path != sidecar_path # pylint: disable=protected-access
+
+
+def test_parallel_invalid_options(_data_dir):
+    """
+    Tests that a chunk size or number of workers below 1 is rejected before any input is read.
+
+    Parameters
+    ----------
+    _data_dir : pathlib.Path
+        Path to the data directory. Provided automatically by Pytest.
+    """
+
+    graph = Fst(_data_dir / 'fst1.att')
+
+    for chunksize, workers in ((0, None), (-1, None), (1, 0), (1, -2)):
+        with pytest.raises(ValueError):
+            graph.up_analyses_parallel(['a'] * 4, workers=workers, chunksize=chunksize, min_parallel_size=2)
+
+        with pytest.raises(ValueError):
+            graph.down_generations_parallel(['a'] * 4, workers=workers, chunksize=chunksize, min_parallel_size=2)
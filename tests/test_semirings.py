@@ -3,7 +3,9 @@
 '''This module executes tests on the four pre-defined, common semirings in the application.'''
 
 import math
-from fst_runtime.semiring import BooleanSemiring, LogSemiring, ProbabilitySemiring, TropicalSemiring
+from typing import Any
+import pytest
+from fst_runtime.semiring import BooleanSemiring, LogSemiring, ProbabilitySemiring, Semiring, TropicalSemiring
 
 _SIGNIFICANT_PLACES = 8
 '''
@@ -147,3 +149,75 @@ def test_tropical_semiring():
 
     assert round(path_set_weight1, _SIGNIFICANT_PLACES) == 0.0
     assert path_set_weight2 == 1.0
+
+
+def test_semiring_order():
+    '''Runs tests on which weight each semiring considers better.'''
+
+    assert BooleanSemiring().is_better(True, False)
+    assert not BooleanSemiring().is_better(True, True)
+    assert LogSemiring().is_better(0.5, 1.0)
+    assert ProbabilitySemiring().is_better(0.5, 0.25)
+    assert TropicalSemiring().is_better(-1.0, 0.0)
+    assert not TropicalSemiring().is_better(1.0, 1.0)
+
+    # A semiring that doesn't define an order can't compare weights.
+    class _CountingSemiring(Semiring[int]):
+        '''The natural numbers with standard addition and multiplication, without an order.'''
+
+        def __init__(self) -> None:
+            super().__init__(add=lambda a, b: a + b, multiply=lambda a, b: a * b, additive_identity=0, multiplicative_identity=1)
+
+        def check_membership(self, *values: Any) -> bool:
+            return all(isinstance(value, int) for value in values)
+
+        def convert_string_into_domain(self, string_representation_of_value: str) -> int:
+            return int(string_representation_of_value)
+
+    semiring = _CountingSemiring()
+
+    assert not semiring.is_ordered
+
+    with pytest.raises(ValueError):
+        semiring.is_better(1, 2)
+
+
+def test_semiring_kernels():
+    '''Runs tests on the plain functions and batch operations of the semirings, and the order of their weights.'''
+
+    semirings = [
+        (BooleanSemiring(), [True, False, True], 'max'),
+        (LogSemiring(), [0.5, 1.5, 2.0], 'min'),
+        (ProbabilitySemiring(), [0.5, 0.25, 0.125], 'max'),
+        (TropicalSemiring(), [0.5, 1.5, 2.0], 'min'),
+    ]
+
+    for semiring, weights, natural_order in semirings:
+        a, b, c = weights
+
+        assert semiring.natural_order == natural_order
+        assert semiring.plus(a, b) == semiring.add(a, b)
+        assert semiring.times(a, b) == semiring.multiply(a, b)
+        assert semiring.multiply_all(weights) == semiring.multiply(semiring.multiply(a, b), c)
+        assert math.isclose(semiring.add_all(weights), semiring.add(semiring.add(a, b), c))
+        assert semiring.add_all([]) == semiring.additive_identity
+        assert semiring.multiply_all([]) == semiring.multiplicative_identity
+
+    # The logadd of large weights doesn't underflow to infinity.
+    semiring = LogSemiring()
+    expected = 800.0 - math.log1p(math.exp(-1.0))
+
+    assert math.isclose(semiring.add(800.0, 801.0), expected)
+    assert math.isclose(semiring.add_all([801.0, 800.0]), expected)
+    assert semiring.add(5.0, float('inf')) == semiring.add(float('inf'), 5.0) == 5.0
+    assert semiring.add_all([float('inf'), float('inf')]) == float('inf')
+
+    # A semiring that overrides ``add`` gets it as its plain function too.
+    class _MaxSemiring(TropicalSemiring):
+        '''The tropical semiring with the maximum as its addition.'''
+
+        def add(self, a: float, b: float) -> float:
+            return max(a, b)
+
+    assert _MaxSemiring().plus(1.0, 2.0) == 2.0
+    assert _MaxSemiring().add_all([1.0, 2.0]) == 1.0
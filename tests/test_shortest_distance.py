@@ -0,0 +1,121 @@
+"""
+This module tests the shortest distances of the states of an FST over each semiring.
+
+Attributes
+----------
+test_shortest_distance_acyclic : function
+    Tests the distances of an FST without cycles, which are computed in topological order.
+
+test_shortest_distance_tropical : function
+    Tests the distances of an FST with cycles over the tropical semiring.
+
+test_shortest_distance_generic : function
+    Tests the distances of FSTs with cycles over semirings that need the generic algorithm.
+
+test_shortest_distance_needs_semiring : function
+    Tests that an FST without a semiring has no shortest distances.
+"""
+
+import pytest
+from fst_runtime.fst import Fst
+from fst_runtime.semiring import BooleanSemiring, LogSemiring, ProbabilitySemiring, TropicalSemiring
+from fst_runtime.shortest_distance import _generic_shortest_distance, _get_forward_arcs, _get_reverse_arcs, topological_order
+
+
+def test_shortest_distance_acyclic(tmp_path):
+    """
+    Tests the distances of an FST without cycles, which are computed in topological order.
+
+    Parameters
+    ----------
+    tmp_path : pathlib.Path
+        Temporary path for the test file. Provided automatically by Pytest.
+    """
+
+    att_file = tmp_path / "acyclic.att"
+    att_file.write_text("0\t1\ta\ta\t0.5\n0\t1\tb\tb\t0.25\n0\t2\tc\tc\t0.5\n1\t2\ta\ta\t0.5\n2\t0.5\n", encoding='utf-8')
+
+    tropical = Fst(str(att_file), semiring=TropicalSemiring())
+    compiled = tropical._compiled # pylint: disable=protected-access
+
+    assert topological_order(compiled) == [0, 1, 2]
+    assert tropical.shortest_distance() == {0: 0.0, 1: 0.25, 2: 0.5}
+    assert tropical.shortest_distance(reverse=True) == {0: 1.0, 1: 1.0, 2: 0.5}
+
+    probability = Fst(str(att_file), semiring=ProbabilitySemiring())
+    semiring = ProbabilitySemiring()
+
+    # The paths are ``a a``, ``b a`` and ``c``, and so the total weight is ``(0.5 * 0.5 + 0.25 * 0.5 + 0.5) * 0.5``.
+    assert probability.shortest_distance() == {0: 1.0, 1: 0.75, 2: 0.875}
+    assert probability.shortest_distance(reverse=True)[0] == 0.4375
+
+    # The generic algorithm agrees with the topological order on an FST that both apply to.
+    for reverse, arcs in ((False, _get_forward_arcs(compiled)), (True, _get_reverse_arcs(compiled))):
+        distances = _generic_shortest_distance(compiled, semiring, 0, arcs, reverse)
+        assert distances == list(probability.shortest_distance(reverse=reverse).values())
+
+
+def test_shortest_distance_tropical():
+    """Tests the distances of an FST with cycles over the tropical semiring."""
+
+    fst = Fst('tests/data/weighted.att', semiring=TropicalSemiring())
+
+    assert topological_order(fst._compiled) is None # pylint: disable=protected-access
+    assert {state: round(distance, 2) for state, distance in fst.shortest_distance().items()} == {0: 0.0, 1: 0.3, 2: 0.4}
+    assert {state: round(distance, 2) for state, distance in fst.shortest_distance(reverse=True).items()} == {0: 0.4, 1: 0.1, 2: 0.0}
+
+    # The distances are kept.
+    assert fst._get_shortest_distances(False) is fst._get_shortest_distances(False) # pylint: disable=protected-access
+
+
+def test_shortest_distance_generic(tmp_path):
+    """
+    Tests the distances of FSTs with cycles over semirings that need the generic algorithm.
+
+    Parameters
+    ----------
+    tmp_path : pathlib.Path
+        Temporary path for the test file. Provided automatically by Pytest.
+    """
+
+    att_file = tmp_path / "cyclic.att"
+
+    # State 0 loops back to itself with probability 0.5, and so it's reached ``1 + 0.5 + 0.25 + ... = 2`` times.
+    att_file.write_text("0\t0\ta\ta\t0.5\n0\t1\tb\tb\t0.5\n1\t1.0\n", encoding='utf-8')
+
+    probability = Fst(str(att_file), semiring=ProbabilitySemiring())
+    distances = probability.shortest_distance()
+
+    assert distances[0] == pytest.approx(2.0, abs=0.01)
+    assert distances[1] == pytest.approx(1.0, abs=0.01)
+    assert probability.shortest_distance(reverse=True)[0] == pytest.approx(1.0, abs=0.01)
+
+    # In the log semiring, the same FST has the weights' negative logs.
+    att_file.write_text("0\t0\ta\ta\t0.6931471805599453\n0\t1\tb\tb\t0.6931471805599453\n1\t0.0\n", encoding='utf-8')
+
+    log = Fst(str(att_file), semiring=LogSemiring())
+
+    assert log.shortest_distance(reverse=True)[0] == pytest.approx(0.0, abs=0.01)
+
+    # A small probability isn't mistaken for having converged, neither on the first step away from zero nor as it grows.
+    att_file.write_text("0\t1\ta\ta\t0.0005\n1\t1\tb\tb\t0.5\n1\t2\tc\tc\t1.0\n2\t1.0\n", encoding='utf-8')
+
+    unlikely = Fst(str(att_file), semiring=ProbabilitySemiring())
+    distances = unlikely.shortest_distance()
+
+    assert distances[0] == 1.0
+    assert distances[1] == pytest.approx(0.001, rel=0.01)
+    assert distances[2] == pytest.approx(0.001, rel=0.01)
+    assert unlikely.shortest_distance(reverse=True)[0] == pytest.approx(0.001, rel=0.01)
+
+    boolean = Fst('tests/data/weighted_boolean.att', semiring=BooleanSemiring())
+
+    assert boolean.shortest_distance() == {0: True, 1: True, 2: True}
+    assert boolean.shortest_distance(reverse=True) == {0: True, 1: True, 2: True}
+
+
+def test_shortest_distance_needs_semiring():
+    """Tests that an FST without a semiring has no shortest distances."""
+
+    with pytest.raises(ValueError):
+        Fst('tests/data/fst1.att').shortest_distance()
@@ -0,0 +1,63 @@
+"""
+This module tests the ``SymbolTable`` class and its use by the ``Fst``.
+
+Attributes
+----------
+test_symbol_table_ids : function
+    Tests that symbols are given stable IDs, with epsilon first, and that unknown symbols are flagged.
+
+test_symbol_table_get_string : function
+    Tests that joining symbol IDs into a string leaves out epsilon.
+
+test_fst_symbol_table : function
+    Tests that every symbol of an FST is interned once in the FST's symbol table.
+"""
+
+import pytest
+from fst_runtime.fst import Fst
+from fst_runtime.symbol_table import EPSILON, EPSILON_ID, UNKNOWN_SYMBOL_ID, SymbolTable
+
+
+def test_symbol_table_ids():
+    """Tests that symbols are given stable IDs, with epsilon first, and that unknown symbols are flagged."""
+
+    table = SymbolTable(['a', '+PL', 'a', EPSILON])
+
+    assert len(table) == 3
+    assert list(table) == [EPSILON, 'a', '+PL']
+
+    assert table.get_id(EPSILON) == EPSILON_ID
+    assert table.get_id('+PL') == 2
+    assert table.add('+PL') == 2
+    assert table.add('b') == 3
+
+    assert table.get_ids(['a', 'z', 'b']) == [1, UNKNOWN_SYMBOL_ID, 3]
+    assert 'z' not in table
+
+    with pytest.raises(IndexError):
+        table.get_symbol(UNKNOWN_SYMBOL_ID)
+
+
+def test_symbol_table_get_string():
+    """Tests that joining symbol IDs into a string leaves out epsilon."""
+
+    table = SymbolTable(['w', 'a', 'l', '+VERB'])
+
+    assert table.get_string([1, 2, 0, 3, 0, 4]) == 'wal+VERB'
+    assert table.get_string([]) == ''
+
+    # Symbols added later are joined too.
+    assert table.get_string([table.add('+PAST'), 0]) == '+PAST'
+
+
+def test_fst_symbol_table():
+    """Tests that every symbol of an FST is interned once in the FST's symbol table."""
+
+    fst = Fst('tests/data/fst4.att')
+    table = fst.symbol_table
+
+    assert table.get_symbol(EPSILON_ID) == EPSILON
+    assert len(table) == len(set(table))
+    assert {'+VERB', '+GER', 'w', 'k'} <= set(table)
+
+    assert list(fst._tokenize('wal+VERB+GER')) == table.get_ids(['w', 'a', 'l', '+VERB', '+GER']) # pylint: disable=protected-access
@@ -27,10 +27,26 @@ test_tokenize_input_string_longer_multichar_symbol : function
 
 test_tokenize_input_string_empty_input : function
     Tests how the tokenize method responds to empty input.
+
+test_tokenizer_falls_back_to_longest_match : function
+    Tests that the tokenizer falls back to the longest symbol that ended when a longer symbol only partially matches.
+
+test_tokenizer_matches_tokenize_input_string : function
+    Tests that a reused tokenizer gives the same tokens as the tokenization function for many inputs.
+
+test_fst_tokenization_cache : function
+    Tests that an FST tokenizes a repeated query once, counts hits and misses, and evicts the least recently used query.
+
+test_fst_freed_without_garbage_collector : function
+    Tests that the tokenization cache doesn't keep a dropped FST alive, so that its files are released at once.
 """
 
+import gc
+from pathlib import Path
+import weakref
 import pytest
-from fst_runtime.tokenize_input import tokenize_input_string
+from fst_runtime.fst import Fst
+from fst_runtime.tokenize_input import Tokenizer, tokenize_input_string
 
 @pytest.fixture
 def _multichar_symbols():
@@ -126,3 +142,74 @@ def test_tokenize_input_string_empty_input(_multichar_symbols):
     expected_tokens = []
     tokens = tokenize_input_string(input_string, _multichar_symbols)
     assert tokens == expected_tokens
+
+def test_tokenizer_falls_back_to_longest_match():
+    """
+    Tests that the tokenizer falls back to the longest symbol that ended when a longer symbol only partially matches.
+    """
+    tokenizer = Tokenizer({"ab", "abcd", "+1SgSubj", "+1Sg"})
+
+    assert tokenizer.tokenize("abcx") == ["ab", "c", "x"]
+    assert tokenizer.tokenize("abcdab") == ["abcd", "ab"]
+    assert tokenizer.tokenize("a+1SgS") == ["a", "+1Sg", "S"]
+    assert tokenizer.tokenize("nim+1SgSubj") == ["n", "i", "m", "+1SgSubj"]
+
+def test_tokenizer_matches_tokenize_input_string(_multichar_symbols):
+    """
+    Tests that a reused tokenizer gives the same tokens as the tokenization function for many inputs.
+
+    Parameters
+    ----------
+    _multichar_symbols : set[str]
+        The set of multi-character symbols. Provided automatically by Pytest.
+    """
+    tokenizer = Tokenizer(_multichar_symbols)
+
+    for input_string in ["", "a", "abc", "abde", "ababcdd", "xdeabcab", "dabcdeab"]:
+        assert tokenizer.tokenize(input_string) == tokenize_input_string(input_string, _multichar_symbols)
+
+def test_fst_tokenization_cache():
+    """
+    Tests that an FST tokenizes a repeated query once, counts hits and misses, and evicts the least recently used query.
+    """
+    fst = Fst(str(Path(__file__).parent / "data" / "fst6_waabam.att"), tokenization_cache_size=2)
+
+    prefixes = [["PVTense/gii"]]
+    suffixes = [['VTA'], ['Ind'], ['Pos'], ['Neu'], ['1SgSubj'], ['2SgObj', '2PlObj']]
+
+    first = [result.output_string for result in fst.down_generation('waabam', prefixes=prefixes, suffixes=suffixes)]
+    second = [result.output_string for result in fst.down_generation('waabam', prefixes=prefixes, suffixes=suffixes)]
+
+    assert first == second
+    assert fst.tokenization_cache_info()[:2] == (2, 2)
+
+    # A third query evicts the least recently used one, which then has to be tokenized again.
+    list(fst.down_generation('waabam+VTA'))
+    list(fst.down_generation('PVTense/gii+waabam+VTA+Ind+Pos+Neu+1SgSubj+2SgObj'))
+
+    assert fst.tokenization_cache_info()[:2] == (2, 4)
+    assert fst.tokenization_cache_info().currsize == 2
+
+    fst.clear_tokenization_cache()
+
+    assert fst.tokenization_cache_info()[:4] == (0, 0, 2, 0)
+
+def test_fst_freed_without_garbage_collector():
+    """
+    Tests that the tokenization cache doesn't keep a dropped FST alive, so that its files are released at once.
+    """
+    fst = Fst(str(Path(__file__).parent / "data" / "fst4.att"))
+    list(fst.up_analysis('walks'))
+
+    # The temporary compiled file that worker processes would load is deleted along with the FST.
+    worker_directory = Path(fst._get_worker_settings().compiled_file_path).parent # pylint: disable=protected-access
+    reference = weakref.ref(fst)
+
+    gc.disable()
+
+    try:
+        del fst
+        assert reference() is None
+        assert not worker_directory.exists()
+    finally:
+        gc.enable()
@@ -8,10 +8,26 @@ test_weighted_fst_boolean : function
 
 test_weighted_fst_tropical : function
     Tests a weighted FST whose weights are real-valued with +/- inf using the tropical semiring for testing.
+
+test_weighted_fst_tropical_analysis : function
+    Tests that analyzing a wordform gives the same paths and weights, including final weights, as generating it.
+
+test_weighted_fst_n_best : function
+    Tests that n-best queries give the best outputs first, and only as many as were asked for.
+
+test_weighted_fst_aggregate : function
+    Tests that aggregated queries give each distinct output once, with the weights of its paths added up.
+
+test_weighted_fst_pruning : function
+    Tests that the beam and threshold drop the paths that are too heavy, and save walking them.
+
+test_weighted_fst_beam_order : function
+    Tests that the beam drops a match that was found before a better one, whichever traversal finds it.
 """
 
+import pytest
 from fst_runtime.fst import Fst
-from fst_runtime.semiring import BooleanSemiring, TropicalSemiring
+from fst_runtime.semiring import BooleanSemiring, LogSemiring, ProbabilitySemiring, TropicalSemiring
 
 def test_weighted_fst_boolean():
     """Tests a weighted FST whose weights are in {0, 1}."""
@@ -52,3 +68,190 @@ def test_weighted_fst_tropical():
 
     assert results[0].output_string == 'wwwwyz'
     assert round(results[0].path_weight, 2) == 1.2
+
+def test_weighted_fst_tropical_analysis(tmp_path):
+    """
+    Tests that analyzing a wordform gives the same paths and weights, including final weights, as generating it.
+
+    Parameters
+    ----------
+    tmp_path : pathlib.Path
+        Temporary path for the test file. Provided automatically by Pytest.
+    """
+
+    att_file = tmp_path / "weighted_final.att"
+    att_file.write_text("0\t0\ta\tw\t0.2\n0\t0\ta\tx\t0.4\n0\t1\tb\ty\t0.3\n1\t2\tc\tz\t0.1\n2\t0.5\n", encoding='utf-8')
+
+    fst = Fst(str(att_file), semiring=TropicalSemiring())
+
+    for generated in fst.down_generation('aabc'):
+        analyses = list(fst.up_analysis(generated.output_string))
+
+        assert [analysis.output_string for analysis in analyses] == ['aabc']
+        assert round(analyses[0].path_weight, 2) == round(generated.path_weight, 2)
+
+    analyses = list(fst.up_analysis('wxyz'))
+
+    assert round(analyses[0].path_weight, 2) == 1.5
+
+def test_weighted_fst_n_best(tmp_path):
+    """
+    Tests that n-best queries give the best outputs first, and only as many as were asked for.
+
+    Parameters
+    ----------
+    tmp_path : pathlib.Path
+        Temporary path for the test file. Provided automatically by Pytest.
+    """
+
+    att_file = tmp_path / "ambiguous.att"
+
+    # ``ab`` has seven analyses, one of them through an epsilon arc, and the cheapest first arc isn't on the cheapest path.
+    att_file.write_text(
+        "0\t1\tx\ta\t0.5\n0\t1\ty\ta\t0.1\n0\t3\tz\ta\t0.0\n1\t2\tp\tb\t0.3\n1\t2\tq\tb\t0.2\n"
+        "1\t5\t@0@\t@0@\t0.0\n5\t2\tr\tb\t0.05\n3\t4\tb\tb\t2.0\n2\t0.1\n4\n",
+        encoding='utf-8'
+    )
+
+    for semiring in (TropicalSemiring(), LogSemiring()):
+        fst = Fst(str(att_file), semiring=semiring)
+        analyses = sorted(((round(result.path_weight, 2), result.output_string) for result in fst.up_analysis('ab')))
+
+        assert len(analyses) == 7
+
+        best = [(round(result.path_weight, 2), result.output_string) for result in fst.up_analysis('ab', n_best=3)]
+
+        assert best == analyses[:3] == [(0.25, 'yr'), (0.4, 'yq'), (0.5, 'yp')]
+        assert [(round(result.path_weight, 2), result.output_string) for result in fst.up_analysis('ab', n_best=10)] == analyses
+
+    fst = Fst('tests/data/weighted.att', semiring=TropicalSemiring())
+    best = list(fst.down_generation('aaaabc', n_best=1))
+
+    assert [result.output_string for result in best] == ['wwwwyz']
+    assert round(best[0].path_weight, 2) == 1.2
+
+    with pytest.raises(ValueError):
+        list(Fst('tests/data/weighted_boolean.att', semiring=BooleanSemiring()).down_generation('abc', n_best=1))
+
+
+def test_weighted_fst_aggregate(tmp_path):
+    """
+    Tests that aggregated queries give each distinct output once, with the weights of its paths added up.
+
+    Parameters
+    ----------
+    tmp_path : pathlib.Path
+        Temporary path for the test file. Provided automatically by Pytest.
+    """
+
+    att_file = tmp_path / "ambiguous.att"
+
+    # ``ab`` generates ``xy`` along two paths, and ``zy`` along one.
+    att_file.write_text(
+        "0\t1\ta\tx\t0.5\n0\t2\ta\tx\t0.25\n0\t4\ta\tz\t1.0\n1\t3\tb\ty\t0.5\n2\t3\tb\ty\t0.5\n4\t3\tb\ty\t0.0\n3\t1.0\n",
+        encoding='utf-8'
+    )
+
+    probability = Fst(str(att_file), semiring=ProbabilitySemiring())
+
+    assert len(list(probability.down_generation('ab'))) == 3
+    assert {result.output_string: result.path_weight for result in probability.down_generation('ab', aggregate=True)} == {
+        'xy': 0.375, 'zy': 0.0
+    }
+
+    tropical = Fst(str(att_file), semiring=TropicalSemiring())
+    generations = [(result.output_string, result.path_weight) for result in tropical.down_generation('ab', aggregate=True)]
+
+    assert generations == [('xy', 1.75), ('zy', 2.0)]
+    assert [(result.output_string, result.path_weight) for result in tropical.down_generation('ab', n_best=2)] == [('xy', 1.75), ('xy', 2.0)]
+    assert [(result.output_string, result.path_weight) for result in tropical.down_generation('ab', n_best=2, aggregate=True)] == generations
+    assert [(result.output_string, result.input_string) for result in tropical.up_analysis('xy', aggregate=True)] == [('ab', 'xy')]
+
+    # Without weights, identical outputs are just merged.
+    unweighted = Fst(str(att_file))
+
+    assert [result.output_string for result in unweighted.down_generation('ab', aggregate=True)] == ['xy', 'zy']
+    analyses = unweighted.up_analyses(['xy', 'zy'], aggregate=True)
+
+    assert {wordform: [result.output_string for result in results] for wordform, results in analyses.items()} == {'xy': ['ab'], 'zy': ['ab']}
+
+
+def test_weighted_fst_pruning(monkeypatch):
+    """
+    Tests that the beam and threshold drop the paths that are too heavy, and save walking them.
+
+    Parameters
+    ----------
+    monkeypatch : pytest.MonkeyPatch
+        Used to count how many times states are expanded. Provided automatically by Pytest.
+    """
+
+    fst = Fst('tests/data/weighted.att', semiring=TropicalSemiring())
+    expanded_states = []
+    original_get_expander = Fst._get_expander # pylint: disable=protected-access
+
+    # Every state the traversal expands is recorded.
+    monkeypatch.setattr(
+        Fst, '_get_expander',
+        lambda fst, direction, budget=None: lambda state, node: (
+            expanded_states.append(state) or original_get_expander(fst, direction, budget)(state, node)
+        )
+    )
+
+    all_paths = sorted(round(result.path_weight, 2) for result in fst.down_generation('aaaabc'))
+    unpruned_expansions = len(expanded_states)
+
+    # Only the paths of weight 1.2 and 1.4 are within 0.25 of the best path, or under the threshold of 1.45.
+    pruned_queries = [
+        lambda: fst.down_generation('aaaabc', beam=0.25),
+        lambda: fst.down_generation('aaaabc', threshold=1.45),
+        lambda: fst.down_generation('aaaabc', beam=0.25, n_best=10),
+    ]
+
+    for pruned_query in pruned_queries:
+        expanded_states.clear()
+
+        assert sorted(round(result.path_weight, 2) for result in pruned_query()) == all_paths[:5] == [1.2, 1.4, 1.4, 1.4, 1.4]
+        assert len(expanded_states) < unpruned_expansions
+
+    memoized = sorted(round(result.path_weight, 2) for result in fst.down_generation('aaaabc', threshold=1.45, memoize=True))
+
+    assert memoized == all_paths[:5]
+
+    analyses = [round(result.path_weight, 2) for result in fst.up_analysis('wwwwyz', threshold=1.0)]
+
+    assert not analyses
+
+    # For probabilities, higher weights are better.
+    probability = Fst('tests/data/weighted.att', semiring=ProbabilitySemiring())
+
+    assert not list(probability.down_generation('aabc', threshold=0.5))
+
+    with pytest.raises(ValueError):
+        list(Fst('tests/data/fst4.att').up_analysis('walks', beam=1.0))
+
+
+def test_weighted_fst_beam_order(tmp_path):
+    """
+    Tests that the beam drops a match that was found before a better one, whichever traversal finds it.
+
+    Parameters
+    ----------
+    tmp_path : pathlib.Path
+        Temporary path for the test file. Provided automatically by Pytest.
+    """
+
+    att_file = tmp_path / "worse_first.att"
+
+    # The depth-first traversals follow the arcs in order, and so reach the path of weight 2.5 before the one of weight 1.25.
+    att_file.write_text("0\t1\ta\tx\t2.5\n0\t2\ta\ty\t1.0\n2\t3\t@0@\t@0@\t0.25\n1\n3\n", encoding='utf-8')
+    fst = Fst(str(att_file), semiring=TropicalSemiring())
+
+    assert [result.path_weight for result in fst.down_generation('a')] == [2.5, 1.25]
+
+    for memoize in (False, True):
+        assert [result.path_weight for result in fst.down_generation('a', beam=0.0, memoize=memoize)] == [1.25]
+        assert [result.path_weight for result in fst.down_generation('a', beam=1.25, memoize=memoize)] == [2.5, 1.25]
+        assert [result.output_string for result in fst.down_generation('a', beam=0.5, memoize=memoize, aggregate=True)] == ['y']
+
+    assert [result.path_weight for result in fst.down_generation('a', beam=0.0, n_best=5)] == [1.25]